@@ -0,0 +1,297 @@
+import asyncio
+import importlib.util
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+
+class AsyncCryptoClient:
+    """
+    异步加密货币市场数据客户端
+
+    所有请求共享一个带连接池的 httpx.AsyncClient（安装了 h2 时启用HTTP/2），
+    价格表在客户端侧按TTL缓存，批量方法对每个不同的端点只发一次请求。
+    不依赖项目内部模块，可以直接使用。
+
+    用法:
+        async with AsyncCryptoClient() as client:
+            prices = await client.get_prices_by_symbols(["BTC", "ETH", "DOGE"])
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        prices_ttl: float = 10.0,
+        max_connections: int = 20,
+        timeout: float = 10.0,
+        http2: Optional[bool] = None
+    ):
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+
+        self.base_url = base_url.rstrip('/')
+        self.prices_ttl = prices_ttl
+        self.session = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            headers={
+                'User-Agent': 'Soyo-Crypto-Client/1.0',
+                'Accept': 'application/json'
+            }
+        )
+
+        # 价格表缓存: (过期时间, 价格表)
+        self._prices: Optional[Dict[str, Dict]] = None
+        self._prices_expires_at = 0.0
+        self._prices_lock = asyncio.Lock()
+        # 支持列表变化很少，整个会话只取一次
+        self._supported: Optional[List[Dict[str, str]]] = None
+
+    async def __aenter__(self) -> "AsyncCryptoClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self.session.aclose()
+
+    async def _get_json(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """发送GET请求，404返回None，其他错误打印后返回None"""
+        try:
+            response = await self.session.get(path, params=params)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"请求 {path} 时出错: {e}")
+            return None
+
+    async def get_all_prices(self, force_refresh: bool = False) -> Dict[str, Dict]:
+        """
+        获取所有支持的加密货币价格
+
+        结果在客户端缓存 prices_ttl 秒；并发调用只会触发一次请求。
+
+        Args:
+            force_refresh: 忽略本地缓存，强制重新获取
+
+        Returns:
+            包含所有加密货币价格的字典
+        """
+        if not force_refresh and self._prices is not None and time.monotonic() < self._prices_expires_at:
+            return self._prices
+
+        async with self._prices_lock:
+            # 等锁期间其他协程可能已经刷新过
+            if not force_refresh and self._prices is not None and time.monotonic() < self._prices_expires_at:
+                return self._prices
+
+            data = await self._get_json("/api/v1/crypto/prices")
+            prices = data.get('data', {}) if data else {}
+            if prices:
+                self._prices = prices
+                self._prices_expires_at = time.monotonic() + self.prices_ttl
+            return prices
+
+    async def get_crypto_detail(self, crypto_id: str) -> Optional[Dict]:
+        """
+        获取特定加密货币的详细信息
+
+        Args:
+            crypto_id: 加密货币标识符（如 'bitcoin', 'ethereum'）
+
+        Returns:
+            加密货币详细信息字典，如果未找到则返回None
+        """
+        data = await self._get_json(f"/api/v1/crypto/{crypto_id}")
+        return data.get('data', {}) if data else None
+
+    async def get_supported_cryptos(self) -> List[Dict[str, str]]:
+        """
+        获取支持的加密货币列表
+
+        Returns:
+            支持的加密货币列表
+        """
+        if self._supported is None:
+            data = await self._get_json("/api/v1/crypto/supported")
+            supported = data.get('data', []) if data else []
+            if supported:
+                self._supported = supported
+            return supported
+        return self._supported
+
+    async def get_details(self, crypto_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        并发获取多个加密货币的详细信息
+
+        Args:
+            crypto_ids: 加密货币标识符列表，重复项只请求一次
+
+        Returns:
+            {crypto_id: 详细信息或None}
+        """
+        unique_ids = list(dict.fromkeys(crypto_id.lower() for crypto_id in crypto_ids))
+        details = await asyncio.gather(*(self.get_crypto_detail(crypto_id) for crypto_id in unique_ids))
+        return dict(zip(unique_ids, details))
+
+    async def get_prices_by_symbols(self, symbols: Iterable[str]) -> Dict[str, Optional[float]]:
+        """
+        批量根据符号获取价格
+
+        先用一次价格表请求覆盖所有能匹配的符号，
+        剩余符号解析成ID后再并发请求详情。
+
+        Args:
+            symbols: 加密货币符号列表（如 ['BTC', 'ETH']）
+
+        Returns:
+            {symbol: 价格（USD）或None}
+        """
+        symbols = list(dict.fromkeys(symbols))
+        prices = await self.get_all_prices()
+
+        # 价格表可能按符号（src.main）或按ID（旧版 simple_api）作为键
+        by_key = {}
+        for key, entry in prices.items():
+            by_key[key.upper()] = entry
+            if isinstance(entry, dict) and entry.get('id'):
+                by_key[entry['id'].upper()] = entry
+
+        result: Dict[str, Optional[float]] = {}
+        missing = []
+        for symbol in symbols:
+            entry = by_key.get(symbol.upper())
+            if entry:
+                result[symbol] = entry['price_usd']
+            else:
+                missing.append(symbol)
+
+        if missing:
+            supported = await self.get_supported_cryptos()
+            symbol_to_id = {crypto['symbol'].upper(): crypto['id'] for crypto in supported}
+
+            to_fetch = {}
+            for symbol in missing:
+                crypto_id = symbol_to_id.get(symbol.upper())
+                entry = by_key.get(crypto_id.upper()) if crypto_id else None
+                if entry:
+                    result[symbol] = entry['price_usd']
+                elif crypto_id:
+                    to_fetch[symbol] = crypto_id
+                else:
+                    result[symbol] = None
+
+            details = await self.get_details(to_fetch.values())
+            for symbol, crypto_id in to_fetch.items():
+                detail = details.get(crypto_id)
+                result[symbol] = detail.get('price_usd') if detail else None
+
+        return {symbol: result.get(symbol) for symbol in symbols}
+
+    async def get_price_by_symbol(self, symbol: str) -> Optional[float]:
+        """
+        根据符号获取特定加密货币的价格
+
+        Args:
+            symbol: 加密货币符号（如 'BTC', 'ETH'）
+
+        Returns:
+            价格（USD），如果未找到则返回None
+        """
+        prices = await self.get_prices_by_symbols([symbol])
+        return prices.get(symbol)
+
+    async def predict(self, symbol: str, days: int = 7) -> Optional[Dict]:
+        """
+        预测特定加密货币价格
+
+        Args:
+            symbol: 加密货币符号
+            days: 预测天数
+
+        Returns:
+            预测结果，失败返回None
+        """
+        data = await self._get_json(f"/api/v1/predict/{symbol}", params={"days": days})
+        return data.get('data') if data else None
+
+    async def predict_many(self, symbols: Iterable[str], days: int = 7) -> Dict[str, Optional[Dict]]:
+        """
+        并发预测多个加密货币价格
+
+        Args:
+            symbols: 加密货币符号列表
+            days: 预测天数
+
+        Returns:
+            {symbol: 预测结果或None}
+        """
+        symbols = list(dict.fromkeys(symbols))
+        predictions = await asyncio.gather(*(self.predict(symbol, days) for symbol in symbols))
+        return dict(zip(symbols, predictions))
+
+
+async def get_crypto_prices_summary_async(base_url: str = "http://localhost:8000") -> str:
+    """
+    获取加密货币价格摘要，格式化为易读的字符串
+
+    与 simple_client.get_crypto_prices_summary 输出相同，但所有详情请求并发发出。
+    """
+    async with AsyncCryptoClient(base_url) as client:
+        prices = await client.get_all_prices()
+
+        if not prices:
+            return "暂时无法获取加密货币价格数据。请确保API服务正在运行。"
+
+        sorted_prices = sorted(prices.items(), key=lambda x: x[1]['price_usd'], reverse=True)
+        details = await client.get_details(data['id'] for _, data in sorted_prices)
+
+    summary = "📈 加密货币市场价格概览:\n"
+    summary += "=" * 30 + "\n"
+
+    for symbol, data in sorted_prices:
+        price = data['price_usd']
+        detail = details.get(data['id'].lower())
+        change_24h = detail.get('change_percent_24h', 0) if detail else 0
+
+        change_str = f" ({change_24h:+.2f}%)" if change_24h != 0 else ""
+        summary += f"{symbol}: ${price:,.2f}{change_str}\n"
+
+    return summary
+
+
+async def quick_crypto_check_async(symbols: List[str], base_url: str = "http://localhost:8000") -> str:
+    """
+    快速检查特定加密货币的价格
+
+    Args:
+        symbols: 要检查的加密货币符号列表
+        base_url: API基础URL
+
+    Returns:
+        格式化的检查结果
+    """
+    async with AsyncCryptoClient(base_url) as client:
+        prices = await client.get_prices_by_symbols(symbols)
+
+    result = "🔍 加密货币快速检查:\n"
+    result += "=" * 25 + "\n"
+
+    for symbol in symbols:
+        price = prices.get(symbol)
+        if price is not None:
+            result += f"{symbol}: ${price:,.2f}\n"
+        else:
+            result += f"{symbol}: 未找到\n"
+
+    return result
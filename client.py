@@ -1,7 +1,7 @@
 import requests
 import json
 from typing import Dict, List, Optional
-from src.config import SUPPORTED_CRYPTO, CRYPTO_SYMBOLS
+from src.constants import SUPPORTED_CRYPTO, CRYPTO_SYMBOLS
 
 
 class CryptoMarketClient:
@@ -71,18 +71,20 @@ class CryptoMarketClient:
             print(f"获取支持的加密货币列表时出错: {e}")
             return []
     
-    def get_price_by_symbol(self, symbol: str) -> Optional[float]:
+    def get_price_by_symbol(self, symbol: str, all_prices: Optional[Dict] = None) -> Optional[float]:
         """
         根据符号获取特定加密货币的价格
         
         Args:
             symbol: 加密货币符号（如 'BTC', 'ETH'）
+            all_prices: 已获取的价格表，批量查询时传入以避免重复请求
             
         Returns:
             价格（USD），如果未找到则返回None
         """
         # 首先尝试直接获取价格
-        all_prices = self.get_all_prices()
+        if all_prices is None:
+            all_prices = self.get_all_prices()
         if symbol in all_prices:
             return all_prices[symbol]['price_usd']
         
@@ -96,14 +98,30 @@ class CryptoMarketClient:
         return None
 
 
-# 创建全局客户端实例
-client = CryptoMarketClient()
+# 全局客户端实例，首次调用 get_client() 时创建
+_client: Optional[CryptoMarketClient] = None
+
+
+def get_client() -> CryptoMarketClient:
+    """获取全局客户端实例"""
+    global _client
+    if _client is None:
+        _client = CryptoMarketClient()
+    return _client
+
+
+def __getattr__(name: str):
+    # 兼容 `from client import client` 的旧写法
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_crypto_prices_summary() -> str:
     """
     获取加密货币价格摘要，格式化为易读的字符串
     """
+    client = get_client()
     prices = client.get_all_prices()
     
     if not prices:
@@ -139,11 +157,14 @@ def quick_crypto_check(symbols: List[str]) -> str:
     Returns:
         格式化的检查结果
     """
+    client = get_client()
     result = "🔍 加密货币快速检查:\n"
     result += "=" * 25 + "\n"
     
+    # 价格表只取一次，所有符号共用
+    all_prices = client.get_all_prices()
     for symbol in symbols:
-        price = client.get_price_by_symbol(symbol)
+        price = client.get_price_by_symbol(symbol, all_prices)
         if price is not None:
             result += f"{symbol}: ${price:,.2f}\n"
         else:
@@ -81,6 +81,24 @@ class SimpleCryptoClient:
             print(f"获取 {symbol} 详细信息时出错: {e}")
             return None
     
+    def batch(self, requests_list: List[Dict]) -> List[Dict]:
+        """
+        一次请求执行多个子请求（POST /api/v1/batch）
+        
+        Args:
+            requests_list: 子请求列表，如 [{"type": "prices"}, {"type": "detail", "symbol": "bitcoin"}]
+            
+        Returns:
+            与子请求一一对应的结果列表，每项带 status；请求失败时返回空列表
+        """
+        try:
+            response = self.session.post(f"{self.base_url}/api/v1/batch", json={"requests": requests_list})
+            response.raise_for_status()
+            return response.json().get('data', [])
+        except requests.exceptions.RequestException as e:
+            print(f"批量请求时出错: {e}")
+            return []
+    
     def get_supported_cryptos(self) -> List[Dict[str, str]]:
         """
         获取支持的加密货币列表
@@ -97,18 +115,20 @@ class SimpleCryptoClient:
             })
         return cryptos
     
-    def get_price_by_symbol(self, symbol: str) -> Optional[float]:
+    def get_price_by_symbol(self, symbol: str, all_prices: Optional[Dict] = None) -> Optional[float]:
         """
         根据符号获取特定加密货币的价格
         
         Args:
             symbol: 加密货币符号（如 'BTC', 'ETH'）
+            all_prices: 已获取的价格表，批量查询时传入以避免重复请求
             
         Returns:
             价格（USD），如果未找到则返回None
         """
         # 首先尝试直接获取价格
-        all_prices = self.get_all_prices()
+        if all_prices is None:
+            all_prices = self.get_all_prices()
         if symbol in all_prices:
             return all_prices[symbol]['price_usd']
         
@@ -129,6 +149,19 @@ def get_crypto_prices_summary(base_url: str = "http://localhost:8000") -> str:
     client = SimpleCryptoClient(base_url)
     prices = client.get_all_prices()
     
+    # 获取24小时变化（如果有详细数据）
+    details = {data['id']: client.get_crypto_detail(data['id']) for data in prices.values()}
+    return format_prices_summary(prices, details)
+
+
+def format_prices_summary(prices: Dict[str, Dict], details: Dict[str, Optional[Dict]]) -> str:
+    """
+    把价格表和详情格式化成价格摘要
+    
+    Args:
+        prices: /api/v1/crypto/prices 返回的价格表
+        details: {crypto_id: 详情}，用于显示24小时变化
+    """
     if not prices:
         return "暂时无法获取加密货币价格数据。请确保API服务正在运行。"
     
@@ -142,8 +175,7 @@ def get_crypto_prices_summary(base_url: str = "http://localhost:8000") -> str:
         price = data['price_usd']
         crypto_id = data['id']
         
-        # 获取24小时变化（如果有详细数据）
-        detail = client.get_crypto_detail(crypto_id)
+        detail = details.get(crypto_id)
         change_24h = detail.get('change_percent_24h', 0) if detail else 0
         
         change_str = f" ({change_24h:+.2f}%)" if change_24h != 0 else ""
@@ -167,8 +199,10 @@ def quick_crypto_check(symbols: List[str], base_url: str = "http://localhost:800
     result = "🔍 加密货币快速检查:\n"
     result += "=" * 25 + "\n"
     
+    # 价格表只取一次，所有符号共用
+    all_prices = client.get_all_prices()
     for symbol in symbols:
-        price = client.get_price_by_symbol(symbol)
+        price = client.get_price_by_symbol(symbol, all_prices)
         if price is not None:
             result += f"{symbol}: ${price:,.2f}\n"
         else:
@@ -177,5 +211,36 @@ def quick_crypto_check(symbols: List[str], base_url: str = "http://localhost:800
     return result
 
 
-# 预定义的客户端实例
-simple_client = SimpleCryptoClient()
\ No newline at end of file
+def format_quick_check(symbols: List[str], all_prices: Dict[str, Dict]) -> str:
+    """
+    用已获取的价格表格式化快速检查结果（不再发起请求）
+    
+    Args:
+        symbols: 要检查的加密货币符号列表
+        all_prices: /api/v1/crypto/prices 返回的价格表
+    """
+    result = "🔍 加密货币快速检查:\n"
+    result += "=" * 25 + "\n"
+    
+    for symbol in symbols:
+        data = all_prices.get(symbol.upper())
+        if data is not None:
+            result += f"{symbol}: ${data['price_usd']:,.2f}\n"
+        else:
+            result += f"{symbol}: 未找到\n"
+    
+    return result
+
+
+# 预定义的客户端实例，首次访问 simple_client 时创建
+_simple_client: Optional[SimpleCryptoClient] = None
+
+
+def __getattr__(name: str):
+    # 模块级 `simple_client` 延迟创建，导入本模块时不建立HTTP会话
+    global _simple_client
+    if name == "simple_client":
+        if _simple_client is None:
+            _simple_client = SimpleCryptoClient()
+        return _simple_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
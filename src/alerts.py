@@ -0,0 +1,520 @@
+import asyncio
+import bisect
+import ipaddress
+import itertools
+import json
+import socket
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+
+# change 提醒的最长时间窗口（分钟）
+MAX_WINDOW_MINUTES = 24 * 60
+
+
+def check_webhook_url(url: str, resolve: bool = False, allow_private: bool = False):
+    """
+    检查 webhook 地址，防止借提醒向内网地址发请求（SSRF）
+
+    只允许 http / https；主机为IP时必须是公网地址，localhost 一律拒绝。
+    resolve 为True时解析域名，任一解析结果不是公网地址即拒绝（会阻塞，需在线程中调用）。
+
+    Args:
+        url: webhook 地址
+        resolve: 是否解析域名
+        allow_private: 允许内网地址（webhook 接收方部署在内网时使用）
+
+    Raises:
+        ValueError: 地址不合法或指向非公网地址
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        raise ValueError("Invalid webhook_url") from None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http or https URL")
+    if allow_private:
+        return
+
+    host = parts.hostname.rstrip(".").lower()
+    if host == "localhost" or host.endswith(".localhost"):
+        raise ValueError("webhook_url must not point to a private address")
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        if not resolve:
+            return
+        try:
+            infos = socket.getaddrinfo(host, port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+        except OSError:
+            raise ValueError(f"Cannot resolve webhook host {host}") from None
+        addresses = [ipaddress.ip_address(info[4][0].split("%", 1)[0]) for info in infos]
+
+    for address in addresses:
+        # IPv4映射的IPv6地址按其IPv4地址判断
+        mapped = getattr(address, "ipv4_mapped", None)
+        if not (mapped if mapped is not None else address).is_global:
+            raise ValueError("webhook_url must not point to a private address")
+
+
+class Alert:
+    """
+    一条价格提醒
+
+    condition:
+        above  - 价格向上穿过 threshold
+        below  - 价格向下穿过 threshold
+        change - window 秒内的涨跌幅穿过 threshold（百分比，负数表示下跌）
+    """
+
+    __slots__ = (
+        "id", "crypto_id", "condition", "threshold", "window", "webhook_url", "owner", "created_at", "expires_at", "seq"
+    )
+
+    def __init__(
+        self,
+        crypto_id: str,
+        condition: str,
+        threshold: float,
+        window: int = 0,
+        webhook_url: Optional[str] = None,
+        seq: int = 0,
+        owner: str = "",
+        ttl: Optional[float] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.crypto_id = crypto_id
+        self.condition = condition
+        self.threshold = threshold
+        self.window = window
+        self.webhook_url = webhook_url
+        self.owner = owner
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl if ttl else None
+        self.seq = seq
+
+    def to_dict(self, include_webhook: bool = True) -> Dict:
+        """
+        Args:
+            include_webhook: 是否包含 webhook_url（只在返回给注册者本人时包含）
+        """
+        data = {
+            "id": self.id,
+            "crypto_id": self.crypto_id,
+            "condition": self.condition,
+            "threshold": self.threshold,
+            "window_minutes": self.window // 60 if self.window else None,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at
+        }
+        if include_webhook:
+            data["webhook_url"] = self.webhook_url
+        return data
+
+
+class PriceWindow:
+    """
+    计算涨跌幅用的近期价格，时间和价格分别按时间升序存放，按时间二分查找参考价
+    """
+
+    __slots__ = ("times", "prices")
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.prices: List[float] = []
+
+    def append(self, timestamp: float, price: float):
+        self.times.append(timestamp)
+        self.prices.append(price)
+
+    def at(self, timestamp: float) -> Optional[float]:
+        """不晚于 timestamp 的最后一个价格，没有时返回None"""
+        i = bisect.bisect_right(self.times, timestamp) - 1
+        return self.prices[i] if i >= 0 else None
+
+    def trim(self, timestamp: float):
+        """丢弃早于 timestamp 的点，但保留不晚于它的最后一个点（作为窗口起点的参考价）"""
+        i = bisect.bisect_right(self.times, timestamp) - 1
+        if i > 0:
+            del self.times[:i]
+            del self.prices[:i]
+
+
+class ThresholdIndex:
+    """
+    按阈值排序的提醒索引
+
+    条目为 (阈值, 序号, 提醒ID)，序号保证阈值相同时也能唯一定位；
+    一次价格变化穿过的所有阈值是列表中连续的一段，用二分查找定位后整段取出。
+    """
+
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries: List[Tuple[float, int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, alert: Alert):
+        bisect.insort(self.entries, (alert.threshold, alert.seq, alert.id))
+
+    def remove(self, alert: Alert):
+        entry = (alert.threshold, alert.seq, alert.id)
+        i = bisect.bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def pop_crossed_up(self, old: float, new: float) -> List[str]:
+        """取出满足 old < 阈值 <= new 的提醒"""
+        lo = bisect.bisect_right(self.entries, (old, float("inf")))
+        hi = bisect.bisect_right(self.entries, (new, float("inf")))
+        crossed = [alert_id for _, _, alert_id in self.entries[lo:hi]]
+        del self.entries[lo:hi]
+        return crossed
+
+    def pop_crossed_down(self, old: float, new: float) -> List[str]:
+        """取出满足 new <= 阈值 < old 的提醒"""
+        lo = bisect.bisect_left(self.entries, (new, -1))
+        hi = bisect.bisect_left(self.entries, (old, -1))
+        crossed = [alert_id for _, _, alert_id in self.entries[lo:hi]]
+        del self.entries[lo:hi]
+        return crossed
+
+
+class AlertEngine:
+    """
+    价格提醒引擎
+
+    每个资产的阈值按方向存放在 ThresholdIndex 中，价格刷新时只在旧价格和新价格之间二分查找，
+    耗时与触发数量相关而与注册总数无关。涨跌幅提醒按 (资产, 时间窗口) 建索引，
+    用窗口起点的参考价计算涨跌幅后同样二分匹配（窗口最长 MAX_WINDOW_MINUTES，某个窗口的最后一个提醒删除后
+    不再计算该窗口）。提醒触发一次后即删除，超过 ttl 秒没有触发也会删除。
+
+    提醒和触发事件都属于注册它的客户端（owner），查询、删除、事件列表和事件流只能看到自己的；
+    事件中不包含 webhook 地址。触发的事件进入 webhook 投递队列。webhook 地址只能指向公网
+    （注册时和每次投递前都会检查，见 check_webhook_url），投递不跟随重定向。
+
+    Args:
+        max_alerts: 提醒总数上限
+        max_alerts_per_client: 每个客户端（owner）的提醒数上限，0表示不限制
+        ttl: 提醒的有效期（秒），0表示不过期
+        webhook_timeout: webhook 请求超时（秒）
+        allow_private_webhooks: 允许 webhook 指向内网地址
+    """
+
+    def __init__(
+        self,
+        max_alerts: int = 100000,
+        max_alerts_per_client: int = 100,
+        ttl: float = 7 * 86400,
+        webhook_timeout: float = 5.0,
+        allow_private_webhooks: bool = False
+    ):
+        self.max_alerts = max_alerts
+        self.max_alerts_per_client = max_alerts_per_client
+        self.ttl = ttl
+        self.webhook_timeout = webhook_timeout
+        self.allow_private_webhooks = allow_private_webhooks
+
+        self._alerts: Dict[str, Alert] = {}
+        # owner -> 提醒数
+        self._owner_counts: Dict[str, int] = {}
+        # 按注册顺序排列的 (到期时间, 提醒ID)；有效期相同，注册顺序就是到期顺序
+        self._expiry: Deque[Tuple[float, str]] = deque()
+        self.expired = 0
+        self._seq = itertools.count()
+        # crypto_id -> 向上穿越 / 向下穿越的价格阈值
+        self._above: Dict[str, ThresholdIndex] = {}
+        self._below: Dict[str, ThresholdIndex] = {}
+        # (crypto_id, window) -> 上涨 / 下跌的涨跌幅阈值
+        self._rise: Dict[Tuple[str, int], ThresholdIndex] = {}
+        self._fall: Dict[Tuple[str, int], ThresholdIndex] = {}
+        # crypto_id -> 有提醒的涨跌幅时间窗口；(crypto_id, window) -> 该窗口的提醒数
+        self._windows: Dict[str, Set[int]] = {}
+        self._window_counts: Dict[Tuple[str, int], int] = {}
+
+        self._last_price: Dict[str, float] = {}
+        self._last_change: Dict[Tuple[str, int], float] = {}
+        # 计算涨跌幅用的近期价格
+        self._recent: Dict[str, PriceWindow] = {}
+
+        # 最近触发的 (owner, 事件)
+        self._events: Deque[Tuple[str, Dict]] = deque(maxlen=10000)
+        # owner -> 事件流订阅队列
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._webhook_queue: Optional[asyncio.Queue] = None
+        self._session: Optional[requests.Session] = None
+
+    def add_alert(
+        self,
+        crypto_id: str,
+        condition: str,
+        threshold: float,
+        window_minutes: Optional[int] = None,
+        webhook_url: Optional[str] = None,
+        owner: str = ""
+    ) -> Alert:
+        """
+        注册提醒
+
+        Args:
+            crypto_id: 加密货币ID
+            condition: above、below 或 change
+            threshold: 价格（above/below）或涨跌幅百分比（change）
+            window_minutes: change 提醒的时间窗口（分钟），最长 MAX_WINDOW_MINUTES
+            webhook_url: 触发时POST事件的地址（不在这里解析域名，见 check_webhook_url）
+            owner: 注册提醒的客户端标识
+
+        Raises:
+            ValueError: 参数不合法或提醒数量已达上限
+        """
+        self._expire(time.time())
+        if len(self._alerts) >= self.max_alerts:
+            raise ValueError("Too many alerts registered")
+        if self.max_alerts_per_client and self._owner_counts.get(owner, 0) >= self.max_alerts_per_client:
+            raise ValueError(f"At most {self.max_alerts_per_client} alerts per client")
+        if condition not in ("above", "below", "change"):
+            raise ValueError("condition must be above, below or change")
+        if condition == "change" and (not window_minutes or window_minutes <= 0 or threshold == 0):
+            raise ValueError("change alerts require a non-zero percent and a positive window_minutes")
+        if condition == "change" and window_minutes > MAX_WINDOW_MINUTES:
+            raise ValueError(f"window_minutes must not exceed {MAX_WINDOW_MINUTES}")
+        if webhook_url:
+            check_webhook_url(webhook_url, allow_private=self.allow_private_webhooks)
+
+        window = window_minutes * 60 if condition == "change" else 0
+        alert = Alert(crypto_id, condition, float(threshold), window, webhook_url or None, next(self._seq), owner, self.ttl)
+        self._alerts[alert.id] = alert
+        self._owner_counts[owner] = self._owner_counts.get(owner, 0) + 1
+        if alert.expires_at is not None:
+            self._expiry.append((alert.expires_at, alert.id))
+        self._index_for(alert).add(alert)
+        if condition == "change":
+            key = (crypto_id, window)
+            self._window_counts[key] = self._window_counts.get(key, 0) + 1
+            self._windows.setdefault(crypto_id, set()).add(window)
+        return alert
+
+    def get_alert(self, alert_id: str, owner: Optional[str] = None) -> Optional[Alert]:
+        """
+        查询提醒
+
+        Args:
+            owner: 只返回该客户端的提醒，None 表示不限
+        """
+        self._expire(time.time())
+        alert = self._alerts.get(alert_id)
+        if alert is None or (owner is not None and alert.owner != owner):
+            return None
+        return alert
+
+    def remove_alert(self, alert_id: str, owner: Optional[str] = None) -> bool:
+        """
+        删除提醒
+
+        Args:
+            owner: 只删除该客户端的提醒，None 表示不限
+        """
+        alert = self._alerts.get(alert_id)
+        if alert is None or (owner is not None and alert.owner != owner):
+            return False
+        indexes, key = self._slot(alert)
+        index = indexes.get(key)
+        if index is not None:
+            index.remove(alert)
+        self._pop(alert_id)
+        return True
+
+    def _pop(self, alert_id: str) -> Optional[Alert]:
+        """
+        从提醒表中移除
+
+        调用前提醒已经从阈值索引中取出；这里删除空的索引，
+        涨跌幅窗口的最后一个提醒移除后不再为该窗口保留价格和上次的涨跌幅。
+        """
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+
+        count = self._owner_counts[alert.owner] - 1
+        if count:
+            self._owner_counts[alert.owner] = count
+        else:
+            del self._owner_counts[alert.owner]
+
+        indexes, key = self._slot(alert)
+        index = indexes.get(key)
+        if index is not None and not len(index):
+            del indexes[key]
+
+        if alert.condition == "change":
+            key = (alert.crypto_id, alert.window)
+            count = self._window_counts[key] - 1
+            if count:
+                self._window_counts[key] = count
+            else:
+                del self._window_counts[key]
+                self._last_change.pop(key, None)
+                windows = self._windows[alert.crypto_id]
+                windows.discard(alert.window)
+                if not windows:
+                    del self._windows[alert.crypto_id]
+        return alert
+
+    def _expire(self, now: float):
+        """删除已过期的提醒；已触发或删除的提醒留在队列中的条目直接跳过"""
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            _, alert_id = expiry.popleft()
+            if self.remove_alert(alert_id):
+                self.expired += 1
+
+    def _slot(self, alert: Alert) -> Tuple[Dict, object]:
+        """提醒所在的索引表和键"""
+        if alert.condition == "above":
+            return self._above, alert.crypto_id
+        if alert.condition == "below":
+            return self._below, alert.crypto_id
+        key = (alert.crypto_id, alert.window)
+        return (self._rise if alert.threshold > 0 else self._fall), key
+
+    def _index_for(self, alert: Alert) -> ThresholdIndex:
+        indexes, key = self._slot(alert)
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = ThresholdIndex()
+        return index
+
+    def on_prices(self, quotes: Dict[str, Dict], timestamp: float):
+        """价格刷新回调：先删除过期的提醒，再匹配被穿过的阈值并发出事件"""
+        self._expire(time.time())
+        for crypto_id, quote in quotes.items():
+            price = quote["price_usd"]
+            old = self._last_price.get(crypto_id)
+            self._last_price[crypto_id] = price
+
+            if old is not None and price != old:
+                if price > old and crypto_id in self._above:
+                    self._fire(self._above[crypto_id].pop_crossed_up(old, price), price, timestamp)
+                elif price < old and crypto_id in self._below:
+                    self._fire(self._below[crypto_id].pop_crossed_down(old, price), price, timestamp)
+
+            self._check_changes(crypto_id, price, timestamp)
+
+    def _check_changes(self, crypto_id: str, price: float, timestamp: float):
+        # 触发的提醒可能移除窗口，遍历副本
+        windows = tuple(self._windows.get(crypto_id, ()))
+
+        recent = self._recent.get(crypto_id)
+        if recent is None:
+            recent = self._recent[crypto_id] = PriceWindow()
+        recent.append(timestamp, price)
+        # 保留覆盖最长窗口所需的最早一个点
+        recent.trim(timestamp - max(windows, default=0))
+
+        for window in windows:
+            reference = recent.at(timestamp - window)
+            if reference is None or reference <= 0:
+                continue
+
+            key = (crypto_id, window)
+            change = (price / reference - 1) * 100
+            old_change = self._last_change.get(key, 0.0)
+            self._last_change[key] = change
+
+            if change > old_change and key in self._rise:
+                self._fire(self._rise[key].pop_crossed_up(old_change, change), price, timestamp, change)
+            elif change < old_change and key in self._fall:
+                self._fire(self._fall[key].pop_crossed_down(old_change, change), price, timestamp, change)
+
+    def _fire(self, alert_ids: List[str], price: float, timestamp: float, change: Optional[float] = None):
+        for alert_id in alert_ids:
+            alert = self._pop(alert_id)
+            if alert is None:
+                continue
+
+            event = {
+                "alert": alert.to_dict(include_webhook=False),
+                "price_usd": price,
+                "change_percent": round(change, 4) if change is not None else None,
+                "triggered_at": timestamp
+            }
+            self._events.append((alert.owner, event))
+            for queue in self._subscribers.get(alert.owner, ()):
+                if not queue.full():
+                    queue.put_nowait(event)
+            if alert.webhook_url and self._webhook_queue is not None:
+                self._webhook_queue.put_nowait((alert.webhook_url, event))
+
+    def events(self, owner: str, limit: int = 100) -> List[Dict]:
+        """客户端最近触发的事件（按时间升序，最多 limit 个）"""
+        events = [event for event_owner, event in self._events if event_owner == owner]
+        return events[-max(1, limit):]
+
+    def subscribe(self, owner: str, maxsize: int = 1000) -> asyncio.Queue:
+        """订阅客户端自己的提醒触发的事件，返回的队列需要在结束时 unsubscribe"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.setdefault(owner, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, owner: str, queue: asyncio.Queue):
+        """取消订阅"""
+        queues = self._subscribers.get(owner)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[owner]
+
+    def stats(self) -> Dict:
+        """提醒统计"""
+        return {
+            "alerts": len(self._alerts),
+            "max_alerts": self.max_alerts,
+            "max_alerts_per_client": self.max_alerts_per_client,
+            "clients": len(self._owner_counts),
+            "expired": self.expired,
+            "change_windows": len(self._window_counts),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "pending_webhooks": self._webhook_queue.qsize() if self._webhook_queue is not None else 0
+        }
+
+    def _post_webhook(self, url: str, body: str) -> requests.Response:
+        # 域名在注册后可能改为解析到内网地址，投递前重新检查
+        check_webhook_url(url, resolve=True, allow_private=self.allow_private_webhooks)
+        return self._session.post(
+            url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=self.webhook_timeout,
+            allow_redirects=False
+        )
+
+    async def run_webhooks(self):
+        """webhook 投递循环，失败时重试一次（指向内网地址的不重试）"""
+        self._webhook_queue = asyncio.Queue()
+        self._session = requests.Session()
+        self._session.headers.update({'User-Agent': 'CryptoMarketBot/1.0'})
+        try:
+            while True:
+                url, event = await self._webhook_queue.get()
+                body = json.dumps(event)
+                for attempt in range(2):
+                    try:
+                        response = await asyncio.to_thread(self._post_webhook, url, body)
+                        response.raise_for_status()
+                        break
+                    except ValueError as e:
+                        print(f"Rejected alert webhook to {url}: {str(e)}")
+                        break
+                    except Exception as e:
+                        if attempt == 1:
+                            print(f"Error delivering alert webhook to {url}: {str(e)}")
+        finally:
+            self._session.close()
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.history_store import HistoryStore
+
+
+class RollingMoments:
+    """
+    多资产收益率的滚动一阶、二阶矩
+
+    维护窗口内每个资产收益率之和 S[i] 与两两乘积之和 SS[i][j]；
+    新的一行收益率进入窗口时加上，最旧的一行移出时减去，
+    协方差、相关系数和波动率都由这些和一次算出，不需要重新遍历窗口。
+    """
+
+    def __init__(self, assets: List[str], window: int):
+        self.assets = assets
+        self.size = len(assets)
+        self.window = window
+        self.rows: deque = deque()
+        self.sums = [0.0] * self.size
+        self.cross = [[0.0] * self.size for _ in range(self.size)]
+        self.last_bucket: Optional[int] = None
+        # 增量更新累计一定次数后整体重算，消除浮点误差累积
+        self._updates = 0
+
+    def push(self, bucket: int, row: Sequence[float]):
+        """加入一行收益率，超出窗口时移出最旧的一行"""
+        self._accumulate(row, 1.0)
+        self.rows.append(row)
+        self.last_bucket = bucket
+        if len(self.rows) > self.window:
+            self._accumulate(self.rows.popleft(), -1.0)
+
+        self._updates += 1
+        if self._updates >= 4 * self.window:
+            self._rebuild()
+
+    def _accumulate(self, row: Sequence[float], sign: float):
+        sums = self.sums
+        cross = self.cross
+        for i in range(self.size):
+            ri = row[i] * sign
+            sums[i] += ri
+            cross_i = cross[i]
+            for j in range(i, self.size):
+                cross_i[j] += ri * row[j]
+
+    def _rebuild(self):
+        self.sums = [0.0] * self.size
+        self.cross = [[0.0] * self.size for _ in range(self.size)]
+        for row in self.rows:
+            self._accumulate(row, 1.0)
+        self._updates = 0
+
+    def covariance(self) -> List[List[float]]:
+        """样本协方差矩阵"""
+        n = len(self.rows)
+        matrix = [[0.0] * self.size for _ in range(self.size)]
+        if n < 2:
+            return matrix
+        for i in range(self.size):
+            for j in range(i, self.size):
+                value = (self.cross[i][j] - self.sums[i] * self.sums[j] / n) / (n - 1)
+                matrix[i][j] = matrix[j][i] = value
+        return matrix
+
+
+class AnalyticsService:
+    """
+    跨资产分析：滚动相关系数、协方差和年化波动率
+
+    所有资产的历史序列重采样到同一周期并按周期编号对齐，只使用已经收盘的K线；
+    每个 (周期, 窗口) 维护一个 RollingMoments，有新K线收盘时只增量加入新的收益率行，
+    数据没有变化时直接返回缓存结果。
+    """
+
+    def __init__(self, history: HistoryStore, crypto_ids: List[str]):
+        self.history = history
+        self.crypto_ids = list(crypto_ids)
+        # 集群节点（src.cluster），设置后其他节点负责的资产的K线从负责节点读取
+        self.cluster = None
+        self._moments: Dict[Tuple[int, int], RollingMoments] = {}
+        self._results: Dict[Tuple[int, int], Tuple[Tuple, Dict]] = {}
+        self._lock = asyncio.Lock()
+
+    async def local_bars(self, crypto_id: str, bar_seconds: int, count: int) -> Optional[Dict]:
+        """
+        本节点加载的资产的K线（集群模式下供其他节点的跨资产分析读取）
+
+        Returns:
+            {"version": 数据版本, "buckets": 周期编号列表, "closes": 收盘价列表}，没有数据时返回None
+        """
+        series = await self.history.get_series(crypto_id)
+        if series is None:
+            return None
+        buckets, closes = self.history.resample_bars(crypto_id, series, bar_seconds, count)
+        return {"version": series.version, "buckets": buckets, "closes": closes}
+
+    async def _bars(self, crypto_id: str, bar_seconds: int, count: int) -> Optional[Dict]:
+        """
+        资产的K线，格式同 local_bars
+
+        集群模式下其他节点负责的资产向负责节点读取，不在本节点加载历史序列；
+        负责节点不可达时本次计算跳过该资产。
+        """
+        cluster = self.cluster
+        if cluster is None or cluster.owns(crypto_id):
+            return await self.local_bars(crypto_id, bar_seconds, count)
+
+        node_id, _ = cluster.owner(crypto_id)
+        try:
+            status, body = await cluster.forward(
+                crypto_id,
+                f"/api/v1/cluster/bars/{crypto_id}",
+                {"bar_seconds": bar_seconds, "count": count}
+            )
+        except Exception as e:
+            print(f"Error fetching bars for {crypto_id} from shard owner: {str(e)}")
+            return None
+        if status != 200:
+            return None
+        bars = json.loads(body)["data"]
+        # 各节点的版本号独立递增，带上节点ID以免负责节点变化后误用缓存结果
+        bars["version"] = (node_id, bars["version"])
+        return bars
+
+    async def _load_aligned(self, bar_seconds: int, window: int):
+        """
+        加载所有资产并按周期对齐
+
+        Returns:
+            (有数据的资产ID列表, 各资产数据版本, 对齐后的周期编号, 每个资产对应的收盘价列表)
+        """
+        bars_list = await asyncio.gather(
+            *(self._bars(crypto_id, bar_seconds, window + 2) for crypto_id in self.crypto_ids)
+        )
+
+        # 当前周期尚未收盘，不参与计算
+        current_bucket = int(time.time()) // bar_seconds
+        assets = []
+        versions = []
+        bars = []
+        for crypto_id, asset_bars in zip(self.crypto_ids, bars_list):
+            if asset_bars is None:
+                continue
+            buckets, closes = asset_bars["buckets"], asset_bars["closes"]
+            closes_by_bucket = {
+                bucket: close for bucket, close in zip(buckets, closes) if bucket < current_bucket
+            }
+            if len(closes_by_bucket) < 2:
+                continue
+            assets.append(crypto_id)
+            versions.append(asset_bars["version"])
+            bars.append(closes_by_bucket)
+
+        if not bars:
+            return [], (), [], []
+
+        common = sorted(set.intersection(*(set(b) for b in bars)))
+        aligned = [[closes_by_bucket[bucket] for bucket in common] for closes_by_bucket in bars]
+        return assets, tuple(versions), common, aligned
+
+    def _push_new_rows(self, moments: RollingMoments, buckets: List[int], aligned: List[List[float]]):
+        """把上次计算之后新收盘的K线转换成对数收益率行，加入滚动窗口"""
+        for k in range(1, len(buckets)):
+            bucket = buckets[k]
+            if moments.last_bucket is not None and bucket <= moments.last_bucket:
+                continue
+            row = []
+            for closes in aligned:
+                previous, current = closes[k - 1], closes[k]
+                row.append(math.log(current / previous) if previous > 0 and current > 0 else 0.0)
+            moments.push(bucket, row)
+
+    async def correlation(self, bar_seconds: int, window: int) -> Dict:
+        """
+        滚动相关系数和协方差矩阵
+
+        Args:
+            bar_seconds: 收益率周期（秒）
+            window: 窗口内的收益率个数
+
+        Returns:
+            {"assets", "observations", "correlation", "covariance"}
+        """
+        return (await self._compute(bar_seconds, window))["correlation"]
+
+    async def volatility(self, bar_seconds: int, window: int) -> Dict:
+        """
+        每个资产的年化波动率
+
+        Returns:
+            {"observations", "assets": {crypto_id: {"volatility", "mean_return"}}}
+        """
+        return (await self._compute(bar_seconds, window))["volatility"]
+
+    async def _compute(self, bar_seconds: int, window: int) -> Dict:
+        async with self._lock:
+            assets, versions, buckets, aligned = await self._load_aligned(bar_seconds, window)
+            key = (bar_seconds, window)
+            state = (tuple(assets), versions)
+
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+
+            moments = self._moments.get(key)
+            if moments is None or moments.assets != assets:
+                moments = RollingMoments(assets, window)
+                self._moments[key] = moments
+            self._push_new_rows(moments, buckets, aligned)
+
+            result = self._build_result(moments, bar_seconds)
+            self._results[key] = (state, result)
+            return result
+
+    def _build_result(self, moments: RollingMoments, bar_seconds: int) -> Dict:
+        assets = moments.assets
+        n = len(moments.rows)
+        covariance = moments.covariance()
+        std = [math.sqrt(max(covariance[i][i], 0.0)) for i in range(len(assets))]
+        correlation = [
+            [
+                covariance[i][j] / (std[i] * std[j]) if std[i] > 0 and std[j] > 0 else (1.0 if i == j else 0.0)
+                for j in range(len(assets))
+            ]
+            for i in range(len(assets))
+        ]
+
+        # 加密货币全年交易，按365天年化
+        periods_per_year = 365 * 86400 / bar_seconds
+        return {
+            "correlation": {
+                "assets": assets,
+                "observations": n,
+                "correlation": [[round(value, 4) for value in row] for row in correlation],
+                "covariance": [[round(value, 8) for value in row] for row in covariance]
+            },
+            "volatility": {
+                "observations": n,
+                "assets": {
+                    crypto_id: {
+                        "volatility": round(std[i] * math.sqrt(periods_per_year), 4),
+                        "mean_return": round(moments.sums[i] / n, 6) if n else 0.0
+                    }
+                    for i, crypto_id in enumerate(assets)
+                }
+            }
+        }
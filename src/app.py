@@ -0,0 +1,74 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from src.config import API_ROOT_PATH, CACHE_TTL, COMPRESSION_MIN_SIZE, COMPRESSION_CACHE_BYTES
+from src.compression import CompressionMiddleware
+from src.rate_limit import RateLimitMiddleware
+from src.routes import router
+from src.services import Services
+
+
+def create_app(
+    cache_backend: Optional[str] = None,
+    provider: Optional[str] = None,
+    title: str = "Crypto Market Data API",
+    description: str = "实时加密货币市场价格查询API",
+    service_name: str = "crypto-market-api",
+    root_path: str = API_ROOT_PATH
+) -> FastAPI:
+    """
+    创建API应用
+
+    Args:
+        cache_backend: 缓存后端 (redis, memory, tiered)，默认读取 CACHE_BACKEND 配置
+        provider: 上游数据源 (coincap, coingecko)，默认读取 MARKET_PROVIDER 配置
+        title: 文档标题
+        description: 文档描述
+        service_name: 健康检查中返回的服务名
+        root_path: 反向代理下的路径前缀
+
+    Returns:
+        FastAPI应用；服务实例在应用启动时创建，导入和创建应用本身不会建立外部连接
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        services = Services(cache_backend=cache_backend, provider=provider)
+        app.state.services = services
+        await services.start()
+        yield
+        await services.close()
+
+    app = FastAPI(
+        title=title,
+        description=description,
+        version="1.0.0",
+        root_path=root_path,
+        lifespan=lifespan
+    )
+    app.state.service_name = service_name
+
+    # CORS中间件配置
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # 响应压缩（gzip/brotli/zstd）
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        cache_bytes=COMPRESSION_CACHE_BYTES,
+        cache_ttl=CACHE_TTL
+    )
+
+    # 限流（最外层，超限的请求不进入后续处理）
+    app.add_middleware(RateLimitMiddleware)
+
+    app.include_router(router)
+    return app
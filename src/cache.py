@@ -1,13 +1,30 @@
 import json
-import redis
 from typing import Optional, Dict, Any
-from src.config import REDIS_URL, CACHE_TTL
+from src.config import (
+    CACHE_BACKEND,
+    REDIS_URL,
+    CACHE_TTL,
+    MEMORY_CACHE_MAX_ENTRIES,
+    MEMORY_CACHE_MAX_BYTES,
+    MEMORY_CACHE_SWEEP_INTERVAL,
+    TIERED_L1_TTL
+)
+from src.memory_cache import MemoryCache
 
 
 class CacheManager:
-    def __init__(self):
-        self.redis_client = redis.from_url(REDIS_URL)
-        self.default_ttl = CACHE_TTL
+    def __init__(self, redis_url: str = REDIS_URL, default_ttl: int = CACHE_TTL):
+        self.redis_url = redis_url
+        self.default_ttl = default_ttl
+        self._redis_client = None
+
+    @property
+    def redis_client(self):
+        """Redis客户端，首次使用时才导入redis并建立连接池"""
+        if self._redis_client is None:
+            import redis
+            self._redis_client = redis.from_url(self.redis_url)
+        return self._redis_client
 
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """从缓存获取数据"""
@@ -37,6 +54,92 @@ class CacheManager:
         except Exception:
             return False
 
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        return {"backend": "redis", "url": self.redis_url.rsplit("@", 1)[-1]}
+
+    def close(self):
+        """释放Redis连接池"""
+        if self._redis_client is not None:
+            self._redis_client.close()
+            self._redis_client = None
+
+
+class TieredCache:
+    """
+    两级缓存：进程内 MemoryCache 在前，Redis 在后
+
+    读取先查本地，未命中再查Redis并回填本地（本地TTL较短，
+    保证多实例之间的数据不会长时间不一致）；写入和删除同时作用于两级。
+    """
+
+    def __init__(self, local: MemoryCache, remote: CacheManager, local_ttl: int = TIERED_L1_TTL):
+        self.local = local
+        self.remote = remote
+        self.local_ttl = local_ttl
+        self.default_ttl = remote.default_ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """从缓存获取数据"""
+        data = self.local.get(key)
+        if data is not None:
+            return data
+        data = self.remote.get(key)
+        if data is not None:
+            self.local.set(key, data, self.local_ttl)
+        return data
+
+    def set(self, key: str, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """设置缓存数据"""
+        ttl = ttl or self.default_ttl
+        self.local.set(key, data, min(ttl, self.local_ttl))
+        return self.remote.set(key, data, ttl)
+
+    def delete(self, key: str) -> bool:
+        """删除缓存数据"""
+        self.local.delete(key)
+        return self.remote.delete(key)
+
+    def start_sweeper(self):
+        """启动本地缓存的后台清理线程"""
+        self.local.start_sweeper()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        return {"backend": "tiered", "local": self.local.stats(), "remote": self.remote.stats()}
+
+    def close(self):
+        """释放资源"""
+        self.local.close()
+        self.remote.close()
+
+
+def create_memory_cache() -> MemoryCache:
+    """按配置创建进程内缓存"""
+    return MemoryCache(
+        max_entries=MEMORY_CACHE_MAX_ENTRIES,
+        max_bytes=MEMORY_CACHE_MAX_BYTES,
+        default_ttl=CACHE_TTL,
+        sweep_interval=MEMORY_CACHE_SWEEP_INTERVAL
+    )
+
+
+def create_cache(backend: Optional[str] = None):
+    """
+    按名称创建缓存后端
+
+    Args:
+        backend: redis（默认）、memory（无Redis部署）或 tiered（本地+Redis两级）；
+            默认读取 CACHE_BACKEND 配置
 
-# 创建全局缓存实例
-cache_manager = CacheManager()
\ No newline at end of file
+    Returns:
+        实现 get/set/delete/stats/close 的缓存实例
+    """
+    backend = (backend or CACHE_BACKEND).lower()
+    if backend == "redis":
+        return CacheManager()
+    if backend == "memory":
+        return create_memory_cache()
+    if backend == "tiered":
+        return TieredCache(create_memory_cache(), CacheManager())
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,255 @@
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# 支持的K线周期（秒）
+RESOLUTIONS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+    "1w": 604800,
+}
+
+# Unix纪元是周四，周线向后偏移4天，从周一 00:00 UTC 开始
+WEEK_OFFSET = 4 * 86400
+
+
+class CandleSeries:
+    """
+    单个资产、单个周期的K线环形缓冲区
+
+    开盘时间和OHLCV分别存放在定长 array 中，写满后覆盖最旧的K线，
+    内存占用固定为 capacity * 48 字节。
+    """
+
+    __slots__ = ("step", "offset", "capacity", "start", "open", "high", "low", "close", "volume", "head", "count")
+
+    def __init__(self, step: int, capacity: int):
+        self.step = step
+        self.offset = WEEK_OFFSET if step == RESOLUTIONS["1w"] else 0
+        self.capacity = capacity
+        self.start = array("q", bytes(8 * capacity))
+        self.open = array("d", bytes(8 * capacity))
+        self.high = array("d", bytes(8 * capacity))
+        self.low = array("d", bytes(8 * capacity))
+        self.close = array("d", bytes(8 * capacity))
+        self.volume = array("d", bytes(8 * capacity))
+        self.head = 0  # 下一根新K线写入的位置
+        self.count = 0
+
+    def bucket_start(self, timestamp: float) -> int:
+        """时间戳所在K线的开盘时间"""
+        return int((timestamp - self.offset) // self.step) * self.step + self.offset
+
+    def add(self, timestamp: float, price: float, volume: float = 0.0) -> bool:
+        """
+        写入一个价格tick
+
+        Returns:
+            是否被接受；早于最新K线的乱序tick会被丢弃
+        """
+        bucket = self.bucket_start(timestamp)
+
+        if self.count:
+            last = (self.head - 1) % self.capacity
+            last_start = self.start[last]
+            if bucket == last_start:
+                if price > self.high[last]:
+                    self.high[last] = price
+                if price < self.low[last]:
+                    self.low[last] = price
+                self.close[last] = price
+                self.volume[last] += volume
+                return True
+            if bucket < last_start:
+                return False
+
+        i = self.head
+        self.start[i] = bucket
+        self.open[i] = self.high[i] = self.low[i] = self.close[i] = price
+        self.volume[i] = volume
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return True
+
+    def _indices(self) -> List[int]:
+        """已写入K线在缓冲区中的位置，按时间升序"""
+        first = (self.head - self.count) % self.capacity
+        return [(first + k) % self.capacity for k in range(self.count)]
+
+    def backfill(self, ticks: Iterable[Tuple[float, float]]) -> bool:
+        """
+        用历史tick回填已有K线之前的部分
+
+        早于最早一根K线的tick聚合成新的K线插到前面（总数超过容量时丢弃最旧的）；落在最早一根K线内的tick
+        只更新开盘、最高和最低价，不覆盖实时报价写入的收盘价；与已有K线重叠的其余tick被忽略，
+        晚于最新K线的tick按 add 写入。
+
+        Args:
+            ticks: 按时间升序的 (时间戳, 价格)
+
+        Returns:
+            是否有tick被接受
+        """
+        if not self.count:
+            accepted = False
+            for timestamp, price in ticks:
+                accepted = self.add(timestamp, price) or accepted
+            return accepted
+
+        first = (self.head - self.count) % self.capacity
+        first_start = self.start[first]
+        last_start = self.start[(self.head - 1) % self.capacity]
+        older = CandleSeries(self.step, self.capacity)
+        opened = False
+        accepted = False
+        for timestamp, price in ticks:
+            bucket = self.bucket_start(timestamp)
+            if bucket < first_start:
+                accepted = older.add(timestamp, price) or accepted
+            elif bucket == first_start:
+                if not opened:
+                    self.open[first] = price
+                    opened = True
+                if price > self.high[first]:
+                    self.high[first] = price
+                if price < self.low[first]:
+                    self.low[first] = price
+                accepted = True
+            elif bucket > last_start:
+                accepted = self.add(timestamp, price) or accepted
+                last_start = bucket
+
+        if older.count:
+            rows = [(older, i) for i in older._indices()] + [(self, i) for i in self._indices()]
+            rows = [
+                (series.start[i], series.open[i], series.high[i], series.low[i], series.close[i], series.volume[i])
+                for series, i in rows[-self.capacity:]
+            ]
+            for k, (start, open_, high, low, close, volume) in enumerate(rows):
+                self.start[k] = start
+                self.open[k] = open_
+                self.high[k] = high
+                self.low[k] = low
+                self.close[k] = close
+                self.volume[k] = volume
+            self.count = len(rows)
+            self.head = self.count % self.capacity
+        return accepted
+
+    def latest(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        最近的K线，按时间升序
+
+        Args:
+            limit: 最多返回的数量，默认全部
+        """
+        n = self.count if limit is None else max(0, min(limit, self.count))
+        first = (self.head - n) % self.capacity
+        candles = []
+        for k in range(n):
+            i = (first + k) % self.capacity
+            candles.append({
+                "time": self.start[i] * 1000,
+                "open": self.open[i],
+                "high": self.high[i],
+                "low": self.low[i],
+                "close": self.close[i],
+                "volume": self.volume[i]
+            })
+        return candles
+
+
+class CandleAggregator:
+    """
+    从价格tick实时聚合多周期K线
+
+    每个资产在每个周期上维护一个 CandleSeries；tick 来自价格轮询，
+    启动时可以用上游历史数据回填，之后的K线查询全部在内存中完成。
+    """
+
+    def __init__(self, capacity: int = 1000, resolutions: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.resolutions = dict(resolutions or RESOLUTIONS)
+        self._series: Dict[str, Dict[str, CandleSeries]] = {}
+        # 每个资产每写入一次tick加一，供下游判断数据是否有更新
+        self.versions: Dict[str, int] = {}
+
+    def _asset_series(self, crypto_id: str) -> Dict[str, CandleSeries]:
+        series = self._series.get(crypto_id)
+        if series is None:
+            series = {
+                name: CandleSeries(step, self.capacity)
+                for name, step in self.resolutions.items()
+            }
+            self._series[crypto_id] = series
+        return series
+
+    def add_tick(self, crypto_id: str, price: float, timestamp: Optional[float] = None, volume: float = 0.0):
+        """
+        写入一个价格tick，同时更新所有周期的K线
+
+        Args:
+            crypto_id: 加密货币ID
+            price: 价格（USD）
+            timestamp: Unix时间戳（秒），默认当前时间
+            volume: 该tick的成交量，没有时为0
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        accepted = False
+        for series in self._asset_series(crypto_id).values():
+            accepted = series.add(timestamp, price, volume) or accepted
+        if accepted:
+            self.versions[crypto_id] = self.versions.get(crypto_id, 0) + 1
+
+    def on_prices(self, quotes: Dict[str, Dict], timestamp: float):
+        """价格刷新回调：把一批报价作为tick写入"""
+        for crypto_id, quote in quotes.items():
+            self.add_tick(crypto_id, quote["price_usd"], timestamp)
+
+    def seed(self, crypto_id: str, points: Iterable[Dict], step: int):
+        """
+        用上游历史数据回填
+
+        只写入周期不小于数据间隔的K线，避免把小时数据当成分钟K线。实时报价已经写入K线时，
+        历史数据插到已有K线之前，不覆盖实时的收盘价（见 CandleSeries.backfill）。
+
+        Args:
+            crypto_id: 加密货币ID
+            points: 按时间升序的 [{"priceUsd": ..., "time": 毫秒时间戳}]
+            step: 历史数据的间隔（秒）
+        """
+        ticks = [
+            (point['time'] / 1000, float(point['priceUsd']))
+            for point in points
+            if 'priceUsd' in point and 'time' in point
+        ]
+        accepted = False
+        for series in self._asset_series(crypto_id).values():
+            if series.step >= step:
+                accepted = series.backfill(ticks) or accepted
+        if accepted:
+            self.versions[crypto_id] = self.versions.get(crypto_id, 0) + 1
+
+    def get_candles(self, crypto_id: str, resolution: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        查询K线
+
+        Args:
+            crypto_id: 加密货币ID
+            resolution: 周期，见 RESOLUTIONS
+            limit: 最多返回的数量
+
+        Returns:
+            按时间升序的K线列表，没有数据时为空列表
+        """
+        series = self._series.get(crypto_id)
+        if series is None or resolution not in series:
+            return []
+        return series[resolution].latest(limit)
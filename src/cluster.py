@@ -0,0 +1,340 @@
+import asyncio
+import bisect
+import hashlib
+import hmac
+import time
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+
+
+# 转发请求带上发出转发的节点ID；收到带该请求头的请求一律在本地处理，节点间的环视图短暂不一致时也不会来回转发
+FORWARDED_HEADER = "X-Cluster-Node"
+# 转发请求带上集群密钥，持有正确密钥的请求不再限流（入口节点已经扣过令牌）
+TOKEN_HEADER = "X-Cluster-Token"
+# 转发请求带上入口节点识别的客户端标识（见 src.rate_limit.client_identity），只在集群密钥正确时采信
+CLIENT_HEADER = "X-Cluster-Client"
+
+# 节点心跳：按Redis服务器时间记录到期时间，多个节点之间不受本机时钟差异影响
+HEARTBEAT_SCRIPT = """
+local now = redis.call('TIME')
+local expires = tonumber(now[1]) + tonumber(now[2]) / 1000000 + tonumber(ARGV[3])
+redis.call('ZADD', KEYS[1], expires, ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+return 1
+"""
+
+# 列出存活节点，同时清理心跳过期的节点
+MEMBERS_SCRIPT = """
+local now = redis.call('TIME')
+local t = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', t)
+if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', t)
+    redis.call('HDEL', KEYS[2], unpack(expired))
+end
+local result = {}
+for _, node in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    local url = redis.call('HGET', KEYS[2], node)
+    if url then
+        result[#result + 1] = node
+        result[#result + 1] = url
+    end
+end
+return result
+"""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    一致性哈希环
+
+    每个节点在环上放 replicas 个虚拟节点，键归属于顺时针方向的第一个虚拟节点。
+    增加或移除一个节点只移动约 1/N 的键，其余键的归属不变。
+
+    Args:
+        nodes: 节点ID
+        replicas: 每个节点的虚拟节点数，越多负载越均匀
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 128):
+        self.replicas = replicas
+        self.nodes: Set[str] = set(nodes)
+        points = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """键所属的节点，环为空时返回None"""
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, _hash(key))
+        return self._owners[i % len(self._owners)]
+
+
+class MemoryMembership:
+    """
+    进程内的成员表
+
+    没有Redis时使用：单节点运行，或同一进程中的多个应用实例（测试）共享默认的成员表。
+    """
+
+    _default: Dict[str, Tuple[str, float]] = {}
+
+    def __init__(self, registry: Optional[Dict[str, Tuple[str, float]]] = None):
+        self.registry = self._default if registry is None else registry
+
+    async def heartbeat(self, node_id: str, url: str, ttl: float):
+        self.registry[node_id] = (url, time.monotonic() + ttl)
+
+    async def members(self) -> Dict[str, str]:
+        now = time.monotonic()
+        for node_id in [node_id for node_id, (_, expires) in self.registry.items() if expires <= now]:
+            del self.registry[node_id]
+        return {node_id: url for node_id, (url, _) in self.registry.items()}
+
+    async def leave(self, node_id: str):
+        self.registry.pop(node_id, None)
+
+
+class RedisMembership:
+    """
+    基于Redis的成员表
+
+    有序集合保存每个节点的心跳到期时间，哈希表保存节点地址；心跳超过 ttl 秒没有更新的节点被移除。
+
+    Args:
+        redis_client: 返回Redis客户端的函数（首次使用时才建立连接）
+        key_prefix: 键名前缀
+    """
+
+    def __init__(self, redis_client: Callable, key_prefix: str = "cluster:"):
+        self._redis_client = redis_client
+        self.keys = [f"{key_prefix}nodes", f"{key_prefix}urls"]
+        self._heartbeat = None
+        self._members = None
+
+    def _heartbeat_sync(self, node_id: str, url: str, ttl: float):
+        if self._heartbeat is None:
+            self._heartbeat = self._redis_client().register_script(HEARTBEAT_SCRIPT)
+        self._heartbeat(keys=self.keys, args=[node_id, url, ttl])
+
+    def _members_sync(self) -> Dict[str, str]:
+        if self._members is None:
+            self._members = self._redis_client().register_script(MEMBERS_SCRIPT)
+        flat = self._members(keys=self.keys)
+        return {
+            flat[i].decode("utf-8"): flat[i + 1].decode("utf-8")
+            for i in range(0, len(flat), 2)
+        }
+
+    def _leave_sync(self, node_id: str):
+        client = self._redis_client()
+        client.zrem(self.keys[0], node_id)
+        client.hdel(self.keys[1], node_id)
+
+    async def heartbeat(self, node_id: str, url: str, ttl: float):
+        await asyncio.to_thread(self._heartbeat_sync, node_id, url, ttl)
+
+    async def members(self) -> Dict[str, str]:
+        return await asyncio.to_thread(self._members_sync)
+
+    async def leave(self, node_id: str):
+        await asyncio.to_thread(self._leave_sync, node_id)
+
+
+def create_membership(cache):
+    """按缓存后端创建成员表：redis / tiered 使用Redis，memory 使用进程内成员表"""
+    remote = getattr(cache, "remote", cache)
+    if hasattr(remote, "redis_client"):
+        return RedisMembership(lambda: remote.redis_client)
+    return MemoryMembership()
+
+
+class ClusterNode:
+    """
+    集群中的一个节点
+
+    每个资产的历史序列、指标和预测只由一致性哈希环上的一个节点负责。节点定期在成员表中续期心跳并读取
+    存活节点，节点集合变化时重建哈希环，并用本节点负责的资产集合调用 on_rebalance
+    （加载新分到的资产、释放不再负责的资产）。其他节点负责的资产的请求通过 forward / forward_stream
+    转发给负责节点。
+
+    Args:
+        node_id: 节点ID，集群内唯一
+        url: 其他节点访问本节点使用的地址（如 http://10.0.0.5:8000）
+        membership: 成员表（MemoryMembership / RedisMembership）
+        keys: 参与分片的资产ID
+        heartbeat_interval: 心跳间隔（秒）
+        node_ttl: 心跳超过该时间没有续期的节点视为离开（秒）
+        replicas: 每个节点的虚拟节点数
+        secret: 集群密钥（必填），转发的请求带上它，负责节点据此采信转发的请求头且不重复限流
+        forward_timeout: 转发请求的超时（秒）
+        on_rebalance: 哈希环变化后的回调，参数为本节点负责的资产ID集合
+    """
+
+    def __init__(
+        self,
+        node_id: str,
+        url: str,
+        membership,
+        keys: Iterable[str],
+        heartbeat_interval: float = 5,
+        node_ttl: float = 15,
+        replicas: int = 128,
+        secret: str = "",
+        forward_timeout: float = 10,
+        on_rebalance: Optional[Callable[[Set[str]], None]] = None
+    ):
+        if not secret:
+            raise ValueError("Cluster mode requires a shared secret (CLUSTER_SECRET)")
+        self.node_id = node_id
+        self.url = url.rstrip("/")
+        self.membership = membership
+        self.keys = list(keys)
+        self.heartbeat_interval = heartbeat_interval
+        self.node_ttl = node_ttl
+        self.replicas = replicas
+        self.secret = secret
+        self.forward_timeout = forward_timeout
+        self.on_rebalance = on_rebalance
+
+        # 加入集群之前本节点负责全部资产
+        self.members: Dict[str, str] = {node_id: self.url}
+        self.ring = HashRing([node_id], replicas)
+        self.owned: Set[str] = set(self.keys)
+        self.rebalances = 0
+        self.forwarded = 0
+        self.forward_errors = 0
+
+        self.session = requests.Session()
+        self.session.headers.update({FORWARDED_HEADER: node_id, TOKEN_HEADER: secret})
+
+    def owner(self, key: str) -> Tuple[str, str]:
+        """资产所属节点的 (ID, 地址)"""
+        node_id = self.ring.owner(key)
+        return node_id, self.members[node_id]
+
+    def owns(self, key: str) -> bool:
+        return self.ring.owner(key) == self.node_id
+
+    def is_internal(self, headers) -> bool:
+        """请求是否由持有集群密钥的节点转发"""
+        token = headers.get(TOKEN_HEADER)
+        return bool(token and hmac.compare_digest(token, self.secret))
+
+    async def join(self):
+        """注册心跳并按当前成员重建哈希环"""
+        await self.membership.heartbeat(self.node_id, self.url, self.node_ttl)
+        members = await self.membership.members()
+        members[self.node_id] = self.url
+        if members == self.members:
+            return
+
+        self.members = members
+        self.ring = HashRing(members, self.replicas)
+        owned = {key for key in self.keys if self.ring.owner(key) == self.node_id}
+        changed = owned != self.owned
+        self.owned = owned
+        self.rebalances += 1
+        if changed and self.on_rebalance is not None:
+            self.on_rebalance(owned)
+
+    async def run(self):
+        """心跳循环；成员表不可用时保留上一次的哈希环"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.join()
+            except Exception as e:
+                print(f"Error updating cluster membership: {str(e)}")
+
+    async def forward(self, key: str, path: str, params: Dict, headers: Optional[Dict] = None) -> Tuple[int, bytes]:
+        """
+        把请求转发给资产的负责节点
+
+        Returns:
+            (状态码, 响应体)
+
+        Raises:
+            requests.RequestException: 负责节点不可达
+        """
+        _, url = self.owner(key)
+        self.forwarded += 1
+        try:
+            response = await asyncio.to_thread(
+                self.session.get, f"{url}{path}", params=params, headers=headers, timeout=self.forward_timeout
+            )
+        except Exception:
+            self.forward_errors += 1
+            raise
+        return response.status_code, response.content
+
+    async def forward_stream(
+        self,
+        key: str,
+        path: str,
+        params: Dict,
+        headers: Optional[Dict] = None,
+        chunk_size: int = 64 * 1024
+    ) -> Tuple[int, Dict[str, str], AsyncIterator[bytes]]:
+        """
+        转发请求并流式读取响应（用于导出等大响应），不在本节点缓存整个响应体
+
+        Returns:
+            (状态码, 响应头, 响应体的异步迭代器)
+        """
+        _, url = self.owner(key)
+        self.forwarded += 1
+        try:
+            response = await asyncio.to_thread(
+                self.session.get, f"{url}{path}", params=params, headers=headers,
+                timeout=self.forward_timeout, stream=True
+            )
+        except Exception:
+            self.forward_errors += 1
+            raise
+
+        async def body() -> AsyncIterator[bytes]:
+            chunks = response.iter_content(chunk_size)
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                response.close()
+
+        return response.status_code, dict(response.headers), body()
+
+    async def close(self):
+        """离开集群，其他节点在下一次心跳时接管本节点的资产"""
+        try:
+            await self.membership.leave(self.node_id)
+        except Exception as e:
+            print(f"Error leaving cluster: {str(e)}")
+        self.session.close()
+
+    def stats(self) -> Dict:
+        """成员、本节点负责的资产和转发计数"""
+        shards: Dict[str, List[str]] = {node_id: [] for node_id in self.members}
+        for key in self.keys:
+            shards[self.ring.owner(key)].append(key)
+        return {
+            "node_id": self.node_id,
+            "members": self.members,
+            "shards": shards,
+            "owned": sorted(self.owned),
+            "rebalances": self.rebalances,
+            "forwarded": self.forwarded,
+            "forward_errors": self.forward_errors
+        }
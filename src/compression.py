@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.memory_cache import MemoryCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _compress_gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def _compress_brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=5)
+
+
+def _compress_zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+
+# 服务端偏好顺序：客户端q值相同时依次选择
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS["br"] = _compress_brotli
+if zstandard is not None:
+    COMPRESSORS["zstd"] = _compress_zstd
+COMPRESSORS["gzip"] = _compress_gzip
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson")
+
+
+def negotiate_encoding(accept_encoding: str, available: Optional[List[str]] = None) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择压缩算法
+
+    Args:
+        accept_encoding: 请求头的值，如 "gzip, br;q=0.9"
+        available: 可用的编码，默认为已安装的全部编码
+
+    Returns:
+        选中的编码，客户端不接受任何可用编码时返回None
+    """
+    available = available if available is not None else list(COMPRESSORS)
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    响应压缩中间件（ASGI）
+
+    - 按 Accept-Encoding 协商 br / zstd / gzip（brotli、zstandard 未安装时自动跳过）
+    - 小于 minimum_size 的响应、流式响应和已编码的响应原样返回
+    - 压缩结果按 (编码, 响应体摘要) 缓存，缓存命中的数据重复返回时只需计算一次哈希
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, cache_bytes: int = 8 * 1024 * 1024, cache_ttl: int = 300):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = MemoryCache(max_entries=4096, max_bytes=cache_bytes, default_ttl=cache_ttl)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """压缩响应体，相同内容只压缩一次"""
+        cache_key = f"{encoding}:{hashlib.blake2b(body, digest_size=16).hexdigest()}"
+        compressed = self.cache.get(cache_key)
+        if compressed is None:
+            compressed = COMPRESSORS[encoding](body)
+            self.cache.set(cache_key, compressed)
+        return compressed
@@ -1,6 +1,9 @@
 import os
 from dotenv import load_dotenv
 
+# 支持的加密货币定义在 src.constants，客户端可以不经配置加载直接导入
+from src.constants import SUPPORTED_CRYPTO, CRYPTO_SYMBOLS  # noqa: F401
+
 load_dotenv()
 
 # API配置
@@ -9,36 +12,97 @@ API_PORT = int(os.getenv("API_PORT", 8000))
 API_ROOT_PATH = os.getenv("API_ROOT_PATH", "")
 
 # 缓存配置
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis")  # redis, memory, tiered
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CACHE_TTL = int(os.getenv("CACHE_TTL", 300))  # 5分钟缓存
+ADAPTIVE_TTL = os.getenv("ADAPTIVE_TTL", "true").lower() in ("1", "true", "yes")  # 按访问频率和波动率调整TTL
+UPSTREAM_CALL_BUDGET = float(os.getenv("UPSTREAM_CALL_BUDGET", 60))  # 上游调用预算（次/分钟）
+
+# 上游刷新方式：scheduled 由调度器按预算集中刷新，请求只读缓存；on_demand 在缓存未命中时请求上游
+REFRESH_MODE = os.getenv("REFRESH_MODE", "scheduled")
+REFRESH_MIN_INTERVAL = float(os.getenv("REFRESH_MIN_INTERVAL", 10))  # 批量报价的最短刷新间隔（秒）
+
+# 进程内缓存配置（无Redis部署）
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", 1024))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", 16 * 1024 * 1024))  # 16MB
+MEMORY_CACHE_SWEEP_INTERVAL = float(os.getenv("MEMORY_CACHE_SWEEP_INTERVAL", 30))  # 秒
+TIERED_L1_TTL = int(os.getenv("TIERED_L1_TTL", 30))  # 两级缓存中本地一级缓存的TTL
+
+# 响应压缩配置
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # 小于该字节数的响应不压缩
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", 8 * 1024 * 1024))  # 压缩结果缓存上限
+
+# K线聚合配置
+CANDLE_POLL_INTERVAL = float(os.getenv("CANDLE_POLL_INTERVAL", 60))  # on_demand 模式的价格轮询间隔（秒），0表示不轮询
+CANDLE_CAPACITY = int(os.getenv("CANDLE_CAPACITY", 1000))  # 每个周期保留的K线数量
+CANDLE_SEED_HOURS = int(os.getenv("CANDLE_SEED_HOURS", 168))  # 启动时用多少小时的历史数据回填，0表示不回填
+TICK_CAPACITY = int(os.getenv("TICK_CAPACITY", 4096))  # 每个资产保留的逐笔价格数量（每个16字节）
+
+# 订单簿配置
+ORDERBOOK_FEED = os.getenv("ORDERBOOK_FEED", "")  # 订单簿行情源，simulated 为本地模拟交易所，为空表示不启用
+ORDERBOOK_LEVELS = int(os.getenv("ORDERBOOK_LEVELS", 50))  # 模拟交易所每侧的价位数
+ORDERBOOK_INTERVAL = float(os.getenv("ORDERBOOK_INTERVAL", 0.1))  # 模拟交易所的增量间隔（秒）
+
+# 历史数据与预测配置
+HISTORY_MAX_DAYS = int(os.getenv("HISTORY_MAX_DAYS", 366))  # 每个资产保存的小时级历史天数
+HISTORY_TTL = int(os.getenv("HISTORY_TTL", 6 * 3600))  # 历史序列完整重新加载的间隔（秒）
+MIN_PREDICTION_DAYS = 1
+MAX_PREDICTION_DAYS = 365
+# 启用的技术指标和趋势评分规则（逗号分隔，见 src.indicators），指标为空表示全部启用
+PREDICTION_INDICATORS = [name for name in os.getenv("PREDICTION_INDICATORS", "").split(",") if name]
+PREDICTION_SCORING_RULES = [
+    name for name in os.getenv("PREDICTION_SCORING_RULES", "ma_cross,rsi,momentum,bollinger").split(",") if name
+]
+
+# 价格提醒配置
+MAX_ALERTS = int(os.getenv("MAX_ALERTS", 100000))
+MAX_ALERTS_PER_CLIENT = int(os.getenv("MAX_ALERTS_PER_CLIENT", 100))  # 按 X-API-Key 或客户端IP，0表示不限制
+ALERT_TTL = float(os.getenv("ALERT_TTL", 7 * 86400))  # 提醒的有效期（秒），0表示不过期
+# 允许 webhook 指向内网/本机地址（默认拒绝，防止SSRF）
+ALERT_ALLOW_PRIVATE_WEBHOOKS = os.getenv("ALERT_ALLOW_PRIVATE_WEBHOOKS", "false").lower() in ("1", "true", "yes")
+ALERT_WEBHOOK_TIMEOUT = float(os.getenv("ALERT_WEBHOOK_TIMEOUT", 5))  # 秒
+
+# 计价货币换算配置
+FX_RATES_TTL = int(os.getenv("FX_RATES_TTL", 3600))  # 汇率表缓存时间（秒）
+
+# 快照持久化配置
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")  # 快照文件路径，为空表示不启用
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", 300))  # 写快照的间隔（秒）
+SNAPSHOT_RESTORE_TTL = int(os.getenv("SNAPSHOT_RESTORE_TTL", 60))  # 恢复的缓存条目TTL，到期后从上游刷新
+
+# 限流配置（令牌桶，按 X-API-Key 或客户端IP）
+# 已发放的API密钥（逗号分隔）；只有其中的 X-API-Key 单独计数，其余请求按客户端IP计数
+API_KEYS = frozenset(key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip())
+RATE_LIMIT_CAPACITY = int(os.getenv("RATE_LIMIT_CAPACITY", 120))  # 桶容量，0表示不限流
+RATE_LIMIT_REFILL_RATE = float(os.getenv("RATE_LIMIT_REFILL_RATE", 2))  # 每秒补充的令牌数
+RATE_LIMIT_LEASE = int(os.getenv("RATE_LIMIT_LEASE", 10))  # 每个实例一次从Redis预取的令牌数
 
 # 外部API配置
+MARKET_PROVIDER = os.getenv("MARKET_PROVIDER", "coincap")  # coincap, coingecko
 COINCAP_API_BASE = "https://api.coincap.io/v2"
 COINGECKO_API_BASE = "https://api.coingecko.com/api/v3"
 
-# 支持的加密货币
-SUPPORTED_CRYPTO = [
-    "bitcoin",
-    "ethereum", 
-    "binancecoin",
-    "solana",
-    "cardano",
-    "avalanche",
-    "polkadot",
-    "dogecoin",
-    "litecoin",
-    "chainlink"
-]
+# 上游录制/回放配置（离线压测和基准测试）
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live")  # live, record, replay
+UPSTREAM_FIXTURE = os.getenv("UPSTREAM_FIXTURE", "")  # 录制文件路径（gzip NDJSON）
+UPSTREAM_REPLAY_PACING = os.getenv("UPSTREAM_REPLAY_PACING", "max")  # realtime, accelerated, max
+UPSTREAM_REPLAY_SPEED = float(os.getenv("UPSTREAM_REPLAY_SPEED", 10))  # accelerated 的倍速
+
+
+# 全资产预测排行榜配置（每次扫描每个资产一次上游请求，默认不启用）
+LEADERBOARD_INTERVAL = float(os.getenv("LEADERBOARD_INTERVAL", 0))  # 两次扫描之间的间隔（秒），0表示不启用
+LEADERBOARD_UNIVERSE = int(os.getenv("LEADERBOARD_UNIVERSE", 500))  # 按市值排名扫描的资产数
+LEADERBOARD_DAYS = int(os.getenv("LEADERBOARD_DAYS", 7))  # 预测天数
+LEADERBOARD_CHUNK = int(os.getenv("LEADERBOARD_CHUNK", 50))  # 每块的资产数，每块完成后保存进度
+LEADERBOARD_CONCURRENCY = int(os.getenv("LEADERBOARD_CONCURRENCY", 8))  # 同时进行的上游请求数
+LEADERBOARD_CALLS_PER_MINUTE = float(os.getenv("LEADERBOARD_CALLS_PER_MINUTE", 30))  # 扫描的上游请求速率上限
+LEADERBOARD_STATE_PATH = os.getenv("LEADERBOARD_STATE_PATH", "")  # 扫描进度文件，为空表示不保存进度
 
-CRYPTO_SYMBOLS = {
-    "bitcoin": "BTC",
-    "ethereum": "ETH", 
-    "binancecoin": "BNB",
-    "solana": "SOL",
-    "cardano": "ADA",
-    "avalanche": "AVAX",
-    "polkadot": "DOT",
-    "dogecoin": "DOGE",
-    "litecoin": "LTC",
-    "chainlink": "LINK"
-}
\ No newline at end of file
+# 集群配置（资产的历史序列和预测按一致性哈希分片到多个节点，成员表保存在Redis中，memory 后端时为进程内）
+CLUSTER_NODE_URL = os.getenv("CLUSTER_NODE_URL", "")  # 其他节点访问本节点的地址，为空表示不启用集群
+CLUSTER_NODE_ID = os.getenv("CLUSTER_NODE_ID", "")  # 节点ID，默认使用 CLUSTER_NODE_URL
+CLUSTER_HEARTBEAT_INTERVAL = float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", 5))  # 心跳间隔（秒）
+CLUSTER_NODE_TTL = float(os.getenv("CLUSTER_NODE_TTL", 15))  # 心跳超时后视为节点离开（秒）
+CLUSTER_REPLICAS = int(os.getenv("CLUSTER_REPLICAS", 128))  # 每个节点在哈希环上的虚拟节点数
+CLUSTER_SECRET = os.getenv("CLUSTER_SECRET", "")  # 节点间转发请求的密钥，集群模式必填
+CLUSTER_FORWARD_TIMEOUT = float(os.getenv("CLUSTER_FORWARD_TIMEOUT", 10))  # 转发请求的超时（秒）
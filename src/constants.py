@@ -0,0 +1,33 @@
+"""
+静态常量：支持的加密货币及其符号
+
+这里不读取环境变量、不依赖第三方库，客户端和工具脚本可以直接导入，
+不会触发服务端配置加载。
+"""
+
+# 支持的加密货币
+SUPPORTED_CRYPTO = [
+    "bitcoin",
+    "ethereum", 
+    "binancecoin",
+    "solana",
+    "cardano",
+    "avalanche",
+    "polkadot",
+    "dogecoin",
+    "litecoin",
+    "chainlink"
+]
+
+CRYPTO_SYMBOLS = {
+    "bitcoin": "BTC",
+    "ethereum": "ETH", 
+    "binancecoin": "BNB",
+    "solana": "SOL",
+    "cardano": "ADA",
+    "avalanche": "AVAX",
+    "polkadot": "DOT",
+    "dogecoin": "DOGE",
+    "litecoin": "LTC",
+    "chainlink": "LINK"
+}
@@ -1,56 +1,159 @@
-import requests
 import asyncio
-from typing import Dict, List, Optional
-from src.config import (
-    COINCAP_API_BASE, 
-    COINGECKO_API_BASE, 
-    SUPPORTED_CRYPTO, 
-    CRYPTO_SYMBOLS
-)
-from src.cache import cache_manager
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from src.config import SUPPORTED_CRYPTO, CRYPTO_SYMBOLS
+from src.cache import CacheManager
+from src.models import CryptoDetail, PriceBoard
+from src.providers import MarketDataProvider, create_provider
+from src.ttl_policy import ALL_ASSETS, AdaptiveTtl
 
 
 class CryptoService:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'CryptoMarketBot/1.0'
-        })
+    def __init__(
+        self,
+        cache: Optional[CacheManager] = None,
+        provider: Optional[MarketDataProvider] = None,
+        ttl_policy: Optional[AdaptiveTtl] = None
+    ):
+        self.cache = cache or CacheManager()
+        self.provider = provider or create_provider()
+        # 自适应TTL，为None时使用缓存的默认TTL
+        self.ttl_policy = ttl_policy
+        # 刷新调度器（src.scheduler），设置后缓存未命中时不请求上游，等待调度器的首次刷新
+        self.scheduler = None
+        # 价格刷新回调: listener(quotes, timestamp)
+        self._price_listeners: List[Callable[[Dict[str, Dict], float], None]] = []
+        # 正在进行的上游请求，相同请求并发时共用同一个结果
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 由当前缓存数据构建的只读模型，数据不变时所有请求共用
+        self._board: Optional[PriceBoard] = None
+        self._details: Dict[str, CryptoDetail] = {}
+
+    def close(self):
+        """关闭上游数据源的HTTP会话"""
+        self.provider.close()
+
+    def add_price_listener(self, listener: Callable[[Dict[str, Dict], float], None]):
+        """
+        注册价格刷新回调
+
+        每次从上游拿到新报价后调用 listener(quotes, timestamp)，
+        缓存命中不会触发。
+        """
+        self._price_listeners.append(listener)
+
+    def _ttl(self, key: str) -> Optional[int]:
+        """键的自适应TTL，未启用时为None（缓存默认TTL）"""
+        return self.ttl_policy.ttl(key) if self.ttl_policy is not None else None
+
+    async def _singleflight(self, key: str, fetch: Callable[[], Awaitable]):
+        """
+        合并并发的相同上游请求
+
+        缓存未命中时多个请求同时到达，只有第一个真正请求上游，其余等待同一个结果。
+        单个等待方被取消不会取消共享的请求。
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetch())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def fetch_crypto_quotes(self) -> Dict[str, Dict]:
+        """
+        获取所有支持的加密货币报价
+
+        Returns:
+            {crypto_id: {"price_usd": 价格, "change_24h": 24小时涨跌幅}}
+        """
+        cache_key = "crypto_quotes"
+        if self.ttl_policy is not None:
+            self.ttl_policy.record_access("quotes", cache_key, ALL_ASSETS)
 
-    async def fetch_crypto_prices(self) -> Dict[str, float]:
-        """获取所有支持的加密货币价格"""
-        cache_key = "crypto_prices"
-        
         # 尝试从缓存获取
-        cached_data = cache_manager.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         if cached_data:
             return cached_data
 
-        prices = {}
-        try:
-            # 从 CoinCap API 获取数据
-            response = self.session.get(f"{COINCAP_API_BASE}/assets", params={"limit": 50})
-            response.raise_for_status()
-            
-            data = response.json()
-            assets = {asset['id'].lower(): asset for asset in data['data']}
-            
-            # 只获取我们支持的加密货币
-            for crypto_id in SUPPORTED_CRYPTO:
-                if crypto_id in assets:
-                    price_str = assets[crypto_id]['priceUsd']
-                    prices[crypto_id] = round(float(price_str), 2)
-                    
-        except Exception as e:
-            print(f"Error fetching crypto prices: {str(e)}")
-            # 如果 API 请求失败，返回空字典
-            prices = {}
-
-        # 存入缓存
-        if prices:
-            cache_manager.set(cache_key, prices)
-        
-        return prices
+        if self.scheduler is not None:
+            await self.scheduler.wait_ready("assets")
+            return self.cache.get(cache_key) or {}
+
+        return await self._singleflight(cache_key, self.refresh_crypto_quotes)
+
+    async def refresh_crypto_quotes(self) -> Dict[str, Dict]:
+        """从上游获取最新报价，写入缓存并通知回调"""
+        quotes = await self.provider.fetch_prices(SUPPORTED_CRYPTO)
+
+        if quotes:
+            self._publish_quotes(quotes, self._ttl("crypto_quotes"))
+
+        return quotes
+
+    async def refresh_assets(self, ttl: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        一次批量请求刷新全部资产的详情和报价（报价由详情得到），写入缓存并通知回调
+
+        Args:
+            ttl: 缓存时间，默认使用缓存的默认TTL
+
+        Returns:
+            {crypto_id: 详细信息}，失败时为空字典
+        """
+        details = await self.provider.fetch_details(SUPPORTED_CRYPTO)
+        if not details:
+            return details
+
+        for crypto_id, detail in details.items():
+            self.cache.set(f"crypto_detail_{crypto_id}", detail, ttl)
+        self._publish_quotes({
+            crypto_id: {"price_usd": detail["price_usd"], "change_24h": detail["change_percent_24h"]}
+            for crypto_id, detail in details.items()
+        }, ttl)
+        return details
+
+    def _publish_quotes(self, quotes: Dict[str, Dict], ttl: Optional[int]):
+        """缓存新报价、重建报价模型并通知回调"""
+        self.cache.set("crypto_quotes", quotes, ttl)
+        self._board = PriceBoard(quotes)
+
+        timestamp = time.time()
+        for listener in self._price_listeners:
+            try:
+                listener(quotes, timestamp)
+            except Exception as e:
+                print(f"Error in price listener: {str(e)}")
+
+    async def get_price_board(self) -> PriceBoard:
+        """
+        获取全部报价的只读模型
+
+        缓存中的报价没有变化时直接返回上次构建的模型，不再逐条组装字典。
+        """
+        quotes = await self.fetch_crypto_quotes()
+        board = self._board
+        if board is None or not board.matches(quotes):
+            board = PriceBoard(quotes)
+            self._board = board
+        return board
+
+    async def get_crypto_detail_model(self, crypto_id: str) -> Optional[CryptoDetail]:
+        """获取详情的只读模型，详情没有变化时复用上次构建的模型"""
+        detail = await self.fetch_crypto_detail(crypto_id)
+        if not detail:
+            return None
+
+        model = self._details.get(crypto_id)
+        if model is None or not model.matches(detail):
+            model = CryptoDetail(detail)
+            self._details[crypto_id] = model
+        return model
+
+    async def fetch_crypto_prices(self) -> Dict[str, float]:
+        """获取所有支持的加密货币价格"""
+        quotes = await self.fetch_crypto_quotes()
+        return {crypto_id: quote["price_usd"] for crypto_id, quote in quotes.items()}
 
     async def fetch_crypto_detail(self, crypto_id: str) -> Optional[Dict]:
         """获取特定加密货币的详细信息"""
@@ -58,38 +161,28 @@ class CryptoService:
             return None
             
         cache_key = f"crypto_detail_{crypto_id.lower()}"
-        
+        if self.ttl_policy is not None:
+            self.ttl_policy.record_access("detail", cache_key, crypto_id.lower())
+
         # 尝试从缓存获取
-        cached_data = cache_manager.get(cache_key)
+        cached_data = self.cache.get(cache_key)
         if cached_data:
             return cached_data
 
-        try:
-            # 从 CoinCap API 获取数据
-            response = self.session.get(f"{COINCAP_API_BASE}/assets/{crypto_id}")
-            response.raise_for_status()
-            
-            data = response.json()['data']
-            
-            detail = {
-                "id": data['id'],
-                "name": data['name'],
-                "symbol": data['symbol'],
-                "price_usd": round(float(data['priceUsd']), 2),
-                "change_percent_24h": round(float(data['changePercent24Hr']), 2),
-                "volume_usd_24h": round(float(data['volumeUsd24Hr']), 2),
-                "market_cap_usd": round(float(data['marketCapUsd']), 2),
-                "supply": round(float(data['supply']), 2) if data['supply'] else None
-            }
-            
+        if self.scheduler is not None:
+            await self.scheduler.wait_ready("assets")
+            return self.cache.get(cache_key)
+
+        async def fetch():
+            detail = await self.provider.fetch_detail(crypto_id.lower())
+
             # 存入缓存
-            cache_manager.set(cache_key, detail)
-            
+            if detail:
+                self.cache.set(cache_key, detail, self._ttl(cache_key))
+
             return detail
-            
-        except Exception as e:
-            print(f"Error fetching detail for {crypto_id}: {str(e)}")
-            return None
+
+        return await self._singleflight(cache_key, fetch)
 
     async def get_supported_cryptos(self) -> List[Dict[str, str]]:
         """获取支持的加密货币列表"""
@@ -101,7 +194,3 @@ class CryptoService:
                 "symbol": symbol
             })
         return cryptos
-
-
-# 创建全局服务实例
-crypto_service = CryptoService()
\ No newline at end of file
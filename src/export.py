@@ -0,0 +1,135 @@
+import bisect
+import json
+from typing import Iterator, List, Optional, Tuple
+
+from src.history_store import HistorySeries
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+# 价格以 1e-8 为单位转换成整数后再做差分，累加还原时没有浮点误差
+PRICE_SCALE = 10 ** 8
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def available_formats() -> List[str]:
+    """当前环境可用的导出格式（arrow 需要安装 pyarrow）"""
+    return [name for name in EXPORT_FORMATS if name != "arrow" or pyarrow is not None]
+
+
+def iter_delta_chunks(
+    series: HistorySeries,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    chunk_size: int = 1000
+) -> Iterator[Tuple[List[int], List[int]]]:
+    """
+    按块生成差分编码的时间和价格
+
+    第一个差分相对0计算（即绝对值），之后每个值都相对前一个值，跨块连续；
+    对整个导出依次累加即可还原时间（秒）和价格（乘以 PRICE_SCALE 的整数）。
+    每块开始时用上一块最后的时间重新二分定位，导出期间序列被追加或裁剪也不会错位。
+
+    Args:
+        series: 历史序列
+        start: 起始时间（Unix秒，含），默认最早
+        end: 结束时间（Unix秒，含），默认最新
+        chunk_size: 每块的点数
+    """
+    times = series.times
+    prices = series.prices
+    i = bisect.bisect_left(times, start) if start is not None else 0
+    last_time, last_price = 0, 0
+
+    while True:
+        stop = bisect.bisect_right(times, end) if end is not None else len(times)
+        stop = min(stop, i + chunk_size)
+        if i >= stop:
+            return
+
+        time_deltas = []
+        price_deltas = []
+        for k in range(i, stop):
+            timestamp = times[k]
+            price = round(prices[k] * PRICE_SCALE)
+            time_deltas.append(timestamp - last_time)
+            price_deltas.append(price - last_price)
+            last_time, last_price = timestamp, price
+
+        yield time_deltas, price_deltas
+        i = bisect.bisect_right(times, last_time)
+
+
+def iter_ndjson(crypto_id: str, interval: str, chunks: Iterator[Tuple[List[int], List[int]]]) -> Iterator[bytes]:
+    """
+    NDJSON 导出：第一行是说明，之后每行一块 {"t": [时间差分], "p": [价格差分]}
+    """
+    yield json.dumps({
+        "id": crypto_id,
+        "interval": interval,
+        "encoding": "delta",
+        "time_unit": "s",
+        "price_scale": PRICE_SCALE
+    }).encode("utf-8") + b"\n"
+
+    for time_deltas, price_deltas in chunks:
+        yield json.dumps({"t": time_deltas, "p": price_deltas}, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class _ChunkSink:
+    """收集 Arrow IPC 写出的字节，每写完一个批次取走一次"""
+
+    def __init__(self):
+        self.buffers: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffers.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.buffers)
+        self.buffers.clear()
+        return data
+
+
+def iter_arrow(crypto_id: str, interval: str, chunks: Iterator[Tuple[List[int], List[int]]]) -> Iterator[bytes]:
+    """
+    Arrow IPC 流导出：每块一个 record batch，列为 t、p（int64 差分），说明放在 schema 元数据中
+    """
+    schema = pyarrow.schema(
+        [("t", pyarrow.int64()), ("p", pyarrow.int64())],
+        metadata={
+            "id": crypto_id,
+            "interval": interval,
+            "encoding": "delta",
+            "time_unit": "s",
+            "price_scale": str(PRICE_SCALE)
+        }
+    )
+    sink = _ChunkSink()
+    writer = pyarrow.ipc.new_stream(sink, schema)
+    yield sink.drain()
+
+    for time_deltas, price_deltas in chunks:
+        writer.write_batch(pyarrow.record_batch(
+            [pyarrow.array(time_deltas, pyarrow.int64()), pyarrow.array(price_deltas, pyarrow.int64())],
+            schema=schema
+        ))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[Tuple[str, ...]]]:
+    """
+    解析 fields 查询参数
+
+    Args:
+        fields: 逗号分隔的字段列表，嵌套字段用点号，如 "price_usd,prediction.target_price"
+
+    Returns:
+        字段路径列表；未指定时返回None，表示返回全部字段
+    """
+    if not fields:
+        return None
+    paths = [tuple(part.split(".")) for part in (f.strip() for f in fields.split(",")) if part]
+    return paths or None
+
+
+def select_fields(data: Any, paths: Optional[List[Tuple[str, ...]]]) -> Any:
+    """
+    从字典中只保留指定字段（稀疏字段集）
+
+    Args:
+        data: 单个资源的字典（价格、详情或预测结果）
+        paths: parse_fields 返回的字段路径，None 表示不过滤
+
+    Returns:
+        过滤后的新字典；不存在的字段直接忽略
+    """
+    if paths is None or not isinstance(data, dict):
+        return data
+
+    result: Dict[str, Any] = {}
+    for path in paths:
+        # 先确认整条路径存在，再写入，避免留下空的中间字典
+        value = data
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = result
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+    return result
@@ -0,0 +1,181 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from src.cache import CacheManager
+from src.models import round_price
+from src.providers import MarketDataProvider
+
+
+BASE_CURRENCY = "USD"
+
+# 不带 _usd 后缀但同样以美元计价的字段（预测结果和技术指标）
+PRICE_KEYS = frozenset({
+    "current_price",
+    "target_price",
+    "target_high",
+    "target_low",
+    "ma_short",
+    "ma_long",
+    "upper_band",
+    "lower_band",
+    "momentum",
+    "expected_price",
+    "level",
+    # 插件指标
+    "macd",
+    "macd_signal",
+    "macd_histogram",
+    "atr",
+    "ema_fast",
+    "ema_slow"
+})
+
+# 所有数值都以美元计价的字段（蒙特卡洛预测的价格分位数）
+PRICE_MAPS = frozenset({"price_percentiles"})
+
+
+def convert_usd_fields(data, factor: float, currency: str):
+    """
+    把结果中的美元金额换算成目标货币
+
+    名称中带 usd 的字段（price_usd、volume_usd_24h 等）换算后把 usd 换成货币名，
+    PRICE_KEYS 中的字段保留原名；
+    其余字段原样返回。不修改传入的对象，缓存中的美元数据可以直接传入。
+
+    Args:
+        data: 接口返回的 dict / list
+        factor: 1美元对应的目标货币数量
+        currency: 目标货币符号（大写）
+    """
+    if isinstance(data, list):
+        return [convert_usd_fields(item, factor, currency) for item in data]
+    if not isinstance(data, dict):
+        return data
+
+    converted = {}
+    for key, value in data.items():
+        if key in PRICE_MAPS and isinstance(value, dict):
+            converted[key] = {k: round_price(v * factor) for k, v in value.items()}
+        elif isinstance(value, (dict, list)):
+            converted[key] = convert_usd_fields(value, factor, currency)
+        elif not isinstance(value, (int, float)) or isinstance(value, bool):
+            converted[key] = value
+        elif key in PRICE_KEYS:
+            converted[key] = round_price(value * factor)
+        else:
+            parts = key.split("_")
+            if "usd" in parts:
+                parts[parts.index("usd")] = currency.lower()
+                converted["_".join(parts)] = round_price(value * factor)
+            else:
+                converted[key] = value
+    return converted
+
+
+def usd_field_paths(paths: Optional[List[Tuple[str, ...]]], currency: str) -> Optional[List[Tuple[str, ...]]]:
+    """
+    把 fields 中换算后的字段名对应回美元字段名（如 vs=EUR 时 price_eur -> price_usd）
+
+    字段在换算之前从美元数据中选择，请求中既可以写 price_usd 也可以写 price_eur。
+
+    Args:
+        paths: parse_fields 返回的字段路径，None 表示不过滤
+        currency: 目标货币符号
+    """
+    currency = currency.lower()
+    if paths is None or currency == BASE_CURRENCY.lower():
+        return paths
+
+    def usd_name(key: str) -> str:
+        parts = key.split("_")
+        if currency in parts:
+            parts[parts.index(currency)] = "usd"
+        return "_".join(parts)
+
+    return [tuple(usd_name(key) for key in path) for path in paths]
+
+
+class FxService:
+    """
+    计价货币换算
+
+    汇率表（1单位货币 = 多少美元）整体缓存一份，TTL 远长于报价；
+    报价、详情和预测仍只缓存美元版本，请求时再按汇率换算，缓存不会按货币重复。
+    """
+
+    CACHE_KEY = "fx_rates"
+
+    def __init__(self, cache: CacheManager, provider: MarketDataProvider, ttl: int = 3600, ttl_policy=None):
+        self.cache = cache
+        self.provider = provider
+        self.ttl = ttl
+        # 自适应TTL（src.ttl_policy.AdaptiveTtl），为None时固定使用 ttl
+        self.ttl_policy = ttl_policy
+        # 刷新调度器（src.scheduler），设置后缓存未命中时不请求上游
+        self.scheduler = None
+        self._lock = asyncio.Lock()
+
+    async def get_rates(self) -> Dict[str, float]:
+        """
+        获取汇率表
+
+        Returns:
+            {货币符号(大写): 1单位该货币对应的美元价值}，上游失败时为空字典
+        """
+        if self.ttl_policy is not None:
+            self.ttl_policy.record_access("fx", self.CACHE_KEY)
+        rates = self.cache.get(self.CACHE_KEY)
+        if rates:
+            return rates
+
+        if self.scheduler is not None:
+            await self.scheduler.wait_ready("fx")
+            return self.cache.get(self.CACHE_KEY) or {}
+
+        # 缓存过期时只让一个请求去上游拉取
+        async with self._lock:
+            rates = self.cache.get(self.CACHE_KEY)
+            if rates:
+                return rates
+
+            ttl = self.ttl_policy.ttl(self.CACHE_KEY) if self.ttl_policy is not None else None
+            return await self.refresh_rates(ttl)
+
+    async def refresh_rates(self, ttl: Optional[int] = None) -> Dict[str, float]:
+        """从上游拉取汇率表并写入缓存，ttl 默认为 self.ttl"""
+        rates = await self.provider.fetch_rates()
+        if rates:
+            self.cache.set(self.CACHE_KEY, rates, ttl or self.ttl)
+        return rates
+
+    async def get_factor(self, currency: str) -> Optional[float]:
+        """
+        1美元对应的目标货币数量
+
+        Returns:
+            换算系数，不支持的货币返回None
+        """
+        currency = currency.upper()
+        if currency == BASE_CURRENCY:
+            return 1.0
+
+        rate_usd = (await self.get_rates()).get(currency)
+        if not rate_usd:
+            return None
+        return 1.0 / rate_usd
+
+    async def convert(self, data, currency: str):
+        """
+        把美元结果换算成目标货币
+
+        Raises:
+            ValueError: 不支持的货币
+        """
+        currency = currency.upper()
+        if currency == BASE_CURRENCY:
+            return data
+
+        factor = await self.get_factor(currency)
+        if factor is None:
+            raise ValueError(f"Unsupported currency: {currency}")
+        return convert_usd_fields(data, factor, currency)
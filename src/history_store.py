@@ -0,0 +1,235 @@
+import asyncio
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from src.providers import MarketDataProvider
+
+
+class HistorySeries:
+    """
+    单个资产的高精度历史价格序列
+
+    时间（秒）和价格分别存放在 array 中，按时间升序；
+    version 在每次数据变化时递增，用于判断重采样缓存是否失效。
+    """
+
+    __slots__ = ("times", "prices", "version", "loaded_at")
+
+    def __init__(self, times: array, prices: array, loaded_at: float):
+        self.times = times
+        self.prices = prices
+        self.version = 0
+        self.loaded_at = loaded_at
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+class HistoryStore:
+    """
+    历史价格存储
+
+    每个资产只保存一条固定间隔（默认 h1）的序列，任意周期的数据都由它重采样得到：
+    不同预测天数共用一次上游加载，重采样结果按 (周期, 数量) 缓存到数据变化为止。
+    价格轮询的最新报价会合并进序列，两次完整加载之间数据也保持最新。
+    """
+
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        interval: str = "h1",
+        step: int = 3600,
+        max_points: int = 24 * 366,
+        ttl: float = 6 * 3600,
+        ttl_policy=None
+    ):
+        self.provider = provider
+        self.interval = interval
+        self.step = step
+        self.max_points = max_points
+        self.ttl = ttl
+        # 自适应TTL（src.ttl_policy.AdaptiveTtl），为None时固定使用 ttl
+        self.ttl_policy = ttl_policy
+        # 刷新调度器（src.scheduler），设置后由调度器按计划重新加载，请求不再访问上游
+        self.scheduler = None
+        # 集群节点（src.cluster），设置后调度器只加载本节点负责的资产
+        self.cluster = None
+
+        self._series: Dict[str, HistorySeries] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._resampled: Dict[str, Dict[Tuple[int, int, int], Tuple[List[int], List[float]]]] = {}
+        # 已释放的序列的最后版本号，重新加载时继续递增，按版本缓存的预测和分析结果不会误用旧数据
+        self._retired_versions: Dict[str, int] = {}
+
+    async def get_series(self, crypto_id: str) -> Optional[HistorySeries]:
+        """
+        获取资产的历史序列，过期或不存在时从上游加载
+
+        同一资产的并发请求只会触发一次加载。设置了调度器时只返回已加载的序列，
+        还没有加载的资产等待调度器的首次加载。集群模式下其他节点负责的资产
+        （只有转发给负责节点失败时才会在本地用到）按需加载。
+
+        Returns:
+            历史序列，上游没有数据时返回None
+        """
+        series = self._series.get(crypto_id)
+        if self.scheduler is not None and (self.cluster is None or self.cluster.owns(crypto_id)):
+            # 调度器按访问频率调整重新加载的间隔
+            self._record_access(crypto_id)
+            if series is None:
+                await self.scheduler.wait_ready(f"history:{crypto_id}")
+                series = self._series.get(crypto_id)
+            return series
+
+        ttl = self._ttl(crypto_id)
+        if series is not None and time.time() - series.loaded_at < ttl:
+            return series
+
+        lock = self._locks.setdefault(crypto_id, asyncio.Lock())
+        async with lock:
+            series = self._series.get(crypto_id)
+            if series is not None and time.time() - series.loaded_at < ttl:
+                return series
+            return await self._load(crypto_id, series)
+
+    async def reload(self, crypto_id: str) -> Optional[HistorySeries]:
+        """从上游完整重新加载序列（供刷新调度器使用），失败时保留旧数据"""
+        lock = self._locks.setdefault(crypto_id, asyncio.Lock())
+        async with lock:
+            return await self._load(crypto_id, self._series.get(crypto_id))
+
+    async def _load(self, crypto_id: str, series: Optional[HistorySeries]) -> Optional[HistorySeries]:
+        arrays = await self.provider.fetch_history_arrays(crypto_id, self.interval, self.max_points)
+        if arrays is None:
+            # 重新加载失败时继续使用旧数据
+            return series
+
+        loaded = HistorySeries(*arrays, time.time())
+        if series is not None:
+            loaded.version = series.version + 1
+        elif crypto_id in self._retired_versions:
+            loaded.version = self._retired_versions.pop(crypto_id) + 1
+        self._series[crypto_id] = loaded
+        self._resampled.pop(crypto_id, None)
+        return loaded
+
+    def _ttl(self, crypto_id: str) -> float:
+        """序列完整重新加载的间隔，启用自适应TTL时按访问频率和波动率计算"""
+        key = self._record_access(crypto_id)
+        if key is None:
+            return self.ttl
+        return self.ttl_policy.ttl(key) or self.ttl
+
+    def _record_access(self, crypto_id: str) -> Optional[str]:
+        """记录一次访问（启用自适应TTL时），返回序列的TTL键"""
+        if self.ttl_policy is None:
+            return None
+        key = f"history_{crypto_id}"
+        self.ttl_policy.record_access("history", key, crypto_id)
+        return key
+
+    def forget(self, crypto_id: str):
+        """释放资产的序列和重采样结果（集群重新分片后不再负责的资产）"""
+        series = self._series.pop(crypto_id, None)
+        if series is not None:
+            self._retired_versions[crypto_id] = series.version
+        self._resampled.pop(crypto_id, None)
+
+    def snapshot(self) -> Dict[str, HistorySeries]:
+        """当前已加载的全部序列（供持久化使用，调用方不应修改）"""
+        return dict(self._series)
+
+    def restore(self, crypto_id: str, series: HistorySeries):
+        """
+        放入从快照恢复的序列
+
+        loaded_at 保留快照中的值，超过 ttl 后照常从上游重新加载；已加载的序列不会被覆盖。
+        """
+        if crypto_id in self._series:
+            return
+        self._series[crypto_id] = series
+        self._resampled.pop(crypto_id, None)
+
+    def on_prices(self, quotes: Dict[str, Dict], timestamp: float):
+        """
+        价格刷新回调：把最新报价合并进已加载的序列
+
+        与最后一个点处于同一间隔内时覆盖该点，否则追加新点。
+        """
+        now = int(timestamp)
+        for crypto_id, quote in quotes.items():
+            series = self._series.get(crypto_id)
+            if series is None or now < series.times[-1]:
+                continue
+
+            if now // self.step == series.times[-1] // self.step:
+                series.times[-1] = now
+                series.prices[-1] = quote["price_usd"]
+            else:
+                series.times.append(now)
+                series.prices.append(quote["price_usd"])
+                # 超出上限一定比例后再裁剪，避免每次追加都移动整个数组
+                if len(series.times) > self.max_points + self.max_points // 10:
+                    del series.times[:-self.max_points]
+                    del series.prices[:-self.max_points]
+
+            series.version += 1
+            self._resampled.pop(crypto_id, None)
+
+    def resample(self, crypto_id: str, series: HistorySeries, bar_seconds: int, count: int) -> List[float]:
+        """
+        把序列降采样成固定周期的收盘价
+
+        Args:
+            crypto_id: 加密货币ID（用于结果缓存）
+            series: get_series 返回的序列
+            bar_seconds: 目标周期（秒）
+            count: 最多需要的周期数
+
+        Returns:
+            按时间升序的收盘价列表，长度不超过 count
+        """
+        return self.resample_bars(crypto_id, series, bar_seconds, count)[1]
+
+    def resample_bars(
+        self,
+        crypto_id: str,
+        series: HistorySeries,
+        bar_seconds: int,
+        count: int
+    ) -> Tuple[List[int], List[float]]:
+        """
+        把序列降采样成固定周期的K线收盘价，并返回每根K线的编号
+
+        周期按Unix纪元对齐（编号 = 时间 // 周期），每个周期取最后一个价格；
+        只向前扫描需要的那一段。
+
+        Returns:
+            (按时间升序的周期编号列表, 对应的收盘价列表)
+        """
+        cache = self._resampled.setdefault(crypto_id, {})
+        key = (series.version, bar_seconds, count)
+        bars = cache.get(key)
+        if bars is not None:
+            return bars
+
+        times = series.times
+        prices = series.prices
+        buckets = []
+        closes = []
+        current_bucket = None
+        for i in range(len(times) - 1, -1, -1):
+            bucket = times[i] // bar_seconds
+            if bucket != current_bucket:
+                if len(closes) == count:
+                    break
+                buckets.append(bucket)
+                closes.append(prices[i])
+                current_bucket = bucket
+        buckets.reverse()
+        closes.reverse()
+
+        bars = (buckets, closes)
+        cache[key] = bars
+        return bars
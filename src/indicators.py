@@ -0,0 +1,297 @@
+import statistics
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.models import round_price
+
+
+class IndicatorContext:
+    """
+    一次指标计算共享的中间序列
+
+    价格差分、窗口均值/标准差、EMA序列等在第一次用到时计算并缓存，
+    多个指标用到同一个中间量时只计算一次，新增指标不会重复遍历价格序列。
+    """
+
+    __slots__ = ("prices", "_memo")
+
+    def __init__(self, prices: List[float]):
+        self.prices = prices
+        self._memo: Dict = {}
+
+    def _cached(self, key, compute: Callable):
+        value = self._memo.get(key)
+        if value is None:
+            value = compute()
+            self._memo[key] = value
+        return value
+
+    @property
+    def current(self) -> float:
+        return self.prices[-1]
+
+    @property
+    def changes(self) -> List[float]:
+        """相邻价格的差分"""
+        prices = self.prices
+        return self._cached("changes", lambda: [b - a for a, b in zip(prices, prices[1:])])
+
+    def sma(self, period: int) -> float:
+        """最近 period 个价格的均值"""
+        return self._cached(("sma", period), lambda: statistics.mean(self.prices[-period:]))
+
+    def stdev(self, period: int) -> float:
+        """最近 period 个价格的样本标准差"""
+        return self._cached(("stdev", period), lambda: statistics.stdev(self.prices[-period:]))
+
+    def ema(self, period: int) -> List[float]:
+        """价格的EMA序列（以前 period 个价格的均值为起点，长度为 len(prices) - period + 1）"""
+        return self._cached(("ema", period), lambda: ema_series(self.prices, period))
+
+
+def ema_series(values: List[float], period: int) -> List[float]:
+    """
+    指数移动平均序列
+
+    Args:
+        values: 原始序列
+        period: 周期，平滑系数为 2 / (period + 1)
+
+    Returns:
+        EMA序列，第一个值为前 period 个值的均值；数据不足时返回空列表
+    """
+    if len(values) < period:
+        return []
+    alpha = 2 / (period + 1)
+    ema = statistics.fmean(values[:period])
+    result = [ema]
+    for value in values[period:]:
+        ema += alpha * (value - ema)
+        result.append(ema)
+    return result
+
+
+class Indicator:
+    """已注册的指标：compute(ctx) 返回该指标的字段，数据点少于 min_points 时跳过"""
+
+    __slots__ = ("name", "compute", "min_points")
+
+    def __init__(self, name: str, compute: Callable[[IndicatorContext], Optional[Dict]], min_points: int):
+        self.name = name
+        self.compute = compute
+        self.min_points = min_points
+
+
+# 指标注册表和评分规则注册表，按注册顺序计算
+INDICATORS: Dict[str, Indicator] = {}
+SCORING_RULES: Dict[str, Callable[[Dict], int]] = {}
+# 每条评分规则读取的指标
+RULE_INDICATORS: Dict[str, Tuple[str, ...]] = {}
+
+# 价格目标、置信度和预测结果始终用到的指标
+CORE_INDICATORS = ("moving_average", "rsi", "bollinger", "momentum")
+
+
+def register_indicator(name: str, min_points: int = 5):
+    """注册指标的装饰器，函数接收 IndicatorContext，返回字段字典（无法计算时返回None）"""
+    def decorator(compute: Callable[[IndicatorContext], Optional[Dict]]):
+        INDICATORS[name] = Indicator(name, compute, min_points)
+        return compute
+    return decorator
+
+
+def register_scoring_rule(name: str, indicators: Iterable[str] = ()):
+    """
+    注册趋势评分规则的装饰器，函数接收指标字典，返回加减的分数
+
+    Args:
+        name: 规则名
+        indicators: 规则读取的指标名，启用该规则时默认同时计算这些指标
+    """
+    def decorator(rule: Callable[[Dict], int]):
+        SCORING_RULES[name] = rule
+        RULE_INDICATORS[name] = tuple(indicators)
+        return rule
+    return decorator
+
+
+class IndicatorEngine:
+    """
+    按注册表计算指标和趋势评分
+
+    Args:
+        indicators: 启用的指标名，默认为 CORE_INDICATORS 加上启用的规则读取的指标，
+                    不计算没有规则用到、也不在结果中展示的指标
+        rules: 启用的评分规则名，默认全部已注册的规则
+    """
+
+    def __init__(self, indicators: Optional[Iterable[str]] = None, rules: Optional[Iterable[str]] = None):
+        rule_names = list(rules or SCORING_RULES)
+        if not indicators:
+            required = set(CORE_INDICATORS).union(*(RULE_INDICATORS[name] for name in rule_names))
+            indicators = [name for name in INDICATORS if name in required]
+        self.indicators = [INDICATORS[name] for name in indicators]
+        self.rules = [SCORING_RULES[name] for name in rule_names]
+
+    def compute(self, prices: List[float]) -> Dict:
+        """
+        在同一个上下文中计算所有启用的指标
+
+        Args:
+            prices: 价格列表（按时间升序）
+
+        Returns:
+            技术指标字典，价格少于5个时返回空字典
+        """
+        if not prices or len(prices) < 5:
+            return {}
+
+        ctx = IndicatorContext(prices)
+        result = {}
+        for indicator in self.indicators:
+            if len(prices) < indicator.min_points:
+                continue
+            values = indicator.compute(ctx)
+            if values:
+                result.update(values)
+        return result
+
+    def score(self, indicators: Dict) -> int:
+        """所有启用规则的分数之和"""
+        return sum(rule(indicators) for rule in self.rules)
+
+
+# ---- 内置指标 ----
+
+@register_indicator("moving_average")
+def moving_average(ctx: IndicatorContext) -> Dict:
+    """5期和20期移动平均（不足20期时长期均线取短期均线）"""
+    ma_short = ctx.sma(5)
+    ma_long = ctx.sma(20) if len(ctx.prices) >= 20 else ma_short
+    return {"ma_short": round_price(ma_short), "ma_long": round_price(ma_long)}
+
+
+@register_indicator("rsi")
+def rsi(ctx: IndicatorContext, period: int = 14) -> Dict:
+    """相对强弱指标（简化版：最近 period 期涨跌幅的简单平均），数据不足时为50"""
+    if len(ctx.prices) < period + 1:
+        return {"rsi": 50}
+
+    changes = ctx.changes[-period:]
+    avg_gain = statistics.mean([change if change > 0 else 0 for change in changes])
+    avg_loss = statistics.mean([0 if change > 0 else abs(change) for change in changes])
+    if avg_loss == 0:
+        return {"rsi": 100}
+
+    rs = avg_gain / avg_loss
+    return {"rsi": round(100 - (100 / (1 + rs)), 2)}
+
+
+@register_indicator("bollinger")
+def bollinger(ctx: IndicatorContext) -> Dict:
+    """布林带：20期均线上下两倍标准差（不足20期时带宽为0）"""
+    if len(ctx.prices) >= 20:
+        middle, std_dev = ctx.sma(20), ctx.stdev(20)
+    else:
+        middle, std_dev = ctx.sma(5), 0
+    return {
+        "upper_band": round_price(middle + (2 * std_dev)),
+        "lower_band": round_price(middle - (2 * std_dev))
+    }
+
+
+@register_indicator("momentum")
+def momentum(ctx: IndicatorContext) -> Dict:
+    """相对5期前的价格变化"""
+    base = ctx.prices[-5]
+    change = ctx.current - base
+    return {
+        "momentum": round_price(change),
+        "momentum_percent": round((change / base) * 100 if base != 0 else 0, 2),
+        "current_price": round_price(ctx.current)
+    }
+
+
+@register_indicator("macd", min_points=35)
+def macd(ctx: IndicatorContext) -> Dict:
+    """MACD：EMA12 - EMA26，信号线为其EMA9"""
+    fast, slow = ctx.ema(12), ctx.ema(26)
+    line = [f - s for f, s in zip(fast[len(fast) - len(slow):], slow)]
+    signal = ema_series(line, 9)
+    return {
+        "macd": round_price(line[-1]),
+        "macd_signal": round_price(signal[-1]),
+        "macd_histogram": round_price(line[-1] - signal[-1])
+    }
+
+
+@register_indicator("atr", min_points=15)
+def atr(ctx: IndicatorContext, period: int = 14) -> Dict:
+    """平均真实波幅；只有收盘价，真实波幅取相邻收盘价之差的绝对值"""
+    value = statistics.fmean([abs(change) for change in ctx.changes[-period:]])
+    return {"atr": round_price(value), "atr_percent": round(value / ctx.current * 100, 2) if ctx.current else 0}
+
+
+@register_indicator("ema_cross", min_points=21)
+def ema_cross(ctx: IndicatorContext) -> Dict:
+    """EMA9 与 EMA21 的位置关系"""
+    fast, slow = ctx.ema(9)[-1], ctx.ema(21)[-1]
+    return {"ema_fast": round_price(fast), "ema_slow": round_price(slow)}
+
+
+# ---- 内置评分规则 ----
+
+@register_scoring_rule("ma_cross", indicators=("moving_average",))
+def score_ma_cross(indicators: Dict) -> int:
+    """短期均线在长期均线之上为金叉（看涨），否则为死叉（看跌）"""
+    return 2 if indicators.get("ma_short", 0) > indicators.get("ma_long", 0) else -2
+
+
+@register_scoring_rule("rsi", indicators=("rsi",))
+def score_rsi(indicators: Dict) -> int:
+    """超卖可能反弹，超买可能回调"""
+    value = indicators.get("rsi", 50)
+    if value < 30:
+        return 1
+    if value > 70:
+        return -1
+    return 0
+
+
+@register_scoring_rule("momentum", indicators=("momentum",))
+def score_momentum(indicators: Dict) -> int:
+    """5期涨跌超过5%视为强劲动量"""
+    value = indicators.get("momentum_percent", 0)
+    if value > 5:
+        return 2
+    if value < -5:
+        return -2
+    return 0
+
+
+@register_scoring_rule("bollinger", indicators=("bollinger", "momentum"))
+def score_bollinger(indicators: Dict) -> int:
+    """超过上轨可能回调，低于下轨可能反弹"""
+    current = indicators.get("current_price", 0)
+    if current > indicators.get("upper_band", 0):
+        return -1
+    if current < indicators.get("lower_band", 0):
+        return 1
+    return 0
+
+
+@register_scoring_rule("macd", indicators=("macd",))
+def score_macd(indicators: Dict) -> int:
+    """MACD柱在零轴之上看涨，之下看跌"""
+    histogram = indicators.get("macd_histogram")
+    if histogram is None:
+        return 0
+    return 1 if histogram > 0 else -1 if histogram < 0 else 0
+
+
+@register_scoring_rule("ema_cross", indicators=("ema_cross",))
+def score_ema_cross(indicators: Dict) -> int:
+    """快线在慢线之上看涨，之下看跌"""
+    fast, slow = indicators.get("ema_fast"), indicators.get("ema_slow")
+    if fast is None or slow is None:
+        return 0
+    return 1 if fast > slow else -1 if fast < slow else 0
@@ -0,0 +1,170 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, Optional
+
+
+# 从上游响应流中每次读取的字节数
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_WHITESPACE = " \t\n\r"
+_scan_once = json.JSONDecoder().scan_once
+# 缓冲区末尾的数字可能在下一块中继续（如 "12" 后面是 "3.5"）
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*\Z")
+
+
+class _JsonStream:
+    """
+    在字节块流上按需解析JSON
+
+    缓冲区只保留还没有解析的部分：每次用 raw_decode 从当前位置解析一个值，
+    值跨越块边界时再读一块重新解析，已解析的内容随下一次读取丢弃。
+    """
+
+    __slots__ = ("_chunks", "_decoder", "buf", "pos", "eof")
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """读取下一块追加到缓冲区，流结束时返回False"""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buf = self.buf[self.pos:] + text
+                self.pos = 0
+                return True
+        self.eof = True
+        text = self._decoder.decode(b"", final=True)
+        if text:
+            self.buf = self.buf[self.pos:] + text
+            self.pos = 0
+            return True
+        return False
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符，流结束时返回空字符串"""
+        while True:
+            buf, pos = self.buf, self.pos
+            end = len(buf)
+            while pos < end and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < end:
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r}, found {found or 'end of stream'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """解析下一个完整的值"""
+        self.peek()
+        while True:
+            buf = self.buf
+            try:
+                value, end = _scan_once(buf, self.pos)
+            except (StopIteration, json.JSONDecodeError):
+                # 值被块边界截断
+                if not self._fill():
+                    raise ValueError(f"Invalid or truncated JSON value: {buf[self.pos:self.pos + 20]!r}") from None
+                continue
+            if (
+                not self.eof
+                and (end == len(buf) or buf[end] in _NUMBER_CHARS)
+                and _NUMBER_TAIL.match(buf, end)
+                and self._fill()
+            ):
+                continue
+            self.pos = end
+            return value
+
+    def items(self) -> Iterator[Any]:
+        """逐个解析当前位置的数组元素"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.separator("]"):
+                return
+
+    def skip(self):
+        """跳过当前位置的值，数组和对象逐个元素跳过，不整体解析"""
+        char = self.peek()
+        if char == "":
+            raise ValueError("Unexpected end of stream")
+        if char not in "[{":
+            self.value()
+            return
+
+        close = "]" if char == "[" else "}"
+        self.pos += 1
+        if self.peek() == close:
+            self.pos += 1
+            return
+        while True:
+            if char == "{":
+                self.value()
+                self.expect(":")
+            self.skip()
+            if self.separator(close):
+                return
+
+    def separator(self, close: str) -> bool:
+        """读取元素之间的逗号或结束符，遇到结束符时返回True"""
+        char = self.peek()
+        if char == close:
+            self.pos += 1
+            return True
+        if char != ",":
+            raise ValueError(f"Expected ',' or {close!r}, found {char or 'end of stream'!r}")
+        self.pos += 1
+        return False
+
+
+def iter_json_array(chunks: Iterable[bytes], key: Optional[str] = None) -> Iterator[Any]:
+    """
+    从JSON字节流中逐个产出数组元素
+
+    内存占用只与块大小和单个元素的大小有关，与整个响应的大小无关。
+
+    Args:
+        chunks: 响应体的字节块（如 response.iter_content()）
+        key: 数组在顶层对象中的键（如 CoinCap 的 "data"），为None时响应本身是数组。
+             该键之前的其他值逐个元素跳过；找到并读完数组后不再读取剩余部分；
+             没有该键或其值不是数组时不产出任何元素
+
+    Raises:
+        ValueError: JSON格式错误或响应被截断
+    """
+    stream = _JsonStream(chunks)
+    if key is None:
+        yield from stream.items()
+        return
+
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        name = stream.value()
+        stream.expect(":")
+        if name == key:
+            if stream.peek() == "[":
+                yield from stream.items()
+            return
+        stream.skip()
+        if stream.separator("}"):
+            return
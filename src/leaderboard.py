@@ -0,0 +1,295 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+# 预测周期对应的上游历史数据间隔
+_INTERVAL_NAMES = {3600: "h1", 14400: "h4", 86400: "d1"}
+
+STATE_VERSION = 1
+
+# 排行榜可排序的字段
+SORT_FIELDS = ("change_percent", "momentum_percent", "rsi", "current_price", "market_rank")
+
+TRENDS = ("strong_bullish", "bullish", "neutral", "bearish", "strong_bearish")
+
+# 置信度从低到高
+CONFIDENCE_LEVELS = {"low": 0, "medium": 1, "high": 2}
+
+
+class LeaderboardTable:
+    """
+    一次完整扫描的预测结果
+
+    表在扫描结束时一次性构建，之后只读；新的扫描完成后整体替换，读取方不会看到扫描了一半的表。
+    rows 按预测涨跌幅从高到低排列，rank 为其中的名次。
+    """
+
+    __slots__ = ("rows", "days", "completed_at", "assets", "failed")
+
+    def __init__(self, rows: List[Dict], days: int, completed_at: float, assets: int, failed: int):
+        rows = sorted(rows, key=lambda row: row["change_percent"], reverse=True)
+        for rank, row in enumerate(rows, 1):
+            row["rank"] = rank
+        self.rows = rows
+        self.days = days
+        self.completed_at = completed_at
+        self.assets = assets
+        self.failed = failed
+
+    def query(
+        self,
+        trend: Optional[str] = None,
+        confidence: Optional[str] = None,
+        min_change: Optional[float] = None,
+        max_change: Optional[float] = None,
+        sort: str = "change_percent",
+        order: str = "desc",
+        limit: int = 50,
+        offset: int = 0
+    ) -> Dict:
+        """
+        筛选、排序并分页
+
+        Args:
+            trend: 只保留该趋势（strong_bullish, bullish, neutral, bearish, strong_bearish）
+            confidence: 最低置信度 (low, medium, high)
+            min_change: 预测涨跌幅下限（%）
+            max_change: 预测涨跌幅上限（%）
+            sort: 排序字段，见 SORT_FIELDS
+            order: desc 或 asc
+            limit: 返回的行数
+            offset: 跳过的行数
+
+        Returns:
+            {"total": 筛选后的行数, "rows": 当前页}
+        """
+        rows = self.rows
+        if trend is not None:
+            rows = [row for row in rows if row["trend"] == trend]
+        if confidence is not None:
+            level = CONFIDENCE_LEVELS[confidence]
+            rows = [row for row in rows if CONFIDENCE_LEVELS.get(row["confidence"], 0) >= level]
+        if min_change is not None:
+            rows = [row for row in rows if row["change_percent"] >= min_change]
+        if max_change is not None:
+            rows = [row for row in rows if row["change_percent"] <= max_change]
+
+        # rows 已按涨跌幅降序，默认排序不需要再排
+        if sort != "change_percent" or order != "desc":
+            # 缺失该字段的行排在最后
+            rows = sorted(
+                (row for row in rows if row[sort] is not None),
+                key=lambda row: row[sort],
+                reverse=order == "desc"
+            ) + [row for row in rows if row[sort] is None]
+
+        return {"total": len(rows), "rows": rows[offset:offset + limit]}
+
+
+class LeaderboardSweep:
+    """
+    对整个资产列表运行技术指标预测的后台任务
+
+    先从数据源取按市值排名的前 universe_size 个资产，再按 chunk_size 分块处理：
+    每块的历史数据并发请求（最多 concurrency 个同时进行，总速率不超过 calls_per_minute），
+    预测计算放到线程中进行，不占用事件循环。每完成一块把进度写入 state_path，
+    进程重启后从中断的块继续，不重新请求已完成的资产。
+
+    全部完成后才构建新的 LeaderboardTable 并替换 table，读取方只会拿到上一次或这一次的完整结果，
+    不等待扫描。扫描用的短历史序列不写入 HistoryStore，不会挤占常规资产的历史数据。
+
+    Args:
+        provider: MarketDataProvider
+        prediction: PredictionService
+        universe_size: 扫描的资产数
+        days: 预测天数
+        chunk_size: 每块的资产数
+        concurrency: 同时进行的上游请求数
+        calls_per_minute: 上游请求速率上限（次/分钟）
+        state_path: 进度文件路径，为空表示不保存进度
+    """
+
+    def __init__(
+        self,
+        provider,
+        prediction,
+        universe_size: int = 500,
+        days: int = 7,
+        chunk_size: int = 50,
+        concurrency: int = 8,
+        calls_per_minute: float = 30,
+        state_path: str = ""
+    ):
+        self.provider = provider
+        self.prediction = prediction
+        self.universe_size = universe_size
+        self.days = days
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = max(1, concurrency)
+        self.calls_per_minute = max(calls_per_minute, 1e-3)
+        self.state_path = state_path
+
+        self.table: Optional[LeaderboardTable] = None
+        self.state: Optional[Dict] = self._load_state()
+        self.running = False
+        self.calls = 0
+        self.last_duration: Optional[float] = None
+        self._pace_until = 0.0
+        self._pace_lock = asyncio.Lock()
+
+    def _load_state(self) -> Optional[Dict]:
+        """读取上次中断的扫描进度，预测天数不同的进度作废"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            print(f"Error loading leaderboard state: {str(e)}")
+            return None
+        if state.get("version") != STATE_VERSION or state.get("days") != self.days:
+            return None
+        print(f"Resuming leaderboard sweep at {state['cursor']}/{len(state['universe'])}")
+        return state
+
+    def _save_state(self, state: Dict):
+        """原子地写出扫描进度"""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.state_path)
+
+    def _clear_state(self):
+        if self.state_path and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    async def _pace(self):
+        """相邻两次上游请求至少间隔 60 / calls_per_minute 秒"""
+        async with self._pace_lock:
+            now = time.monotonic()
+            start = max(now, self._pace_until)
+            self._pace_until = start + 60 / self.calls_per_minute
+        if start > now:
+            await asyncio.sleep(start - now)
+        self.calls += 1
+
+    async def _fetch_history(self, semaphore: asyncio.Semaphore, asset: Dict, interval: str, count: int) -> List[Dict]:
+        async with semaphore:
+            await self._pace()
+            try:
+                return await self.provider.fetch_history(asset["id"], interval, count)
+            except Exception as e:
+                print(f"Error fetching leaderboard history for {asset['id']}: {str(e)}")
+                return []
+
+    def _compute(self, assets: List[Dict], histories: List[List[Dict]]) -> List[Optional[Dict]]:
+        """计算一块资产的预测（在线程中运行），数据不足的资产返回None"""
+        rows = []
+        for asset, points in zip(assets, histories):
+            prices = [float(point["priceUsd"]) for point in points if point.get("priceUsd") is not None]
+            prediction = self.prediction.build_prediction(asset["symbol"], self.days, prices)
+            if prediction.error is not None:
+                rows.append(None)
+                continue
+            target = prediction.target
+            indicators = prediction.indicators
+            rows.append({
+                "id": asset["id"],
+                "symbol": asset["symbol"],
+                "name": asset["name"],
+                "market_rank": asset.get("rank"),
+                "current_price": target.current_price,
+                "target_price": target.target_price,
+                "change_percent": target.change_percent,
+                "trend": target.trend,
+                "confidence": target.confidence,
+                "rsi": indicators.rsi,
+                "momentum_percent": indicators.momentum_percent
+            })
+        return rows
+
+    async def sweep(self) -> Optional[LeaderboardTable]:
+        """
+        运行（或继续）一次完整扫描
+
+        Returns:
+            新的结果表；取不到资产列表时返回None
+        """
+        started = time.monotonic()
+        state = self.state
+        if state is None:
+            await self._pace()
+            universe = await self.provider.fetch_assets(self.universe_size)
+            if not universe:
+                return None
+            state = {
+                "version": STATE_VERSION,
+                "days": self.days,
+                "started_at": time.time(),
+                "universe": universe,
+                "cursor": 0,
+                "results": [],
+                "failed": 0
+            }
+            self.state = state
+
+        bar_seconds, count = self.prediction.select_resolution(self.days)
+        interval = _INTERVAL_NAMES.get(bar_seconds, "d1")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        universe = state["universe"]
+
+        while state["cursor"] < len(universe):
+            chunk = universe[state["cursor"]:state["cursor"] + self.chunk_size]
+            histories = await asyncio.gather(*(
+                self._fetch_history(semaphore, asset, interval, count) for asset in chunk
+            ))
+            rows = await asyncio.to_thread(self._compute, chunk, histories)
+            state["results"].extend(row for row in rows if row is not None)
+            state["failed"] += sum(1 for row in rows if row is None)
+            state["cursor"] += len(chunk)
+            if self.state_path:
+                try:
+                    await asyncio.to_thread(self._save_state, state)
+                except Exception as e:
+                    print(f"Error saving leaderboard state: {str(e)}")
+
+        table = LeaderboardTable(state["results"], self.days, time.time(), len(universe), state["failed"])
+        self.table = table
+        self.state = None
+        self.last_duration = time.monotonic() - started
+        try:
+            self._clear_state()
+        except Exception as e:
+            print(f"Error removing leaderboard state: {str(e)}")
+        return table
+
+    async def run(self, interval: float):
+        """按间隔重复扫描（interval 从上一次扫描结束时算起）"""
+        while True:
+            self.running = True
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Error running leaderboard sweep: {str(e)}")
+            finally:
+                self.running = False
+            await asyncio.sleep(interval)
+
+    def status(self) -> Dict:
+        """扫描进度和上一次完成的结果表信息"""
+        state = self.state
+        table = self.table
+        return {
+            "running": self.running,
+            "days": self.days,
+            "progress": {"done": state["cursor"], "total": len(state["universe"])} if state else None,
+            "completed_at": table.completed_at if table else None,
+            "assets": table.assets if table else 0,
+            "ranked": len(table.rows) if table else 0,
+            "failed": table.failed if table else 0,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "upstream_calls": self.calls
+        }
@@ -0,0 +1,196 @@
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Entry:
+    __slots__ = ("data", "expires_at", "size", "seq")
+
+    def __init__(self, data: Any, expires_at: float, size: int, seq: int):
+        self.data = data
+        self.expires_at = expires_at
+        self.size = size
+        self.seq = seq
+
+
+class MemoryCache:
+    """
+    有界的进程内缓存（无Redis部署使用）
+
+    - 条目数和字节预算双重上限，超出时按LRU淘汰
+    - 过期时间记录在最小堆中，sweep() 只弹出已到期的条目，不扫描全表
+    - 可选的后台线程定期 sweep，冷键不会因为没人读取而一直占用内存
+    - get/set/delete 接口与 CacheManager 一致，可以直接替换
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        default_ttl: int = 300,
+        sweep_interval: float = 30.0
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """从缓存获取数据，命中时刷新LRU位置"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.data
+
+    def set(self, key: str, data: Any, ttl: Optional[int] = None) -> bool:
+        """
+        设置缓存数据
+
+        条目大小按JSON序列化后的字节数估算（bytes 按实际长度）；
+        单个条目超过字节预算时不缓存。
+        """
+        if isinstance(data, (bytes, bytearray)):
+            size = len(data)
+        else:
+            try:
+                size = len(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+            except (TypeError, ValueError):
+                return False
+        if size > self.max_bytes:
+            return False
+
+        ttl = ttl or self.default_ttl
+        expires_at = time.monotonic() + ttl
+        seq = next(self._seq)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(data, expires_at, size, seq)
+            self._bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, seq, key))
+            self._evict()
+            self._compact_heap()
+        return True
+
+    def delete(self, key: str) -> bool:
+        """删除缓存数据"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        return True
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """
+        清理所有已过期的条目
+
+        Returns:
+            本次清理的条目数
+        """
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, seq, key = heapq.heappop(self._expiry_heap)
+                entry = self._entries.get(key)
+                # 堆中可能残留被覆盖或已删除条目的旧记录
+                if entry is not None and entry.seq == seq:
+                    self._remove(key)
+                    removed += 1
+            self._expirations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "sweeper_running": self._sweeper is not None and self._sweeper.is_alive()
+            }
+
+    def start_sweeper(self):
+        """启动后台清理线程"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="memory-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        """停止后台清理线程"""
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=self.sweep_interval)
+            self._sweeper = None
+
+    def close(self):
+        """释放资源"""
+        self.stop_sweeper()
+        self.clear()
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            self.sweep()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        """超出条目数或字节预算时淘汰最久未使用的条目"""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._evictions += 1
+
+    def _compact_heap(self):
+        """被覆盖或淘汰的条目会在堆里留下旧记录，积累过多时重建"""
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [
+                (entry.expires_at, entry.seq, key) for key, entry in self._entries.items()
+            ]
+            heapq.heapify(self._expiry_heap)
@@ -0,0 +1,200 @@
+import json
+from typing import Dict, Optional, Tuple
+
+from src.config import CRYPTO_SYMBOLS
+
+
+def encode_json(content) -> bytes:
+    """与 FastAPI 的 JSONResponse 相同的编码方式，预先序列化的响应和动态响应逐字节一致"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def round_price(value: float) -> float:
+    """大于1的金额保留2位小数，小于1的保留6位有效数字（如以BTC计价的价格、低价币）"""
+    if abs(value) >= 1:
+        return round(value, 2)
+    return float(f"{value:.6g}")
+
+
+class Quote:
+    """单个加密货币的报价"""
+
+    __slots__ = ("id", "symbol", "price_usd", "change_24h")
+
+    def __init__(self, crypto_id: str, symbol: str, price_usd: float, change_24h: float):
+        self.id = crypto_id
+        self.symbol = symbol
+        self.price_usd = price_usd
+        self.change_24h = change_24h
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "price_usd": self.price_usd, "change_24h": self.change_24h}
+
+
+class PriceBoard:
+    """
+    一次刷新得到的全部报价
+
+    每次刷新只构建一次，所有请求共享（只读）：data 是 /crypto/prices 的 data 部分，
+    body 是默认参数（USD、全部字段）下完整响应的JSON字节，请求时直接返回。
+    """
+
+    __slots__ = ("source", "quotes", "data", "body")
+
+    def __init__(self, source: Dict[str, Dict]):
+        # 构建时使用的原始报价，用于判断缓存中的报价是否已经更新
+        self.source = source
+        self.quotes: Tuple[Quote, ...] = tuple(
+            Quote(crypto_id, CRYPTO_SYMBOLS.get(crypto_id, crypto_id.upper()), quote["price_usd"], quote["change_24h"])
+            for crypto_id, quote in source.items()
+        )
+        self.data = {quote.symbol: quote.to_dict() for quote in self.quotes}
+        self.body = encode_json({"data": self.data, "currency": "USD"})
+
+    def matches(self, source: Dict[str, Dict]) -> bool:
+        """是否由这份报价构建（进程内缓存返回同一个对象，Redis 缓存比较内容）"""
+        return source is self.source or source == self.source
+
+
+class CryptoDetail:
+    """
+    单个加密货币的详细信息，body 为默认参数下完整响应的JSON字节
+
+    各数据源返回的字段不同（如 CoinCap 的 supply、CoinGecko 的 circulating_supply / total_supply），
+    data 原样保留数据源返回的全部字段，属性只提供各数据源共有的字段。
+    """
+
+    __slots__ = (
+        "source", "id", "name", "symbol", "price_usd", "change_percent_24h",
+        "volume_usd_24h", "market_cap_usd", "data", "body"
+    )
+
+    def __init__(self, source: Dict):
+        self.source = source
+        self.id = source.get("id")
+        self.name = source.get("name")
+        self.symbol = source.get("symbol")
+        self.price_usd = source.get("price_usd")
+        self.change_percent_24h = source.get("change_percent_24h")
+        self.volume_usd_24h = source.get("volume_usd_24h")
+        self.market_cap_usd = source.get("market_cap_usd")
+        self.data = self.to_dict()
+        self.body = encode_json({"data": self.data, "currency": "USD"})
+
+    def to_dict(self) -> Dict:
+        return dict(self.source)
+
+    def matches(self, source: Dict) -> bool:
+        return source is self.source or source == self.source
+
+
+# 内置基础指标的字段，IndicatorSet 的属性直接对应这些字段
+_CORE_INDICATOR_FIELDS = frozenset((
+    "ma_short", "ma_long", "rsi", "upper_band", "lower_band", "momentum", "momentum_percent", "current_price"
+))
+
+
+class IndicatorSet:
+    """一组技术指标，values 保留全部已计算的指标（包括插件指标）"""
+
+    __slots__ = (
+        "ma_short", "ma_long", "rsi", "upper_band", "lower_band",
+        "momentum", "momentum_percent", "current_price", "values"
+    )
+
+    def __init__(self, indicators: Dict):
+        self.values = indicators
+        self.ma_short = indicators.get("ma_short")
+        self.ma_long = indicators.get("ma_long")
+        self.rsi = indicators.get("rsi")
+        self.upper_band = indicators.get("upper_band")
+        self.lower_band = indicators.get("lower_band")
+        self.momentum = indicators.get("momentum")
+        self.momentum_percent = indicators.get("momentum_percent")
+        self.current_price = indicators.get("current_price")
+
+    def summary(self) -> Dict:
+        """预测结果中展示的指标：固定的基础指标，加上启用的插件指标（如 macd、atr）的全部字段"""
+        summary = {
+            "rsi": self.rsi,
+            "ma_short": self.ma_short,
+            "ma_long": self.ma_long,
+            "momentum_percent": self.momentum_percent
+        }
+        for name, value in self.values.items():
+            if name not in _CORE_INDICATOR_FIELDS:
+                summary[name] = value
+        return summary
+
+
+class PriceTarget:
+    """价格目标"""
+
+    __slots__ = ("current_price", "target_price", "target_high", "target_low", "change_percent", "trend", "confidence")
+
+    def __init__(self, target: Dict):
+        self.current_price = target["current_price"]
+        self.target_price = target["target_price"]
+        self.target_high = target["target_high"]
+        self.target_low = target["target_low"]
+        self.change_percent = target["change_percent"]
+        self.trend = target["trend"]
+        self.confidence = target["confidence"]
+
+    def to_dict(self) -> Dict:
+        return {
+            "current_price": self.current_price,
+            "target_price": self.target_price,
+            "target_high": self.target_high,
+            "target_low": self.target_low,
+            "change_percent": self.change_percent,
+            "trend": self.trend,
+            "confidence": self.confidence
+        }
+
+
+class Prediction:
+    """
+    一次预测的结果
+
+    同一资产、同一天数在数据版本不变时只构建一次；data 为接口返回的字典，
+    body 为默认参数下完整响应的JSON字节。失败的预测只有 symbol 和 error。
+    """
+
+    DISCLAIMER = "此预测基于技术分析，仅供参考，不构成投资建议。"
+
+    __slots__ = ("symbol", "days", "prediction_date", "indicators", "target", "error", "data", "body")
+
+    def __init__(
+        self,
+        symbol: str,
+        days: int,
+        prediction_date: Optional[str] = None,
+        indicators: Optional[IndicatorSet] = None,
+        target: Optional[PriceTarget] = None,
+        error: Optional[str] = None
+    ):
+        self.symbol = symbol
+        self.days = days
+        self.prediction_date = prediction_date
+        self.indicators = indicators
+        self.target = target
+        self.error = error
+        self.data = self.to_dict()
+        self.body = encode_json({"data": self.data, "currency": "USD"})
+
+    @classmethod
+    def failed(cls, symbol: str, days: int, error: str) -> "Prediction":
+        return cls(symbol, days, error=error)
+
+    def to_dict(self) -> Dict:
+        if self.error is not None:
+            return {"error": self.error, "symbol": self.symbol}
+        return {
+            "symbol": self.symbol,
+            "prediction_period": f"{self.days}_days",
+            "prediction_date": self.prediction_date,
+            "technical_indicators": self.indicators.summary(),
+            "prediction": self.target.to_dict(),
+            "disclaimer": self.DISCLAIMER
+        }
@@ -0,0 +1,196 @@
+import bisect
+import math
+import random
+from array import array
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import accumulate
+from operator import is_not, itemgetter
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+from src.history_store import HistoryStore
+
+
+MONTECARLO_METHODS = ("gbm", "bootstrap")
+
+
+class MonteCarloForecaster:
+    """
+    概率预测：用历史收益率模拟到期价格的分布
+
+    - gbm: 以历史对数收益率的均值和标准差作为几何布朗运动的参数，
+      到期的对数收益率服从正态分布；对标准正态做分层抽样（每条路径取一个分位点），
+      直接得到有序的到期价格，不需要逐步模拟路径，也不需要排序
+    - bootstrap: 把历史收益率按 k 根K线分块求和，从块中有放回抽样拼成整个预测期，
+      保留真实收益率的肥尾和偏度；k = ceil(预测期K线数 / max_steps)，最后一块可以更短。
+      随机下标一次性由 randbytes 生成，再用 itemgetter 批量取值，避免逐个调用随机数
+
+    排序后的到期价格按 (资产, 天数, 方法, 数据版本) 缓存，
+    数据不变时不同价位的概率查询只需二分查找。
+    """
+
+    PERCENTILES = (5, 25, 50, 75, 95)
+    # bootstrap 至少需要的候选块数
+    MIN_POOL = 10
+
+    def __init__(self, history: HistoryStore, paths: int = 2000, max_steps: int = 12, lookback_days: int = 90):
+        self.history = history
+        self.paths = paths
+        self.max_steps = max_steps
+        self.lookback_days = lookback_days
+        # 分层抽样使用的标准正态分位点（升序）
+        normal = NormalDist()
+        self._normal_grid = [normal.inv_cdf((i + 0.5) / paths) for i in range(paths)]
+        # (crypto_id, days, method) -> ((数据版本, 日期), 排序后的到期价格, 当前价格, 结果摘要)
+        self._cache: Dict[Tuple[str, int, str], Tuple[Tuple[int, str], List[float], float, Dict]] = {}
+
+    async def forecast(
+        self,
+        crypto_id: str,
+        days: int,
+        bar_seconds: int,
+        method: str = "gbm",
+        level: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        模拟预测期末的价格分布
+
+        Args:
+            crypto_id: 加密货币ID
+            days: 预测天数
+            bar_seconds: 估计参数使用的收益率周期（秒）
+            method: gbm 或 bootstrap
+            level: 计算涨破/跌破概率的价位（USD），默认当前价格
+
+        Returns:
+            预测结果，历史数据不足时返回None
+        """
+        series = await self.history.get_series(crypto_id)
+        if series is None:
+            return None
+
+        key = (crypto_id, days, method)
+        state = (series.version, datetime.now().strftime("%Y-%m-%d"))
+        cached = self._cache.get(key)
+        if cached is None or cached[0] != state:
+            # 回看窗口至少要能切出 MIN_POOL 个（互相重叠的）bootstrap 块
+            lookback = max(days, self.lookback_days) * 86400 // bar_seconds
+            block = self._block_size(days * 86400 // bar_seconds)
+            count = max(lookback, block + self.MIN_POOL - 1) + 1
+            closes = self.history.resample(crypto_id, series, bar_seconds, count)
+            simulated = self._simulate(crypto_id, days, bar_seconds, method, closes, series.version)
+            if simulated is None:
+                return None
+            cached = (state, *simulated)
+            self._cache[key] = cached
+
+        _, terminal, current_price, summary = cached
+        level = current_price if level is None else level
+        above = 1 - bisect.bisect_right(terminal, level) / len(terminal)
+
+        result = dict(summary)
+        result["prediction"] = {
+            **summary["prediction"],
+            "level": round(level, 2),
+            "probability_above": round(above, 4),
+            "probability_below": round(1 - above, 4)
+        }
+        return result
+
+    def _simulate(
+        self,
+        crypto_id: str,
+        days: int,
+        bar_seconds: int,
+        method: str,
+        closes: List[float],
+        version: int
+    ) -> Optional[Tuple[List[float], float, Dict]]:
+        returns = [
+            math.log(current / previous)
+            for previous, current in zip(closes, closes[1:])
+            if previous > 0 and current > 0
+        ]
+        if len(returns) < 10:
+            return None
+
+        current_price = closes[-1]
+        horizon = days * 86400 // bar_seconds  # 预测期内的K线数
+        n = len(returns)
+        mu = math.fsum(returns) / n
+        sigma = math.sqrt(math.fsum((r - mu) ** 2 for r in returns) / (n - 1))
+
+        if method == "bootstrap":
+            block = self._block_size(horizon)
+            steps = -(-horizon // block)
+            tail = horizon - (steps - 1) * block  # 最后一块的长度
+            sums = list(accumulate(returns, initial=0.0))
+            pool = [sums[i + block] - sums[i] for i in range(n - block + 1)]
+            tail_pool = pool if tail == block else [sums[i + tail] - sums[i] for i in range(n - tail + 1)]
+            if len(pool) < self.MIN_POOL:
+                return None
+            # 同一份数据的模拟结果可复现
+            rng = random.Random(f"{crypto_id}:{days}:{method}:{version}")
+            full = steps - 1
+            draws = self._draw(rng, pool[-65536:], full * self.paths)
+            last = self._draw(rng, tail_pool[-65536:], self.paths)
+            terminal = sorted(
+                current_price * math.exp(sum(draws[i * full:(i + 1) * full]) + last[i])
+                for i in range(self.paths)
+            )
+        else:
+            drift = mu * horizon
+            scale = sigma * math.sqrt(horizon)
+            terminal = [current_price * math.exp(drift + scale * z) for z in self._normal_grid]
+
+        paths = len(terminal)
+
+        periods_per_year = 365 * 86400 / bar_seconds
+        summary = {
+            "symbol": crypto_id.upper(),
+            "mode": "montecarlo",
+            "method": method,
+            "prediction_period": f"{days}_days",
+            "prediction_date": (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d"),
+            "paths": paths,
+            "model": {
+                "observations": n,
+                "drift_annual": round(mu * periods_per_year, 4),
+                "volatility_annual": round(sigma * math.sqrt(periods_per_year), 4)
+            },
+            "prediction": {
+                "current_price": round(current_price, 2),
+                "expected_price": round(math.fsum(terminal) / paths, 2),
+                "price_percentiles": {
+                    f"p{q}": round(terminal[min(paths - 1, int(q / 100 * paths))], 2)
+                    for q in self.PERCENTILES
+                }
+            },
+            "disclaimer": "此预测基于历史波动的随机模拟，仅供参考，不构成投资建议。"
+        }
+        return terminal, current_price, summary
+
+    def _block_size(self, horizon: int) -> int:
+        """bootstrap 每块的K线数：使块数不超过 max_steps"""
+        return max(1, -(-horizon // self.max_steps))
+
+    @staticmethod
+    def _draw(rng: random.Random, pool: List[float], count: int) -> List[float]:
+        """
+        从 pool 中有放回地均匀抽取 count 个值
+
+        把 pool 重复铺满 65536 个位置（余下的位置填 None），用16位随机数作下标批量取值，
+        再丢弃落在 None 上的结果，保证每个值被抽中的概率相同。pool 不能超过65536个。
+        """
+        repeat = 65536 // len(pool)
+        table = pool * repeat + [None] * (65536 - len(pool) * repeat)
+        keep = partial(is_not, None)
+
+        draws: List[float] = []
+        while len(draws) < count:
+            # 多取一些，补偿被丢弃的下标，也保证 itemgetter 至少有两个下标（返回元组）
+            indices = array("H", rng.randbytes(2 * (count - len(draws) + 64)))
+            draws.extend(filter(keep, itemgetter(*indices)(table)))
+        del draws[count:]
+        return draws
@@ -0,0 +1,408 @@
+import asyncio
+import bisect
+import math
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+
+class BookSide:
+    """
+    订单簿的一侧（L2，按价位聚合）
+
+    价位按从优到劣的顺序保存在有序列表中（买方存负价格，两侧都按升序排列），
+    数量放在 价格->数量 的字典里：最优价为O(1)，更新一个价位为二分查找加一次列表插入/删除。
+    """
+
+    __slots__ = ("descending", "keys", "sizes")
+
+    def __init__(self, descending: bool):
+        self.descending = descending  # 买方价格从高到低
+        self.keys: List[float] = []
+        self.sizes: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _key(self, price: float) -> float:
+        return -price if self.descending else price
+
+    def _price(self, key: float) -> float:
+        return -key if self.descending else key
+
+    def set(self, price: float, size: float):
+        """设置价位的数量，数量为0时删除该价位"""
+        if size <= 0:
+            if self.sizes.pop(price, None) is not None:
+                key = self._key(price)
+                del self.keys[bisect.bisect_left(self.keys, key)]
+            return
+        if price not in self.sizes:
+            bisect.insort(self.keys, self._key(price))
+        self.sizes[price] = size
+
+    def clear(self):
+        self.keys.clear()
+        self.sizes.clear()
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        """最优价位 (价格, 数量)，没有挂单时返回None"""
+        if not self.keys:
+            return None
+        price = self._price(self.keys[0])
+        return price, self.sizes[price]
+
+    def levels(self, limit: int) -> List[List[float]]:
+        """从最优价开始的前 limit 个价位 [[价格, 数量], ...]"""
+        result = []
+        for key in self.keys[:limit]:
+            price = self._price(key)
+            result.append([price, self.sizes[price]])
+        return result
+
+    def depth(self, limit_price: float) -> Tuple[float, float, int]:
+        """
+        价格不劣于 limit_price 的挂单合计
+
+        Returns:
+            (数量, 金额, 价位数)
+        """
+        end = bisect.bisect_right(self.keys, self._key(limit_price))
+        size = notional = 0.0
+        for key in self.keys[:end]:
+            price = self._price(key)
+            level = self.sizes[price]
+            size += level
+            notional += price * level
+        return size, notional, end
+
+
+class OrderBook:
+    """
+    单个资产的L2订单簿
+
+    先用快照初始化，之后按序号应用增量更新：每个增量带 U（第一个更新序号）和 u（最后一个更新序号），
+    u 不大于当前序号的增量已经包含在快照中，直接忽略；U 大于当前序号+1 说明中间有增量丢失，
+    订单簿标记为未同步，需要重新获取快照。
+    """
+
+    __slots__ = ("crypto_id", "bids", "asks", "last_update_id", "synced", "updated_at")
+
+    def __init__(self, crypto_id: str):
+        self.crypto_id = crypto_id
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = 0
+        self.synced = False
+        self.updated_at = 0.0
+
+    def load_snapshot(self, snapshot: Dict):
+        """
+        用快照替换整个订单簿
+
+        Args:
+            snapshot: {"last_update_id": 序号, "bids": [[价格, 数量]], "asks": [[价格, 数量]]}
+        """
+        self.bids.clear()
+        self.asks.clear()
+        for price, size in snapshot["bids"]:
+            self.bids.set(price, size)
+        for price, size in snapshot["asks"]:
+            self.asks.set(price, size)
+        self.last_update_id = snapshot["last_update_id"]
+        self.synced = True
+        self.updated_at = time.time()
+
+    def apply_diff(self, diff: Dict) -> bool:
+        """
+        应用一个增量更新
+
+        Args:
+            diff: {"U": 第一个更新序号, "u": 最后一个更新序号, "bids": [[价格, 数量]], "asks": [...]}，
+                数量为0表示删除该价位
+
+        Returns:
+            是否仍然同步；返回False时需要重新获取快照
+        """
+        if not self.synced:
+            return False
+        if diff["u"] <= self.last_update_id:
+            return True
+        if diff["U"] > self.last_update_id + 1:
+            self.synced = False
+            return False
+
+        for price, size in diff["bids"]:
+            self.bids.set(price, size)
+        for price, size in diff["asks"]:
+            self.asks.set(price, size)
+        self.last_update_id = diff["u"]
+        self.updated_at = time.time()
+        return True
+
+    def top(self) -> Optional[Dict]:
+        """最优买卖价、价差和中间价，任一侧为空时返回None"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        mid = round((bid[0] + ask[0]) / 2, 10)
+        spread = round(ask[0] - bid[0], 10)
+        return {
+            "bid_price": bid[0],
+            "bid_size": bid[1],
+            "ask_price": ask[0],
+            "ask_size": ask[1],
+            "mid_price": mid,
+            "spread": spread,
+            "spread_bps": round(spread / mid * 10000, 4) if mid > 0 else None
+        }
+
+    def depth(self, percent: float) -> Optional[Dict]:
+        """
+        中间价上下 percent% 以内的挂单量
+
+        Returns:
+            {"mid_price", "percent", "bids": {...}, "asks": {...}}，任一侧为空时返回None
+        """
+        top = self.top()
+        if top is None:
+            return None
+        mid = top["mid_price"]
+        bid_size, bid_notional, bid_levels = self.bids.depth(mid * (1 - percent / 100))
+        ask_size, ask_notional, ask_levels = self.asks.depth(mid * (1 + percent / 100))
+        return {
+            "mid_price": mid,
+            "percent": percent,
+            "bids": {"size": round(bid_size, 8), "notional_usd": round(bid_notional, 2), "levels": bid_levels},
+            "asks": {"size": round(ask_size, 8), "notional_usd": round(ask_notional, 2), "levels": ask_levels},
+            "imbalance": round((bid_size - ask_size) / (bid_size + ask_size), 4) if bid_size + ask_size else None
+        }
+
+    def levels(self, limit: int) -> Dict:
+        """前 limit 档买卖盘"""
+        return {
+            "last_update_id": self.last_update_id,
+            "updated_at": self.updated_at,
+            "bids": self.bids.levels(limit),
+            "asks": self.asks.levels(limit)
+        }
+
+
+class OrderBookManager:
+    """
+    维护所有资产的订单簿
+
+    从行情源（feed）读取增量流并应用到对应的订单簿。发现序号缺口时重新同步：
+    先缓存该资产之后到达的增量，再获取快照，快照之后的增量按序应用，期间其他资产照常更新。
+
+    feed 需要提供 async fetch_snapshot(crypto_id) 和异步迭代的 stream()，
+    增量格式为 {"id": 资产ID, "U", "u", "bids", "asks"}。
+    """
+
+    def __init__(self, feed, crypto_ids: List[str]):
+        self.feed = feed
+        self.books: Dict[str, OrderBook] = {crypto_id: OrderBook(crypto_id) for crypto_id in crypto_ids}
+        # 正在重新同步的资产 -> 期间到达的增量
+        self._pending: Dict[str, List[Dict]] = {}
+        self._resync_tasks: Dict[str, asyncio.Task] = {}
+        self.diffs_applied = 0
+        self.resyncs = 0
+
+    def get(self, crypto_id: str) -> Optional[OrderBook]:
+        """已同步的订单簿，没有或正在重新同步时返回None"""
+        book = self.books.get(crypto_id)
+        if book is None or not book.synced:
+            return None
+        return book
+
+    async def run(self):
+        """初始化全部订单簿，然后持续应用增量"""
+        stream = self.feed.stream()
+        for crypto_id in self.books:
+            self._start_resync(crypto_id)
+        async for diff in stream:
+            self.on_diff(diff)
+
+    def on_diff(self, diff: Dict):
+        """处理一个增量，序号不连续时触发重新同步"""
+        crypto_id = diff["id"]
+        book = self.books.get(crypto_id)
+        if book is None:
+            return
+
+        pending = self._pending.get(crypto_id)
+        if pending is not None:
+            pending.append(diff)
+            return
+
+        if book.apply_diff(diff):
+            self.diffs_applied += 1
+        else:
+            self._start_resync(crypto_id)
+            self._pending[crypto_id].append(diff)
+
+    def _start_resync(self, crypto_id: str):
+        self._pending[crypto_id] = []
+        task = asyncio.create_task(self._resync(crypto_id))
+        self._resync_tasks[crypto_id] = task
+        task.add_done_callback(lambda _: self._resync_tasks.pop(crypto_id, None))
+
+    async def _resync(self, crypto_id: str):
+        book = self.books[crypto_id]
+        try:
+            snapshot = await self.feed.fetch_snapshot(crypto_id)
+        except Exception as e:
+            print(f"Error fetching order book snapshot for {crypto_id}: {str(e)}")
+            snapshot = None
+
+        pending = self._pending.pop(crypto_id, [])
+        if snapshot is None:
+            # 稍后由下一个增量再次触发
+            book.synced = False
+            return
+
+        book.load_snapshot(snapshot)
+        self.resyncs += 1
+        for diff in pending:
+            self.on_diff(diff)
+
+    def stats(self) -> Dict:
+        return {
+            "assets": len(self.books),
+            "synced": sum(1 for book in self.books.values() if book.synced),
+            "diffs_applied": self.diffs_applied,
+            "resyncs": self.resyncs
+        }
+
+    async def close(self):
+        for task in list(self._resync_tasks.values()):
+            task.cancel()
+
+
+class SimulatedExchange:
+    """
+    本地模拟的交易所行情源
+
+    每个资产维护一个真实订单簿，中间价围绕参考价格（价格刷新回调写入的现价）随机游走，
+    每隔 interval 秒对靠近盘口的若干价位随机改单/撤单并随中间价移动挂单范围，
+    把变化作为带序号的增量发出。drop_rate 模拟增量丢失，用于测试重新同步。
+    随机种子固定时输出可复现。
+
+    Args:
+        crypto_ids: 资产ID
+        levels: 每侧维持的价位数
+        interval: 增量间隔（秒）
+        drop_rate: 丢弃增量的概率
+        seed: 随机种子
+    """
+
+    def __init__(
+        self,
+        crypto_ids: List[str],
+        levels: int = 50,
+        interval: float = 0.1,
+        drop_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.crypto_ids = list(crypto_ids)
+        self.levels = levels
+        self.interval = interval
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self._reference: Dict[str, float] = {}
+        self._mid: Dict[str, float] = {}
+        self._tick: Dict[str, float] = {}
+        self._bids: Dict[str, Dict[float, float]] = {}
+        self._asks: Dict[str, Dict[float, float]] = {}
+        self._seq: Dict[str, int] = {}
+
+    def set_reference(self, crypto_id: str, price: float):
+        """设置资产的参考价格；第一次设置时建立订单簿"""
+        if price <= 0:
+            return
+        self._reference[crypto_id] = price
+        if crypto_id not in self._mid:
+            # 最小价格变动约为价格的0.01%，取10的整数次幂
+            self._tick[crypto_id] = 10.0 ** math.floor(math.log10(price * 1e-4))
+            self._mid[crypto_id] = price
+            self._bids[crypto_id] = {}
+            self._asks[crypto_id] = {}
+            self._seq[crypto_id] = 0
+            self._step(crypto_id)
+
+    def on_prices(self, quotes: Dict[str, Dict], timestamp: float):
+        """价格刷新回调：更新参考价格"""
+        for crypto_id, quote in quotes.items():
+            if crypto_id in self.crypto_ids:
+                self.set_reference(crypto_id, quote["price_usd"])
+
+    def _round(self, crypto_id: str, price: float) -> float:
+        tick = self._tick[crypto_id]
+        return round(round(price / tick) * tick, 10)
+
+    def _size(self) -> float:
+        return round(self.rng.expovariate(1.0) * 2 + 0.0001, 4)
+
+    def _step(self, crypto_id: str) -> Optional[Dict]:
+        """推进一步，返回这一步的增量（没有变化时返回None）"""
+        rng = self.rng
+        tick = self._tick[crypto_id]
+        reference = self._reference[crypto_id]
+        # 中间价向参考价格回归，叠加随机扰动
+        mid = self._mid[crypto_id]
+        mid += (reference - mid) * 0.1 + rng.gauss(0, reference * 2e-4)
+        self._mid[crypto_id] = mid
+
+        best_bid = self._round(crypto_id, mid - tick / 2)
+        best_ask = max(self._round(crypto_id, mid + tick / 2), best_bid + tick)
+        bid_range = {self._round(crypto_id, best_bid - i * tick) for i in range(self.levels)}
+        ask_range = {self._round(crypto_id, best_ask + i * tick) for i in range(self.levels)}
+
+        changes = ([], [])
+        for side, book, valid in ((0, self._bids[crypto_id], bid_range), (1, self._asks[crypto_id], ask_range)):
+            # 移出范围的价位撤单，新进入范围的价位挂单
+            for price in [price for price in book if price not in valid]:
+                del book[price]
+                changes[side].append([price, 0.0])
+            for price in valid:
+                if price not in book:
+                    book[price] = self._size()
+                    changes[side].append([price, book[price]])
+            # 靠近盘口的价位更活跃
+            ordered = sorted(book, reverse=(side == 0))
+            for _ in range(3):
+                price = ordered[min(len(ordered) - 1, int(rng.expovariate(0.3)))]
+                if rng.random() < 0.2:
+                    if book.pop(price, None) is not None:
+                        changes[side].append([price, 0.0])
+                else:
+                    book[price] = self._size()
+                    changes[side].append([price, book[price]])
+
+        if not changes[0] and not changes[1]:
+            return None
+        first = self._seq[crypto_id] + 1
+        self._seq[crypto_id] = first
+        return {"id": crypto_id, "U": first, "u": first, "bids": changes[0], "asks": changes[1]}
+
+    async def fetch_snapshot(self, crypto_id: str) -> Optional[Dict]:
+        """当前订单簿快照，资产还没有参考价格时返回None"""
+        await asyncio.sleep(0)
+        if crypto_id not in self._mid:
+            return None
+        return {
+            "last_update_id": self._seq[crypto_id],
+            "bids": sorted(([p, s] for p, s in self._bids[crypto_id].items()), reverse=True),
+            "asks": sorted([p, s] for p, s in self._asks[crypto_id].items())
+        }
+
+    async def stream(self) -> AsyncIterator[Dict]:
+        """增量流"""
+        while True:
+            await asyncio.sleep(self.interval)
+            for crypto_id in self.crypto_ids:
+                if crypto_id not in self._mid:
+                    continue
+                diff = self._step(crypto_id)
+                if diff is not None and self.rng.random() >= self.drop_rate:
+                    yield diff
@@ -1,19 +1,41 @@
-import requests
 import asyncio
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import statistics
-from src.config import COINCAP_API_BASE
+from src.config import (
+    HISTORY_MAX_DAYS, HISTORY_TTL, MIN_PREDICTION_DAYS, MAX_PREDICTION_DAYS,
+    PREDICTION_INDICATORS, PREDICTION_SCORING_RULES
+)
+from src.history_store import HistoryStore
+from src.indicators import IndicatorEngine
+from src.models import IndicatorSet, Prediction, PriceTarget, round_price
+from src.montecarlo import MonteCarloForecaster
+from src.providers import MarketDataProvider, create_provider
 
 
 class PredictionService:
     """加密货币价格预测服务"""
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'CryptoMarketBot/1.0'
-        })
+    # 可选的K线周期（秒）：1小时、4小时、1天
+    RESOLUTION_LADDER = (3600, 14400, 86400)
+    # 单次预测使用的最多K线数量
+    MAX_BARS = 72
+
+    def __init__(
+        self,
+        provider: Optional[MarketDataProvider] = None,
+        history: Optional[HistoryStore] = None,
+        indicators: Optional[IndicatorEngine] = None
+    ):
+        self.provider = provider or create_provider()
+        self.history = history or HistoryStore(self.provider, max_points=HISTORY_MAX_DAYS * 24, ttl=HISTORY_TTL)
+        self.montecarlo = MonteCarloForecaster(self.history)
+        self.indicators = indicators or IndicatorEngine(PREDICTION_INDICATORS, PREDICTION_SCORING_RULES)
+        # (crypto_id, days) -> (数据版本, 日期, 预测结果)；数据和日期不变时直接复用
+        self._predictions: Dict[Tuple[str, int], Tuple[int, str, Prediction]] = {}
+
+    def close(self):
+        """关闭上游数据源的HTTP会话"""
+        self.provider.close()
 
     async def fetch_historical_data(self, crypto_id: str, interval: str = "h1", limit: int = 24) -> List[Dict]:
         """
@@ -27,23 +49,11 @@ class PredictionService:
         Returns:
             历史价格数据列表
         """
-        try:
-            response = self.session.get(
-                f"{COINCAP_API_BASE}/assets/{crypto_id}/history",
-                params={"interval": interval, "limit": limit}
-            )
-            response.raise_for_status()
-
-            data = response.json()
-            return data.get('data', [])
-
-        except Exception as e:
-            print(f"Error fetching historical data for {crypto_id}: {str(e)}")
-            return []
+        return await self.provider.fetch_history(crypto_id, interval, limit)
 
     def calculate_technical_indicators(self, prices: List[float]) -> Dict:
         """
-        计算技术指标
+        计算技术指标（按 src.indicators 注册表计算启用的指标，共享中间结果）
 
         Args:
             prices: 价格列表
@@ -51,63 +61,11 @@ class PredictionService:
         Returns:
             技术指标字典
         """
-        if not prices or len(prices) < 5:
-            return {}
-
-        # 移动平均线
-        ma_short = statistics.mean(prices[-5:])  # 5期移动平均
-        ma_long = statistics.mean(prices[-20:]) if len(prices) >= 20 else ma_short
-
-        # 相对强弱指标（简化版）
-        def calculate_rsi(price_list, period=14):
-            if len(price_list) < period + 1:
-                return 50
-
-            gains = []
-            losses = []
-
-            for i in range(1, len(price_list)):
-                change = price_list[i] - price_list[i-1]
-                if change > 0:
-                    gains.append(change)
-                    losses.append(0)
-                else:
-                    gains.append(0)
-                    losses.append(abs(change))
-
-            avg_gain = statistics.mean(gains[-period:])
-            avg_loss = statistics.mean(losses[-period:])
-
-            if avg_loss == 0:
-                return 100
-
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi
-
-        # 布林带
-        std_dev = statistics.stdev(prices[-20:]) if len(prices) >= 20 else 0
-        upper_band = ma_long + (2 * std_dev)
-        lower_band = ma_long - (2 * std_dev)
-
-        # 动量指标
-        momentum = prices[-1] - prices[-5] if len(prices) >= 5 else 0
-        momentum_percent = (momentum / prices[-5]) * 100 if prices[-5] != 0 else 0
-
-        return {
-            "ma_short": round(ma_short, 2),
-            "ma_long": round(ma_long, 2),
-            "rsi": round(calculate_rsi(prices), 2),
-            "upper_band": round(upper_band, 2),
-            "lower_band": round(lower_band, 2),
-            "momentum": round(momentum, 2),
-            "momentum_percent": round(momentum_percent, 2),
-            "current_price": round(prices[-1], 2)
-        }
+        return self.indicators.compute(prices)
 
     def analyze_trend(self, indicators: Dict) -> str:
         """
-        分析趋势
+        分析趋势（启用的评分规则分数之和）
 
         Args:
             indicators: 技术指标字典
@@ -115,36 +73,7 @@ class PredictionService:
         Returns:
             趋势判断 (bullish/bearish/neutral)
         """
-        score = 0
-
-        # MA交叉判断
-        if indicators.get("ma_short", 0) > indicators.get("ma_long", 0):
-            score += 2  # 金叉，看涨
-        else:
-            score -= 2  # 死叉，看跌
-
-        # RSI判断
-        rsi = indicators.get("rsi", 50)
-        if rsi < 30:
-            score += 1  # 超卖，可能反弹
-        elif rsi > 70:
-            score -= 1  # 超买，可能回调
-
-        # 动量判断
-        if indicators.get("momentum_percent", 0) > 5:
-            score += 2  # 强劲上涨动量
-        elif indicators.get("momentum_percent", 0) < -5:
-            score -= 2  # 下跌动量
-
-        # 布林带位置
-        current = indicators.get("current_price", 0)
-        upper = indicators.get("upper_band", 0)
-        lower = indicators.get("lower_band", 0)
-
-        if current > upper:
-            score -= 1  # 超过上轨，可能回调
-        elif current < lower:
-            score += 1  # 低于下轨，可能反弹
+        score = self.indicators.score(indicators)
 
         # 综合判断
         if score >= 3:
@@ -201,10 +130,10 @@ class PredictionService:
         change_percent = ((target_price - current_price) / current_price) * 100 if current_price > 0 else 0
 
         return {
-            "current_price": round(current_price, 2),
-            "target_price": round(target_price, 2),
-            "target_high": round(target_high, 2),
-            "target_low": round(target_low, 2),
+            "current_price": round_price(current_price),
+            "target_price": round_price(target_price),
+            "target_high": round_price(target_high),
+            "target_low": round_price(target_low),
             "change_percent": round(change_percent, 2),
             "trend": trend,
             "confidence": self.calculate_confidence(trend, indicators)
@@ -238,50 +167,78 @@ class PredictionService:
         else:
             return "low"
 
+    def select_resolution(self, days: int) -> Tuple[int, int]:
+        """
+        根据预测天数选择K线周期和数量
+
+        回看与预测相同的天数，在 RESOLUTION_LADDER 中选择使周期数不超过
+        MAX_BARS 的最小周期（3天=72根1小时，7天=42根4小时，30天=30根日线）。
+
+        Returns:
+            (周期秒数, 周期数量)
+        """
+        lookback = days * 86400
+        for bar_seconds in self.RESOLUTION_LADDER:
+            if lookback // bar_seconds <= self.MAX_BARS:
+                return bar_seconds, lookback // bar_seconds
+        bar_seconds = self.RESOLUTION_LADDER[-1]
+        return bar_seconds, lookback // bar_seconds
+
     async def predict_crypto_price(self, crypto_id: str, days: int) -> Dict:
         """
         预测加密货币价格
 
         Args:
             crypto_id: 加密货币ID
-            days: 预测天数 (3, 7, 30)
+            days: 预测天数 (1-365)
 
         Returns:
-            预测结果字典
+            预测结果字典（与其他请求共享，调用方不应修改）
+        """
+        return (await self.get_prediction(crypto_id, days)).data
+
+    async def get_prediction(self, crypto_id: str, days: int) -> Prediction:
+        """
+        预测加密货币价格，返回只读的预测模型
+
+        历史数据版本和日期都没有变化时直接返回上次的结果。
         """
+        symbol = crypto_id.upper()
+
         # 验证天数
-        if days not in [3, 7, 30]:
-            return {
-                "error": "days must be 3, 7, or 30",
-                "symbol": crypto_id.upper()
-            }
+        if not MIN_PREDICTION_DAYS <= days <= MAX_PREDICTION_DAYS:
+            return Prediction.failed(symbol, days, f"days must be between {MIN_PREDICTION_DAYS} and {MAX_PREDICTION_DAYS}")
 
-        # 根据天数选择不同的时间间隔
-        interval_map = {
-            3: ("h1", 72),    # 3天 = 72小时
-            7: ("h4", 42),    # 7天 = 42个4小时
-            30: ("d1", 30)     # 30天 = 30个1天
-        }
+        # 所有预测天数共用同一条历史序列，按需降采样
+        series = await self.history.get_series(crypto_id)
 
-        interval, limit = interval_map[days]
+        if series is None or len(series) < 5:
+            return Prediction.failed(symbol, days, "Insufficient data for prediction")
 
-        # 获取历史数据
-        historical_data = await self.fetch_historical_data(crypto_id, interval, limit)
+        today = datetime.now().strftime("%Y-%m-%d")
+        cached = self._predictions.get((crypto_id, days))
+        if cached is not None and cached[0] == series.version and cached[1] == today:
+            return cached[2]
 
-        if not historical_data or len(historical_data) < 5:
-            return {
-                "error": "Insufficient data for prediction",
-                "symbol": crypto_id.upper()
-            }
+        bar_seconds, count = self.select_resolution(days)
+        prices = self.history.resample(crypto_id, series, bar_seconds, count)
 
-        # 提取价格数据
-        prices = [float(data['priceUsd']) for data in historical_data if 'priceUsd' in data]
+        prediction = self.build_prediction(symbol, days, prices)
+        if prediction.error is None:
+            self._predictions[(crypto_id, days)] = (series.version, today, prediction)
+        return prediction
+
+    def build_prediction(self, symbol: str, days: int, prices: List[float]) -> Prediction:
+        """
+        由价格序列计算预测（纯计算，不访问上游，可在线程中运行）
 
+        Args:
+            symbol: 资产符号
+            days: 预测天数
+            prices: select_resolution(days) 周期的价格序列，按时间升序
+        """
         if len(prices) < 5:
-            return {
-                "error": "Insufficient price data",
-                "symbol": crypto_id.upper()
-            }
+            return Prediction.failed(symbol, days, "Insufficient price data")
 
         # 计算技术指标
         indicators = self.calculate_technical_indicators(prices)
@@ -293,29 +250,61 @@ class PredictionService:
         price_target = self.calculate_price_target(indicators, trend, days)
 
         # 构建预测结果
-        result = {
-            "symbol": crypto_id.upper(),
-            "prediction_period": f"{days}_days",
-            "prediction_date": (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d"),
-            "technical_indicators": {
-                "rsi": indicators.get("rsi"),
-                "ma_short": indicators.get("ma_short"),
-                "ma_long": indicators.get("ma_long"),
-                "momentum_percent": indicators.get("momentum_percent")
-            },
-            "prediction": price_target,
-            "disclaimer": "此预测基于技术分析，仅供参考，不构成投资建议。"
-        }
+        return Prediction(
+            symbol,
+            days,
+            prediction_date=(datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d"),
+            indicators=IndicatorSet(indicators),
+            target=PriceTarget(price_target)
+        )
+
+    async def predict_montecarlo(
+        self,
+        crypto_id: str,
+        days: int,
+        method: str = "gbm",
+        level: Optional[float] = None
+    ) -> Dict:
+        """
+        蒙特卡洛概率预测
+
+        Args:
+            crypto_id: 加密货币ID
+            days: 预测天数 (1-365)
+            method: gbm（几何布朗运动）或 bootstrap（历史收益率重抽样）
+            level: 计算涨破/跌破概率的价位（USD），默认当前价格
+
+        Returns:
+            价格分位数、期望价格和概率；数据不足时返回带 error 的字典
+        """
+        if not MIN_PREDICTION_DAYS <= days <= MAX_PREDICTION_DAYS:
+            return {
+                "error": f"days must be between {MIN_PREDICTION_DAYS} and {MAX_PREDICTION_DAYS}",
+                "symbol": crypto_id.upper()
+            }
 
+        bar_seconds, _ = self.select_resolution(days)
+        result = await self.montecarlo.forecast(crypto_id, days, bar_seconds, method, level)
+        if result is None:
+            return {
+                "error": "Insufficient data for prediction",
+                "symbol": crypto_id.upper()
+            }
         return result
 
-    async def predict_multiple_cryptos(self, crypto_ids: List[str], days: int) -> Dict:
+    async def predict_multiple_cryptos(
+        self,
+        crypto_ids: List[str],
+        days: int,
+        predict: Optional[Callable[[str, int], Awaitable[Dict]]] = None
+    ) -> Dict:
         """
         批量预测多个加密货币
 
         Args:
             crypto_ids: 加密货币ID列表
             days: 预测天数
+            predict: 单个资产的预测函数，默认 predict_crypto_price（集群模式下由路由转发给负责节点）
 
         Returns:
             预测结果字典
@@ -323,7 +312,8 @@ class PredictionService:
         results = {}
 
         # 并发获取所有预测
-        tasks = [self.predict_crypto_price(crypto_id, days) for crypto_id in crypto_ids]
+        predict = predict or self.predict_crypto_price
+        tasks = [predict(crypto_id, days) for crypto_id in crypto_ids]
         predictions = await asyncio.gather(*tasks, return_exceptions=True)
 
         for crypto_id, prediction in zip(crypto_ids, predictions):
@@ -340,7 +330,3 @@ class PredictionService:
             "prediction_period": f"{days}_days",
             "timestamp": datetime.now().isoformat()
         }
-
-
-# 创建全局预测服务实例
-prediction_service = PredictionService()
\ No newline at end of file
@@ -0,0 +1,556 @@
+import asyncio
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import requests
+
+from src.config import (
+    COINCAP_API_BASE, COINGECKO_API_BASE, MARKET_PROVIDER,
+    UPSTREAM_MODE, UPSTREAM_FIXTURE, UPSTREAM_REPLAY_PACING, UPSTREAM_REPLAY_SPEED
+)
+from src.jsonstream import STREAM_CHUNK_SIZE, iter_json_array
+from src.replay import create_upstream
+
+
+T = TypeVar("T")
+
+
+def history_arrays(points: Iterable[Dict]) -> Optional[Tuple[array, array]]:
+    """
+    把 fetch_history 格式的数据点转换成时间和价格数组
+
+    Args:
+        points: [{"priceUsd": 价格, "time": 毫秒时间戳}]，可以是边解析边产出的迭代器
+
+    Returns:
+        (array("q") 时间秒数, array("d") 价格)，时间严格递增；没有有效数据点时返回None
+    """
+    times = array("q")
+    prices = array("d")
+    for point in points:
+        if 'priceUsd' not in point or 'time' not in point:
+            continue
+        timestamp = int(point['time'] // 1000)
+        if times and timestamp <= times[-1]:
+            continue
+        times.append(timestamp)
+        prices.append(float(point['priceUsd']))
+
+    if not times:
+        return None
+    return times, prices
+
+
+class MarketDataProvider:
+    """
+    上游行情数据源基类
+
+    子类把各自API的响应转换成统一格式；HTTP请求放到线程池执行，
+    不阻塞事件循环，asyncio.gather 并发发出的请求可以真正并行。
+    设置了 upstream（见 src.replay）时，所有请求经由它录制或从录制文件回放。
+    """
+
+    name = ""
+    # fetch_details 是否只需要一次上游请求
+    BULK_DETAILS = False
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'CryptoMarketBot/1.0'
+        })
+        self.upstream = None
+
+    async def _get(self, url: str, params: Optional[Dict] = None):
+        """发送GET请求并返回解析后的JSON"""
+        if self.upstream is not None:
+            return await self.upstream.get(self._http_get, url, params)
+        return await self._http_get(url, params)
+
+    async def _http_get(self, url: str, params: Optional[Dict] = None):
+        """在线程池中发送GET请求并返回解析后的JSON"""
+        response = await asyncio.to_thread(self.session.get, url, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _get_items(self, url: str, params: Optional[Dict], key: Optional[str], consume: Callable[[Iterator], T]) -> T:
+        """
+        请求返回JSON数组的接口，边读取边用 consume 处理数组元素
+
+        响应体按块读取、逐个元素解析，consume 只保留需要的资产和字段，
+        不构建整个响应的对象树，内存占用与上游响应的大小无关。
+        经由 upstream 录制或回放时先取得完整响应再交给 consume。
+
+        Args:
+            key: 数组在顶层对象中的键（如 "data"），为None时响应本身是数组
+            consume: 接收元素迭代器并返回结果，在线程池中与读取响应一起运行
+        """
+        if self.upstream is not None:
+            body = await self._get(url, params)
+            return consume(iter(body if key is None else body.get(key) or []))
+        return await asyncio.to_thread(self._stream_items, url, params, key, consume)
+
+    def _stream_items(self, url: str, params: Optional[Dict], key: Optional[str], consume: Callable[[Iterator], T]) -> T:
+        with self.session.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+            return consume(iter_json_array(response.iter_content(STREAM_CHUNK_SIZE), key))
+
+    async def fetch_prices(self, crypto_ids: List[str]) -> Dict[str, Dict]:
+        """
+        获取多个加密货币的价格
+
+        Args:
+            crypto_ids: 加密货币ID列表
+
+        Returns:
+            {crypto_id: {"price_usd": 价格, "change_24h": 24小时涨跌幅}}
+        """
+        raise NotImplementedError
+
+    async def fetch_detail(self, crypto_id: str) -> Optional[Dict]:
+        """
+        获取特定加密货币的详细信息
+
+        Returns:
+            详细信息字典，失败返回None
+        """
+        raise NotImplementedError
+
+    async def fetch_details(self, crypto_ids: List[str]) -> Dict[str, Dict]:
+        """
+        批量获取多个加密货币的详细信息
+
+        默认逐个调用 fetch_detail；BULK_DETAILS 为True的数据源用一次请求获取全部。
+
+        Returns:
+            {crypto_id: 详细信息}，失败的资产不包含在内
+        """
+        details = await asyncio.gather(*(self.fetch_detail(crypto_id) for crypto_id in crypto_ids))
+        return {crypto_id: detail for crypto_id, detail in zip(crypto_ids, details) if detail}
+
+    async def fetch_history(self, crypto_id: str, interval: str = "h1", limit: int = 24) -> List[Dict]:
+        """
+        获取历史价格数据
+
+        Args:
+            crypto_id: 加密货币ID
+            interval: 时间间隔 (m1, m5, m15, m30, h1, h2, h4, h6, h12, d1)
+            limit: 获取的数据点数量
+
+        Returns:
+            按时间升序的 [{"priceUsd": 价格字符串, "time": 毫秒时间戳}]
+        """
+        raise NotImplementedError
+
+    async def fetch_history_arrays(
+        self,
+        crypto_id: str,
+        interval: str = "h1",
+        limit: int = 24
+    ) -> Optional[Tuple[array, array]]:
+        """
+        获取历史价格，直接返回时间和价格数组（供 HistoryStore 使用）
+
+        默认由 fetch_history 的结果转换；数据源可以在解析响应时直接写入数组，不经过中间的字典列表。
+
+        Returns:
+            (array("q") 时间秒数, array("d") 价格)，时间严格递增；没有数据时返回None
+        """
+        return history_arrays(await self.fetch_history(crypto_id, interval, limit))
+
+    async def fetch_assets(self, limit: int = 500) -> List[Dict]:
+        """
+        获取按市值排名的资产列表（不限于 SUPPORTED_CRYPTO）
+
+        Args:
+            limit: 最多返回的资产数
+
+        Returns:
+            [{"id", "symbol", "name", "rank"}]，失败时为空列表
+        """
+        raise NotImplementedError
+
+    async def fetch_rates(self) -> Dict[str, float]:
+        """
+        获取法币及其他计价货币的汇率
+
+        Returns:
+            {货币符号(大写): 1单位该货币对应的美元价值}
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """关闭HTTP会话，录制模式下写出录制文件"""
+        if self.upstream is not None:
+            self.upstream.close()
+        self.session.close()
+
+
+class CoinCapProvider(MarketDataProvider):
+    """CoinCap 数据源"""
+
+    name = "coincap"
+    BULK_DETAILS = True
+
+    def __init__(self, api_base: str = COINCAP_API_BASE):
+        super().__init__()
+        self.api_base = api_base
+
+    @staticmethod
+    def _parse_detail(data: Dict) -> Dict:
+        return {
+            "id": data['id'],
+            "name": data['name'],
+            "symbol": data['symbol'],
+            "price_usd": round(float(data['priceUsd']), 2),
+            "change_percent_24h": round(float(data['changePercent24Hr']), 2),
+            "volume_usd_24h": round(float(data['volumeUsd24Hr']), 2),
+            "market_cap_usd": round(float(data['marketCapUsd']), 2),
+            "supply": round(float(data['supply']), 2) if data['supply'] else None
+        }
+
+    async def fetch_prices(self, crypto_ids: List[str]) -> Dict[str, Dict]:
+        wanted = set(crypto_ids)
+
+        def consume(assets: Iterator[Dict]) -> Dict[str, Dict]:
+            # 只保留我们支持的加密货币的价格和涨跌幅
+            quotes = {}
+            for asset in assets:
+                crypto_id = asset['id'].lower()
+                if crypto_id in wanted:
+                    quotes[crypto_id] = {
+                        "price_usd": round(float(asset['priceUsd']), 2),
+                        "change_24h": round(float(asset['changePercent24Hr'] or 0), 2)
+                    }
+            return quotes
+
+        try:
+            quotes = await self._get_items(f"{self.api_base}/assets", {"limit": 50}, "data", consume)
+            prices = {crypto_id: quotes[crypto_id] for crypto_id in crypto_ids if crypto_id in quotes}
+
+        except Exception as e:
+            print(f"Error fetching crypto prices: {str(e)}")
+            # 如果 API 请求失败，返回空字典
+            prices = {}
+
+        return prices
+
+    async def fetch_detail(self, crypto_id: str) -> Optional[Dict]:
+        try:
+            data = (await self._get(f"{self.api_base}/assets/{crypto_id}"))['data']
+            return self._parse_detail(data)
+
+        except Exception as e:
+            print(f"Error fetching detail for {crypto_id}: {str(e)}")
+            return None
+
+    async def fetch_details(self, crypto_ids: List[str]) -> Dict[str, Dict]:
+        details = {}
+        wanted = set(crypto_ids)
+        try:
+            assets = await self._get_items(
+                f"{self.api_base}/assets",
+                {"ids": ",".join(crypto_ids)},
+                "data",
+                lambda items: {asset['id'].lower(): asset for asset in items if asset['id'].lower() in wanted}
+            )
+        except Exception as e:
+            print(f"Error fetching crypto details: {str(e)}")
+            return details
+
+        for crypto_id in crypto_ids:
+            if crypto_id not in assets:
+                continue
+            try:
+                details[crypto_id] = self._parse_detail(assets[crypto_id])
+            except Exception as e:
+                print(f"Error parsing detail for {crypto_id}: {str(e)}")
+        return details
+
+    async def fetch_history(self, crypto_id: str, interval: str = "h1", limit: int = 24) -> List[Dict]:
+        try:
+            # 只保留价格和时间，丢弃每个数据点的日期字符串
+            return await self._get_items(
+                f"{self.api_base}/assets/{crypto_id}/history",
+                {"interval": interval, "limit": limit},
+                "data",
+                lambda points: [{"priceUsd": point['priceUsd'], "time": point['time']} for point in points]
+            )
+
+        except Exception as e:
+            print(f"Error fetching historical data for {crypto_id}: {str(e)}")
+            return []
+
+    async def fetch_history_arrays(
+        self,
+        crypto_id: str,
+        interval: str = "h1",
+        limit: int = 24
+    ) -> Optional[Tuple[array, array]]:
+        try:
+            return await self._get_items(
+                f"{self.api_base}/assets/{crypto_id}/history",
+                {"interval": interval, "limit": limit},
+                "data",
+                history_arrays
+            )
+
+        except Exception as e:
+            print(f"Error fetching historical data for {crypto_id}: {str(e)}")
+            return None
+
+    async def fetch_assets(self, limit: int = 500) -> List[Dict]:
+        assets = []
+        try:
+            # CoinCap 单次最多返回2000个
+            for offset in range(0, limit, 2000):
+                page = await self._get_items(
+                    f"{self.api_base}/assets",
+                    {"limit": min(2000, limit - offset), "offset": offset},
+                    "data",
+                    lambda items: [
+                        {"id": asset['id'], "symbol": asset['symbol'], "name": asset['name'], "rank": int(asset['rank'])}
+                        for asset in items
+                    ]
+                )
+                assets.extend(page)
+                if len(page) < min(2000, limit - offset):
+                    break
+
+        except Exception as e:
+            print(f"Error fetching asset list: {str(e)}")
+            return []
+
+        return assets
+
+    async def fetch_rates(self) -> Dict[str, float]:
+        try:
+            data = await self._get(f"{self.api_base}/rates")
+            return {
+                rate['symbol'].upper(): float(rate['rateUsd'])
+                for rate in data['data']
+                if rate.get('symbol') and rate.get('rateUsd')
+            }
+
+        except Exception as e:
+            print(f"Error fetching exchange rates: {str(e)}")
+            return {}
+
+
+class CoinGeckoProvider(MarketDataProvider):
+    """CoinGecko 数据源"""
+
+    name = "coingecko"
+
+    # 时间间隔对应的秒数，用于把 market_chart 数据降采样到指定间隔
+    INTERVAL_SECONDS = {
+        "m1": 60, "m5": 300, "m15": 900, "m30": 1800,
+        "h1": 3600, "h2": 7200, "h4": 14400, "h6": 21600, "h12": 43200,
+        "d1": 86400
+    }
+
+    BULK_DETAILS = True
+
+    def __init__(self, api_base: str = COINGECKO_API_BASE):
+        super().__init__()
+        self.api_base = api_base
+
+    async def fetch_prices(self, crypto_ids: List[str]) -> Dict[str, Dict]:
+        prices = {}
+        try:
+            data = await self._get(
+                f"{self.api_base}/simple/price",
+                params={
+                    "ids": ",".join(crypto_ids),
+                    "vs_currencies": "usd",
+                    "include_24hr_change": "true"
+                }
+            )
+
+            for crypto_id in crypto_ids:
+                if crypto_id in data:
+                    price_data = data[crypto_id]
+                    prices[crypto_id] = {
+                        "price_usd": round(price_data['usd'], 2),
+                        "change_24h": round(price_data.get('usd_24h_change') or 0, 2)
+                    }
+
+        except Exception as e:
+            print(f"Error fetching crypto prices: {str(e)}")
+            prices = {}
+
+        return prices
+
+    async def fetch_detail(self, crypto_id: str) -> Optional[Dict]:
+        try:
+            data = await self._get(f"{self.api_base}/coins/{crypto_id}")
+            market_data = data['market_data']
+
+            return {
+                "id": data['id'],
+                "name": data['name'],
+                "symbol": data['symbol'].upper(),
+                "price_usd": round(market_data['current_price']['usd'], 2),
+                "change_percent_24h": round(market_data['price_change_percentage_24h'], 2),
+                "volume_usd_24h": round(market_data['total_volume']['usd'], 2),
+                "market_cap_usd": round(market_data['market_cap']['usd'], 2),
+                "circulating_supply": round(market_data['circulating_supply'], 2) if market_data['circulating_supply'] else None,
+                "total_supply": round(market_data['total_supply'], 2) if market_data['total_supply'] else None
+            }
+
+        except Exception as e:
+            print(f"Error fetching detail for {crypto_id}: {str(e)}")
+            return None
+
+    async def fetch_details(self, crypto_ids: List[str]) -> Dict[str, Dict]:
+        def consume(markets: Iterator[Dict]) -> Dict[str, Dict]:
+            details = {}
+            for market in markets:
+                try:
+                    details[market['id']] = {
+                        "id": market['id'],
+                        "name": market['name'],
+                        "symbol": market['symbol'].upper(),
+                        "price_usd": round(market['current_price'], 2),
+                        "change_percent_24h": round(market['price_change_percentage_24h'], 2),
+                        "volume_usd_24h": round(market['total_volume'], 2),
+                        "market_cap_usd": round(market['market_cap'], 2),
+                        "circulating_supply": round(market['circulating_supply'], 2) if market['circulating_supply'] else None,
+                        "total_supply": round(market['total_supply'], 2) if market['total_supply'] else None
+                    }
+                except Exception as e:
+                    print(f"Error parsing detail for {market.get('id')}: {str(e)}")
+            return details
+
+        try:
+            details = await self._get_items(
+                f"{self.api_base}/coins/markets",
+                {"vs_currency": "usd", "ids": ",".join(crypto_ids)},
+                None,
+                consume
+            )
+        except Exception as e:
+            print(f"Error fetching crypto details: {str(e)}")
+            return {}
+
+        return {crypto_id: details[crypto_id] for crypto_id in crypto_ids if crypto_id in details}
+
+    async def fetch_history(self, crypto_id: str, interval: str = "h1", limit: int = 24) -> List[Dict]:
+        series = await self.fetch_history_arrays(crypto_id, interval, limit)
+        if series is None:
+            return []
+        # 转换成 CoinCap 的格式
+        times, prices = series
+        return [{"priceUsd": str(price), "time": timestamp * 1000} for timestamp, price in zip(times, prices)]
+
+    async def fetch_history_arrays(
+        self,
+        crypto_id: str,
+        interval: str = "h1",
+        limit: int = 24
+    ) -> Optional[Tuple[array, array]]:
+        step = self.INTERVAL_SECONDS.get(interval, 3600)
+        days = max(1, -(-step * limit // 86400))
+
+        def consume(points: Iterator[List]) -> Optional[Tuple[array, array]]:
+            # market_chart 按时间升序，每个时间桶只保留最后一个价格
+            times = array("q")
+            prices = array("d")
+            for timestamp_ms, price in points:
+                if price is None:
+                    continue
+                timestamp = int(timestamp_ms // 1000)
+                if times and timestamp // step == times[-1] // step:
+                    times[-1] = timestamp
+                    prices[-1] = price
+                elif not times or timestamp > times[-1]:
+                    times.append(timestamp)
+                    prices.append(price)
+            if not times:
+                return None
+            del times[:-limit]
+            del prices[:-limit]
+            return times, prices
+
+        try:
+            return await self._get_items(
+                f"{self.api_base}/coins/{crypto_id}/market_chart",
+                {"vs_currency": "usd", "days": days},
+                "prices",
+                consume
+            )
+
+        except Exception as e:
+            print(f"Error fetching historical data for {crypto_id}: {str(e)}")
+            return None
+
+    async def fetch_assets(self, limit: int = 500) -> List[Dict]:
+        assets = []
+        try:
+            # CoinGecko 每页最多250个
+            for page in range(1, -(-limit // 250) + 1):
+                markets = await self._get_items(
+                    f"{self.api_base}/coins/markets",
+                    {"vs_currency": "usd", "order": "market_cap_desc", "per_page": 250, "page": page},
+                    None,
+                    lambda items: [
+                        {
+                            "id": market['id'],
+                            "symbol": market['symbol'].upper(),
+                            "name": market['name'],
+                            "rank": market.get('market_cap_rank')
+                        }
+                        for market in items
+                    ]
+                )
+                for i, market in enumerate(markets):
+                    market['rank'] = market['rank'] or len(assets) + i + 1
+                assets.extend(markets)
+                if len(markets) < 250:
+                    break
+
+        except Exception as e:
+            print(f"Error fetching asset list: {str(e)}")
+            return []
+
+        return assets[:limit]
+
+    async def fetch_rates(self) -> Dict[str, float]:
+        try:
+            # CoinGecko 的汇率以BTC计价：value 为1 BTC可兑换的该货币数量
+            rates = (await self._get(f"{self.api_base}/exchange_rates"))['rates']
+            usd_per_btc = rates['usd']['value']
+            return {
+                code.upper(): usd_per_btc / rate['value']
+                for code, rate in rates.items()
+                if rate.get('value')
+            }
+
+        except Exception as e:
+            print(f"Error fetching exchange rates: {str(e)}")
+            return {}
+
+
+PROVIDERS = {
+    CoinCapProvider.name: CoinCapProvider,
+    CoinGeckoProvider.name: CoinGeckoProvider,
+}
+
+
+def create_provider(name: Optional[str] = None) -> MarketDataProvider:
+    """
+    按名称创建数据源
+
+    UPSTREAM_MODE 为 record / replay 时，数据源的请求经由录制器或回放器。
+
+    Args:
+        name: 数据源名称 (coincap, coingecko)，默认读取 MARKET_PROVIDER 配置
+    """
+    name = (name or MARKET_PROVIDER).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name}")
+    provider = PROVIDERS[name]()
+    provider.upstream = create_upstream(
+        UPSTREAM_MODE, UPSTREAM_FIXTURE, name, UPSTREAM_REPLAY_PACING, UPSTREAM_REPLAY_SPEED
+    )
+    return provider
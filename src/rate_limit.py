@@ -0,0 +1,331 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Tuple
+
+from starlette.datastructures import Headers
+
+from src.cluster import CLIENT_HEADER
+from src.config import API_KEYS
+
+
+# 各类请求消耗的令牌数，按路径前缀匹配，未列出的路径消耗1个
+# 批量请求本身按1个计，其中的子请求由批量端点按各自单独请求的路径另外扣除
+ROUTE_COSTS: Tuple[Tuple[str, int], ...] = (
+    ("/api/v1/crypto/prices", 1),
+    ("/api/v1/predict/", 5),
+    ("/api/v1/analytics/", 3),
+)
+
+# 不计入限流的路径
+EXEMPT_PATHS = ("/api/v1/health", "/api/v1/quota", "/docs", "/redoc", "/openapi.json")
+
+# 令牌桶：先按经过的时间补充令牌，足够时一次取出 want 个（至少 need 个），否则不取
+# 时间取自Redis服务器，多个实例之间不受本机时钟差异影响
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local need = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local granted = 0
+if tokens >= need then
+    granted = math.min(tokens, want)
+    tokens = tokens - granted
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {tostring(granted), tostring(tokens)}
+"""
+
+
+def route_cost(path: str) -> int:
+    """请求路径对应的令牌消耗"""
+    for prefix, cost in ROUTE_COSTS:
+        if path.startswith(prefix):
+            return cost
+    return 1
+
+
+class RateLimitResult:
+    """一次限流判断的结果"""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: float, retry_after: float = 0.0):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        """配额相关的响应头"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, int(self.remaining)))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class _Lease:
+    __slots__ = ("tokens", "remote_remaining", "blocked_until")
+
+    def __init__(self):
+        self.tokens = 0.0
+        self.remote_remaining = 0.0
+        self.blocked_until = 0.0
+
+
+class LocalRateLimiter:
+    """
+    进程内令牌桶限流（memory 后端或Redis不可用时使用）
+
+    每个客户端一个桶，容量 capacity，每秒补充 refill_rate 个令牌；
+    客户端数量有上限，超出时淘汰最久未访问的桶。
+    """
+
+    def __init__(self, capacity: int, refill_rate: float, max_clients: int = 100000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+
+    def _bucket(self, client: str, now: float) -> _Bucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = _Bucket(float(self.capacity), now)
+            self._buckets[client] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.refill_rate)
+            bucket.updated_at = now
+        return bucket
+
+    def acquire(self, client: str, cost: int = 1) -> RateLimitResult:
+        """
+        为客户端扣除 cost 个令牌
+
+        Returns:
+            限流结果；令牌不足时不扣除，retry_after 为补足所需的秒数
+        """
+        bucket = self._bucket(client, time.monotonic())
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return RateLimitResult(True, self.capacity, bucket.tokens)
+        return RateLimitResult(False, self.capacity, bucket.tokens, (cost - bucket.tokens) / self.refill_rate)
+
+    def peek(self, client: str) -> RateLimitResult:
+        """查询客户端的剩余配额，不扣除令牌"""
+        return RateLimitResult(True, self.capacity, self._bucket(client, time.monotonic()).tokens)
+
+    def stats(self) -> Dict:
+        return {"backend": "memory", "clients": len(self._buckets)}
+
+
+class RedisRateLimiter:
+    """
+    基于Redis的分布式令牌桶限流
+
+    桶状态保存在Redis中，由Lua脚本原子地补充和扣除。为了让大多数请求不访问Redis，
+    每个实例一次从桶中预取 lease 个令牌放在本地，用完再取；桶中令牌不足时记下
+    可重试的时间，在此之前的请求直接在本地拒绝。多个实例之间的超发最多为每实例 lease 个。
+    Redis不可用时退回进程内限流。
+    """
+
+    def __init__(
+        self,
+        redis_client: Callable,
+        capacity: int,
+        refill_rate: float,
+        lease: int = 10,
+        key_prefix: str = "ratelimit:",
+        max_clients: int = 100000,
+        retry_interval: float = 5.0
+    ):
+        self._redis_client = redis_client
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.lease = max(1, min(lease, capacity))
+        self.key_prefix = key_prefix
+        self.max_clients = max_clients
+        self.retry_interval = retry_interval
+        self.fallback = LocalRateLimiter(capacity, refill_rate, max_clients)
+
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._script = None
+        # Redis出错后在这个时间之前直接使用本地限流，避免每个请求都等待连接失败
+        self._redis_retry_at = 0.0
+        self.redis_calls = 0
+
+    def _local(self, client: str) -> _Lease:
+        local = self._leases.get(client)
+        if local is None:
+            local = _Lease()
+            self._leases[client] = local
+            if len(self._leases) > self.max_clients:
+                self._leases.popitem(last=False)
+        else:
+            self._leases.move_to_end(client)
+        return local
+
+    def acquire(self, client: str, cost: int = 1) -> RateLimitResult:
+        """为客户端扣除 cost 个令牌，本地预取的令牌够用时不访问Redis"""
+        local = self._local(client)
+        now = time.monotonic()
+
+        if local.tokens >= cost:
+            local.tokens -= cost
+            return RateLimitResult(True, self.capacity, local.tokens + local.remote_remaining)
+        if now < local.blocked_until:
+            return RateLimitResult(False, self.capacity, local.tokens, local.blocked_until - now)
+        if now < self._redis_retry_at:
+            return self.fallback.acquire(client, cost)
+
+        try:
+            if self._script is None:
+                self._script = self._redis_client().register_script(TOKEN_BUCKET_SCRIPT)
+            need = cost - local.tokens
+            granted, remaining = self._script(
+                keys=[self.key_prefix + client],
+                args=[self.capacity, self.refill_rate, max(need, self.lease), need]
+            )
+            self.redis_calls += 1
+            granted, remaining = float(granted), float(remaining)
+        except Exception as e:
+            print(f"Error checking rate limit in Redis: {str(e)}")
+            self._redis_retry_at = now + self.retry_interval
+            return self.fallback.acquire(client, cost)
+
+        local.remote_remaining = remaining
+        if granted <= 0:
+            retry_after = (need - remaining) / self.refill_rate
+            local.blocked_until = now + retry_after
+            return RateLimitResult(False, self.capacity, local.tokens + remaining, retry_after)
+
+        local.tokens += granted - cost
+        return RateLimitResult(True, self.capacity, local.tokens + remaining)
+
+    def peek(self, client: str) -> RateLimitResult:
+        """查询客户端的剩余配额，不扣除令牌"""
+        local = self._local(client)
+        try:
+            state = self._redis_client().hmget(self.key_prefix + client, "tokens", "ts")
+        except Exception:
+            return self.fallback.peek(client)
+        if state[0] is None:
+            return RateLimitResult(True, self.capacity, self.capacity + local.tokens)
+        # 不知道Redis的当前时间，保守地不计算补充的令牌
+        return RateLimitResult(True, self.capacity, float(state[0]) + local.tokens)
+
+    def stats(self) -> Dict:
+        return {"backend": "redis", "clients": len(self._leases), "redis_calls": self.redis_calls}
+
+
+def client_identity(scope, api_keys: FrozenSet[str] = API_KEYS) -> str:
+    """
+    限流的客户端标识：X-API-Key 在已发放的密钥中时按密钥，否则按客户端IP
+
+    不校验密钥时客户端每次换一个密钥就能拿到一个新的令牌桶，所以未知的密钥一律按IP计数。
+    集群节点转发的请求使用入口节点识别的客户端（限流中间件校验集群密钥后写入 scope）。
+    """
+    forwarded = scope.get("forwarded_client")
+    if forwarded:
+        return forwarded
+    api_key = Headers(scope=scope).get("x-api-key")
+    if api_key and api_key in api_keys:
+        return f"key:{api_key}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    限流中间件（ASGI）
+
+    限流器取自 app.state.services.rate_limiter（应用启动后才存在，未启用时直接放行）。
+    通过的响应附带 X-RateLimit-Limit / X-RateLimit-Remaining，超限返回429和 Retry-After。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS) or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        services = getattr(scope["app"].state, "services", None)
+
+        # 集群节点转发的请求已经在入口节点扣过令牌，按入口节点识别的客户端处理
+        cluster = getattr(services, "cluster", None)
+        if cluster is not None:
+            headers = Headers(scope=scope)
+            if cluster.is_internal(headers):
+                if headers.get(CLIENT_HEADER):
+                    scope["forwarded_client"] = headers[CLIENT_HEADER]
+                await self.app(scope, receive, send)
+                return
+
+        limiter = getattr(services, "rate_limiter", None)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        result = limiter.acquire(client_identity(scope), route_cost(scope["path"]))
+        quota_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in result.headers().items()]
+
+        if not result.allowed:
+            body = json.dumps({"detail": "Rate limit exceeded"}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("latin-1")),
+                    *quota_headers
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_quota(message):
+            if message["type"] == "http.response.start":
+                # 端点自己另外扣除了令牌（如批量请求）时保留端点给出的配额
+                headers = list(message.get("headers", []))
+                present = {name.lower() for name, _ in headers}
+                message["headers"] = headers + [header for header in quota_headers if header[0] not in present]
+            await send(message)
+
+        await self.app(scope, receive, send_with_quota)
+
+
+def create_rate_limiter(cache, capacity: int, refill_rate: float, lease: int = 10):
+    """
+    按缓存后端创建限流器
+
+    redis / tiered 后端使用Redis令牌桶，memory 后端只在本地限流；capacity 为0时不限流。
+    """
+    if capacity <= 0:
+        return None
+    remote = getattr(cache, "remote", cache)
+    if hasattr(remote, "redis_client"):
+        return RedisRateLimiter(lambda: remote.redis_client, capacity, refill_rate, lease)
+    return LocalRateLimiter(capacity, refill_rate)
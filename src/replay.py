@@ -0,0 +1,185 @@
+import asyncio
+import bisect
+import gzip
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+# 回放节奏：realtime 按录制时的时间线和延迟，accelerated 按 speed 倍速，max 不等待
+REPLAY_PACINGS = ("realtime", "accelerated", "max")
+
+FIXTURE_VERSION = 1
+
+
+def request_key(url: str, params: Optional[Dict] = None) -> str:
+    """请求的唯一标识：URL加上按名称排序的查询参数"""
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+
+
+class UpstreamRecorder:
+    """
+    录制上游响应
+
+    每个响应记录请求标识、相对录制开始的时间 t、请求耗时 d 和解析后的JSON（失败时记录错误信息），
+    写成 gzip 压缩的 NDJSON 文件：第一行是说明，之后每行一个响应。
+    响应到达时立即追加到临时文件并刷新压缩流，内存占用与录制时长无关；关闭时再原子替换为正式文件。
+    进程被中断时已写入的响应保留在 {path}.tmp 中，仍可用 load_fixture 读取。
+    """
+
+    def __init__(self, path: str, provider: str = ""):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.provider = provider
+        self.started_at = time.monotonic()
+        self.count = 0
+        self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+        self._write({"version": FIXTURE_VERSION, "provider": provider, "recorded_at": time.time()})
+
+    def _write(self, record: Dict):
+        if self._file is None:
+            return
+        try:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            # 同步刷新压缩流，中断时已写入的记录可以完整解压
+            self._file.flush()
+        except Exception as e:
+            print(f"Error writing upstream recording: {str(e)}")
+
+    def _record(self, entry: Dict):
+        self._write(entry)
+        self.count += 1
+
+    async def get(self, fetch: Callable[[str, Optional[Dict]], Awaitable], url: str, params: Optional[Dict] = None):
+        """通过 fetch 请求上游并记录响应"""
+        start = time.monotonic()
+        entry = {"key": request_key(url, params), "t": round(start - self.started_at, 3)}
+        try:
+            body = await fetch(url, params)
+        except Exception as e:
+            entry["d"] = round(time.monotonic() - start, 3)
+            entry["error"] = str(e)
+            self._record(entry)
+            raise
+        entry["d"] = round(time.monotonic() - start, 3)
+        entry["body"] = body
+        self._record(entry)
+        return body
+
+    def close(self):
+        """结束录制：关闭临时文件并原子替换为正式文件"""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            os.replace(self.tmp_path, self.path)
+            print(f"Recorded {self.count} upstream responses to {self.path}")
+        except Exception as e:
+            print(f"Error saving upstream recording: {str(e)}")
+        self._file = None
+
+
+def load_fixture(path: str) -> Tuple[Dict, Dict[str, List[Dict]]]:
+    """
+    读取录制文件
+
+    也可以读取录制被中断时留下的临时文件，末尾不完整的记录被忽略。
+
+    Returns:
+        (说明, {请求标识: 按时间排序的响应列表})
+    """
+    responses: Dict[str, List[Dict]] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != FIXTURE_VERSION:
+            raise ValueError(f"Unsupported fixture version: {header.get('version')}")
+        try:
+            for line in f:
+                entry = json.loads(line)
+                responses.setdefault(entry["key"], []).append(entry)
+        except (EOFError, ValueError):
+            # 录制被中断的文件（{path}.tmp）末尾不完整，保留已完整写入的响应
+            print(f"Upstream recording {path} is truncated, using the complete responses")
+    for entries in responses.values():
+        entries.sort(key=lambda entry: entry["t"])
+    return header, responses
+
+
+class UpstreamReplayer:
+    """
+    从录制文件回放上游响应，不访问网络
+
+    - max: 同一请求依次返回录制的各个响应（用完后循环），不等待，结果只取决于请求顺序
+    - realtime / accelerated: 按回放开始后经过的时间（乘以 speed）选取录制时间线上最近的响应，
+      并等待录制的请求耗时（除以 speed），重现价格变化和上游延迟
+
+    没有录制的请求抛出 LookupError，由数据源按请求失败处理。
+    """
+
+    def __init__(self, path: str, pacing: str = "max", speed: float = 1.0):
+        if pacing not in REPLAY_PACINGS:
+            raise ValueError(f"Unknown replay pacing: {pacing}")
+        self.path = path
+        self.pacing = pacing
+        self.speed = 1.0 if pacing == "realtime" else max(speed, 1e-6)
+        self.header, self.responses = load_fixture(path)
+        self._offsets = {key: [entry["t"] for entry in entries] for key, entries in self.responses.items()}
+        self._cursors: Dict[str, int] = {}
+        self.started_at = time.monotonic()
+        self.served = 0
+        self.misses = 0
+
+    def _select(self, key: str) -> Optional[Dict]:
+        entries = self.responses.get(key)
+        if not entries:
+            return None
+        if self.pacing == "max":
+            i = self._cursors.get(key, 0)
+            self._cursors[key] = i + 1
+            return entries[i % len(entries)]
+        elapsed = (time.monotonic() - self.started_at) * self.speed
+        return entries[max(0, bisect.bisect_right(self._offsets[key], elapsed) - 1)]
+
+    async def get(self, fetch: Callable[[str, Optional[Dict]], Awaitable], url: str, params: Optional[Dict] = None):
+        """返回录制的响应，fetch（真实请求）不会被调用"""
+        key = request_key(url, params)
+        entry = self._select(key)
+        if entry is None:
+            self.misses += 1
+            raise LookupError(f"No recorded response for {key}")
+
+        if self.pacing != "max" and entry.get("d"):
+            await asyncio.sleep(entry["d"] / self.speed)
+        self.served += 1
+        if "error" in entry:
+            raise RuntimeError(entry["error"])
+        return entry["body"]
+
+    def close(self):
+        pass
+
+
+def create_upstream(mode: str, path: str, provider: str = "", pacing: str = "max", speed: float = 1.0):
+    """
+    按模式创建上游录制/回放器
+
+    Args:
+        mode: live（直接请求上游，返回None）、record 或 replay
+        path: 录制文件路径
+        provider: 数据源名称，记录在录制文件中
+        pacing: 回放节奏 (realtime, accelerated, max)
+        speed: accelerated 的倍速
+    """
+    if mode == "live":
+        return None
+    if not path:
+        raise ValueError(f"UPSTREAM_FIXTURE is required in {mode} mode")
+    if mode == "record":
+        return UpstreamRecorder(path, provider)
+    if mode == "replay":
+        return UpstreamReplayer(path, pacing, speed)
+    raise ValueError(f"Unknown upstream mode: {mode}")
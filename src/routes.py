@@ -0,0 +1,923 @@
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from src.alerts import check_webhook_url
+from src.candles import RESOLUTIONS
+from src.cluster import CLIENT_HEADER
+from src.config import CRYPTO_SYMBOLS, SUPPORTED_CRYPTO, MIN_PREDICTION_DAYS, MAX_PREDICTION_DAYS
+from src.export import EXPORT_FORMATS, available_formats, iter_arrow, iter_delta_chunks, iter_ndjson
+from src.fields import parse_fields, select_fields
+from src.fx import BASE_CURRENCY, usd_field_paths
+from src.leaderboard import CONFIDENCE_LEVELS, SORT_FIELDS as LEADERBOARD_SORT_FIELDS, TRENDS
+from src.montecarlo import MONTECARLO_METHODS
+from src.rate_limit import client_identity, route_cost
+from src.services import Services
+
+
+router = APIRouter()
+
+
+def get_services(request: Request) -> Services:
+    """依赖注入：获取当前应用的服务集合"""
+    return request.app.state.services
+
+
+def resolve_crypto_id(symbol: str) -> str:
+    """把加密货币符号转换成ID，不支持时返回404"""
+    for cid, csym in CRYPTO_SYMBOLS.items():
+        if csym.upper() == symbol.upper():
+            return cid
+
+    raise HTTPException(
+        status_code=404,
+        detail=f"Cryptocurrency {symbol} not supported"
+    )
+
+
+def validate_days(days: int):
+    """校验预测天数"""
+    if not MIN_PREDICTION_DAYS <= days <= MAX_PREDICTION_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"days must be between {MIN_PREDICTION_DAYS} and {MAX_PREDICTION_DAYS}"
+        )
+
+
+async def convert_currency(services: Services, data, vs: str):
+    """把美元结果换算成 vs 指定的货币，不支持时返回400"""
+    try:
+        return await services.fx.convert(data, vs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def is_remote_shard(services: Services, request: Optional[Request], crypto_id: str) -> bool:
+    """
+    集群模式下资产是否由其他节点负责
+
+    持有集群密钥的转发请求一律在本地处理（节点间的环视图短暂不一致时也不会来回转发），
+    客户端自己带上转发请求头不能让本节点为其他节点的资产加载数据。
+    """
+    cluster = services.cluster
+    if cluster is None or cluster.owns(crypto_id):
+        return False
+    return request is None or not cluster.is_internal(request.headers)
+
+
+def forward_headers(request: Optional[Request]) -> Dict[str, str]:
+    """转发时带上本节点识别的客户端标识，负责节点按同一个客户端处理"""
+    return {CLIENT_HEADER: client_identity(request.scope)} if request is not None else {}
+
+
+def forwarded_error(status: int, body: bytes) -> HTTPException:
+    try:
+        detail = json.loads(body).get("detail")
+    except Exception:
+        detail = "Shard owner error"
+    return HTTPException(status_code=status, detail=detail)
+
+
+async def forward_to_owner(
+    services: Services,
+    request: Optional[Request],
+    crypto_id: str,
+    path: str,
+    params: Dict
+) -> Optional[Response]:
+    """
+    集群模式下把请求转发给资产的负责节点
+
+    Returns:
+        负责节点的响应；本节点负责该资产，或负责节点不可达（由本节点按需加载数据处理）时返回None
+
+    Raises:
+        HTTPException: 负责节点返回的错误
+    """
+    if not is_remote_shard(services, request, crypto_id):
+        return None
+    params = {key: value for key, value in params.items() if value is not None}
+    try:
+        status, body = await services.cluster.forward(crypto_id, path, params, forward_headers(request))
+    except Exception as e:
+        print(f"Error forwarding {path} to shard owner: {str(e)}")
+        return None
+    if status >= 400:
+        raise forwarded_error(status, body)
+    return Response(body, media_type="application/json")
+
+
+@router.get("/")
+async def root():
+    """API根路径"""
+    return {
+        "message": "Crypto Market Data API",
+        "version": "2.0.0",
+        "endpoints": {
+            "/api/v1/crypto/prices": "获取所有支持的加密货币价格",
+            "/api/v1/crypto/{symbol}": "获取特定加密货币详情",
+            "/api/v1/crypto/supported": "获取支持的加密货币列表",
+            "/api/v1/crypto/{id}/candles": "获取K线（OHLCV）",
+            "/api/v1/crypto/{id}/change": "最近N分钟的涨跌幅（内存逐笔数据）",
+            "/api/v1/crypto/{id}/ticks": "最近N分钟的逐笔价格",
+            "/api/v1/crypto/{id}/orderbook": "L2订单簿（另有 /top 最优价与价差、/depth 指定范围内的深度）",
+            "/api/v1/crypto/{id}/history/export": "流式导出差分编码的历史价格（NDJSON / Arrow）",
+            "/api/v1/predict/{symbol}": "预测特定加密货币价格",
+            "/api/v1/predict/btc-sol-doge": "批量预测BTC、SOL、DOGE价格",
+            "/api/v1/predict/leaderboard": "全资产预测排行榜（后台扫描，可按趋势、置信度、涨跌幅筛选）",
+            "/api/v1/analytics/correlation": "跨资产滚动相关系数和协方差矩阵",
+            "/api/v1/analytics/volatility": "年化波动率",
+            "/api/v1/fx/rates": "计价货币汇率（价格、详情和预测接口支持 vs= 参数）",
+            "/api/v1/batch": "批量执行多个价格、详情和预测请求（POST）",
+            "/api/v1/quota": "当前客户端的限流配额",
+            "/api/v1/cluster": "集群成员和资产分片（集群模式）"
+        }
+    }
+
+
+@router.get("/api/v1/crypto/prices")
+async def get_crypto_prices(
+    fields: Optional[str] = None,
+    vs: str = BASE_CURRENCY,
+    services: Services = Depends(get_services)
+):
+    """
+    获取所有支持的加密货币价格
+
+    Args:
+        fields: 只返回指定字段，逗号分隔，如 "price_usd"（非USD时也可以写换算后的名字，如 "price_eur"）
+        vs: 计价货币，如 EUR、CNY、BTC，默认USD；非USD时 price_usd 变为 price_<货币>
+    """
+    board = await services.crypto.get_price_board()
+    paths = parse_fields(fields)
+
+    # 默认参数直接返回刷新时预先序列化的响应
+    if paths is None and vs.upper() == BASE_CURRENCY:
+        return Response(board.body, media_type="application/json")
+
+    # 先在美元数据上选择字段，再换算（换算会把 price_usd 改名为 price_<货币>）
+    data = board.data
+    if paths is not None:
+        usd_paths = usd_field_paths(paths, vs)
+        data = {symbol: select_fields(quote, usd_paths) for symbol, quote in data.items()}
+    data = await convert_currency(services, data, vs)
+
+    return {"data": data, "currency": vs.upper()}
+
+
+# 固定路径需要注册在 /api/v1/crypto/{crypto_id} 之前，否则会被当成 crypto_id
+@router.get("/api/v1/crypto/supported")
+async def get_supported_cryptos(services: Services = Depends(get_services)):
+    """获取支持的加密货币列表"""
+    cryptos = await services.crypto.get_supported_cryptos()
+    return {"data": cryptos}
+
+
+@router.get("/api/v1/crypto/{crypto_id}")
+async def get_crypto_detail(
+    crypto_id: str,
+    fields: Optional[str] = None,
+    vs: str = BASE_CURRENCY,
+    services: Services = Depends(get_services)
+):
+    """获取特定加密货币的详细信息"""
+    model = await services.crypto.get_crypto_detail_model(crypto_id.lower())
+    
+    if model is None:
+        raise HTTPException(status_code=404, detail="Cryptocurrency not found")
+    
+    paths = parse_fields(fields)
+    if paths is None and vs.upper() == BASE_CURRENCY:
+        return Response(model.body, media_type="application/json")
+
+    detail = await convert_currency(services, select_fields(model.data, usd_field_paths(paths, vs)), vs)
+    return {"data": detail, "currency": vs.upper()}
+
+
+@router.get("/api/v1/crypto/{crypto_id}/candles")
+async def get_crypto_candles(
+    crypto_id: str,
+    resolution: str = "1h",
+    limit: int = 100,
+    services: Services = Depends(get_services)
+):
+    """
+    获取K线（OHLCV）
+
+    K线由后台价格轮询在内存中实时聚合，不会请求上游。
+
+    Args:
+        crypto_id: 加密货币ID（如 bitcoin）
+        resolution: 周期 (1m, 5m, 15m, 30m, 1h, 4h, 1d, 1w)，默认1h
+        limit: 最多返回的K线数量，默认100
+    """
+    crypto_id = crypto_id.lower()
+    if crypto_id not in SUPPORTED_CRYPTO:
+        raise HTTPException(status_code=404, detail="Cryptocurrency not found")
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"resolution must be one of: {', '.join(RESOLUTIONS)}"
+        )
+
+    candles = services.candles.get_candles(crypto_id, resolution, max(1, min(limit, services.candles.capacity)))
+    return {"data": candles, "id": crypto_id, "resolution": resolution}
+
+
+def get_tick_buffer(crypto_id: str, services: Services):
+    """校验资产并获取逐笔缓冲区，没有数据时返回503"""
+    if crypto_id not in SUPPORTED_CRYPTO:
+        raise HTTPException(status_code=404, detail="Cryptocurrency not found")
+    buffer = services.ticks.get(crypto_id)
+    if buffer is None or not len(buffer):
+        raise HTTPException(status_code=503, detail="No tick data yet")
+    return buffer
+
+
+def validate_minutes(minutes: int):
+    """校验分钟数"""
+    if not 1 <= minutes <= 7 * 24 * 60:
+        raise HTTPException(status_code=400, detail="minutes must be between 1 and 10080")
+
+
+@router.get("/api/v1/crypto/{crypto_id}/change")
+async def get_crypto_change(crypto_id: str, minutes: int = 15, services: Services = Depends(get_services)):
+    """
+    最近N分钟的涨跌幅
+
+    基于价格轮询写入的逐笔数据在内存中计算；数据覆盖不到整个区间时，
+    from 为实际使用的最早参考时间。
+
+    Args:
+        crypto_id: 加密货币ID（如 bitcoin）
+        minutes: 时间窗口（分钟），默认15
+    """
+    crypto_id = crypto_id.lower()
+    validate_minutes(minutes)
+    get_tick_buffer(crypto_id, services)
+    change = services.ticks.change(crypto_id, minutes * 60)
+    return {"data": {"id": crypto_id, "minutes": minutes, **change}}
+
+
+@router.get("/api/v1/crypto/{crypto_id}/ticks")
+async def get_crypto_ticks(crypto_id: str, minutes: int = 15, services: Services = Depends(get_services)):
+    """
+    最近N分钟的逐笔价格
+
+    Args:
+        crypto_id: 加密货币ID（如 bitcoin）
+        minutes: 时间窗口（分钟），默认15
+    """
+    crypto_id = crypto_id.lower()
+    validate_minutes(minutes)
+    buffer = get_tick_buffer(crypto_id, services)
+    now, _ = buffer.latest()
+    times, prices = buffer.range(now - minutes * 60)
+    return {"data": {"id": crypto_id, "time": times, "price_usd": prices}}
+
+
+def get_order_book(crypto_id: str, services: Services):
+    """校验资产并获取已同步的订单簿，未启用或尚未同步时返回503"""
+    if crypto_id not in SUPPORTED_CRYPTO:
+        raise HTTPException(status_code=404, detail="Cryptocurrency not found")
+    if services.orderbooks is None:
+        raise HTTPException(status_code=503, detail="Order book feed is not enabled")
+    book = services.orderbooks.get(crypto_id)
+    if book is None:
+        raise HTTPException(status_code=503, detail="Order book is not synchronized yet")
+    return book
+
+
+@router.get("/api/v1/crypto/{crypto_id}/orderbook")
+async def get_crypto_orderbook(crypto_id: str, limit: int = 20, services: Services = Depends(get_services)):
+    """
+    L2订单簿的前N档
+
+    Args:
+        crypto_id: 加密货币ID（如 bitcoin）
+        limit: 每侧返回的价位数（1-500），默认20
+    """
+    crypto_id = crypto_id.lower()
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    book = get_order_book(crypto_id, services)
+    return {"data": {"id": crypto_id, **book.levels(limit)}}
+
+
+@router.get("/api/v1/crypto/{crypto_id}/orderbook/top")
+async def get_crypto_orderbook_top(crypto_id: str, services: Services = Depends(get_services)):
+    """最优买卖价、价差（含基点）和中间价"""
+    crypto_id = crypto_id.lower()
+    top = get_order_book(crypto_id, services).top()
+    if top is None:
+        raise HTTPException(status_code=503, detail="Order book is empty")
+    return {"data": {"id": crypto_id, **top}}
+
+
+@router.get("/api/v1/crypto/{crypto_id}/orderbook/depth")
+async def get_crypto_orderbook_depth(crypto_id: str, percent: float = 1.0, services: Services = Depends(get_services)):
+    """
+    中间价上下X%以内的挂单量、金额和买卖失衡度
+
+    Args:
+        crypto_id: 加密货币ID（如 bitcoin）
+        percent: 距中间价的百分比（0-50），默认1
+    """
+    crypto_id = crypto_id.lower()
+    if not 0 < percent <= 50:
+        raise HTTPException(status_code=400, detail="percent must be between 0 and 50")
+    depth = get_order_book(crypto_id, services).depth(percent)
+    if depth is None:
+        raise HTTPException(status_code=503, detail="Order book is empty")
+    return {"data": {"id": crypto_id, **depth}}
+
+
+@router.get("/api/v1/crypto/{crypto_id}/history/export")
+async def export_crypto_history(
+    crypto_id: str,
+    format: str = "ndjson",
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    chunk_size: int = 1000,
+    request: Request = None,
+    services: Services = Depends(get_services)
+):
+    """
+    流式导出历史价格
+
+    数据来自本地历史存储，时间和价格做差分编码后分块输出，内存占用与导出长度无关。
+
+    Args:
+        crypto_id: 加密货币ID（如 bitcoin）
+        format: ndjson（默认）或 arrow（需要安装 pyarrow）
+        start: 起始时间（Unix秒），默认最早
+        end: 结束时间（Unix秒），默认最新
+        chunk_size: 每块的点数 (1-10000)，默认1000
+    """
+    crypto_id = crypto_id.lower()
+    if crypto_id not in SUPPORTED_CRYPTO:
+        raise HTTPException(status_code=404, detail="Cryptocurrency not found")
+    if format not in available_formats():
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(available_formats())}"
+        )
+    if not 1 <= chunk_size <= 10000:
+        raise HTTPException(status_code=400, detail="chunk_size must be between 1 and 10000")
+
+    if is_remote_shard(services, request, crypto_id):
+        try:
+            status, headers, body = await services.cluster.forward_stream(
+                crypto_id,
+                f"/api/v1/crypto/{crypto_id}/history/export",
+                {"format": format, "start": start, "end": end, "chunk_size": chunk_size},
+                forward_headers(request)
+            )
+        except Exception as e:
+            print(f"Error forwarding history export to shard owner: {str(e)}")
+        else:
+            if status >= 400:
+                raise forwarded_error(status, b"".join([chunk async for chunk in body]))
+            return StreamingResponse(
+                body,
+                media_type=headers.get("Content-Type", EXPORT_FORMATS[format]),
+                headers={"Content-Disposition": f'attachment; filename="{crypto_id}-history.{format}"'}
+            )
+
+    series = await services.history.get_series(crypto_id)
+    if series is None:
+        raise HTTPException(status_code=503, detail="History unavailable")
+
+    chunks = iter_delta_chunks(series, start, end, chunk_size)
+    encode = iter_arrow if format == "arrow" else iter_ndjson
+    return StreamingResponse(
+        encode(crypto_id, services.history.interval, chunks),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{crypto_id}-history.{format}"'}
+    )
+
+
+# 跨资产分析使用的周期：历史序列是小时级的，不支持更小的周期
+ANALYTICS_INTERVALS = {name: RESOLUTIONS[name] for name in ("1h", "4h", "1d", "1w")}
+MAX_ANALYTICS_WINDOW = 1000
+
+
+def validate_analytics_params(interval: str, window: int) -> int:
+    """校验分析参数，返回周期秒数"""
+    if interval not in ANALYTICS_INTERVALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"interval must be one of: {', '.join(ANALYTICS_INTERVALS)}"
+        )
+    if not 2 <= window <= MAX_ANALYTICS_WINDOW:
+        raise HTTPException(
+            status_code=400,
+            detail=f"window must be between 2 and {MAX_ANALYTICS_WINDOW}"
+        )
+    return ANALYTICS_INTERVALS[interval]
+
+
+@router.get("/api/v1/analytics/correlation")
+async def get_correlation(interval: str = "1d", window: int = 30, services: Services = Depends(get_services)):
+    """
+    滚动相关系数和协方差矩阵
+
+    Args:
+        interval: 收益率周期 (1h, 4h, 1d, 1w)，默认1d
+        window: 窗口内的收益率个数，默认30
+    """
+    bar_seconds = validate_analytics_params(interval, window)
+    result = await services.analytics.correlation(bar_seconds, window)
+    return {"data": result, "interval": interval, "window": window}
+
+
+@router.get("/api/v1/analytics/volatility")
+async def get_volatility(interval: str = "1d", window: int = 30, services: Services = Depends(get_services)):
+    """
+    年化波动率
+
+    Args:
+        interval: 收益率周期 (1h, 4h, 1d, 1w)，默认1d
+        window: 窗口内的收益率个数，默认30
+    """
+    bar_seconds = validate_analytics_params(interval, window)
+    result = await services.analytics.volatility(bar_seconds, window)
+    return {"data": result, "interval": interval, "window": window}
+
+
+class AlertRequest(BaseModel):
+    """注册价格提醒的请求体"""
+
+    symbol: str
+    condition: str  # above, below, change
+    price: Optional[float] = None  # above/below 的价格阈值
+    percent: Optional[float] = None  # change 的涨跌幅阈值，负数表示下跌
+    window_minutes: Optional[int] = None  # change 的时间窗口
+    webhook_url: Optional[str] = None
+
+
+@router.post("/api/v1/alerts")
+async def create_alert(body: AlertRequest, request: Request, services: Services = Depends(get_services)):
+    """
+    注册价格提醒
+
+    每个客户端（X-API-Key 或IP）的提醒数有上限，提醒超过有效期没有触发会被删除；
+    webhook_url 只能是指向公网地址的 http / https 地址。
+
+    示例：BTC 突破70000 {"symbol": "BTC", "condition": "above", "price": 70000}；
+    DOGE 1小时内下跌5% {"symbol": "DOGE", "condition": "change", "percent": -5, "window_minutes": 60}
+    """
+    crypto_id = resolve_crypto_id(body.symbol)
+    threshold = body.percent if body.condition == "change" else body.price
+    if threshold is None:
+        raise HTTPException(status_code=400, detail="price (above/below) or percent (change) is required")
+
+    try:
+        if body.webhook_url:
+            # 解析域名会阻塞，放到线程中
+            await asyncio.to_thread(
+                check_webhook_url, body.webhook_url, True, services.alerts.allow_private_webhooks
+            )
+        alert = services.alerts.add_alert(
+            crypto_id,
+            body.condition,
+            threshold,
+            window_minutes=body.window_minutes,
+            webhook_url=body.webhook_url,
+            owner=client_identity(request.scope)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"data": alert.to_dict()}
+
+
+@router.get("/api/v1/alerts/events")
+async def get_alert_events(request: Request, limit: int = 100, services: Services = Depends(get_services)):
+    """当前客户端的提醒最近触发的事件"""
+    return {"data": services.alerts.events(client_identity(request.scope), limit)}
+
+
+@router.get("/api/v1/alerts/stream")
+async def stream_alert_events(request: Request, services: Services = Depends(get_services)):
+    """以 Server-Sent Events 推送当前客户端的提醒触发的事件"""
+    owner = client_identity(request.scope)
+    queue = services.alerts.subscribe(owner)
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 心跳，保持连接并检测客户端断开
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            services.alerts.unsubscribe(owner, queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get("/api/v1/alerts/{alert_id}")
+async def get_alert(alert_id: str, request: Request, services: Services = Depends(get_services)):
+    """查询当前客户端的提醒（触发后即删除）"""
+    alert = services.alerts.get_alert(alert_id, owner=client_identity(request.scope))
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return {"data": alert.to_dict()}
+
+
+@router.delete("/api/v1/alerts/{alert_id}")
+async def delete_alert(alert_id: str, request: Request, services: Services = Depends(get_services)):
+    """删除当前客户端的提醒"""
+    if not services.alerts.remove_alert(alert_id, owner=client_identity(request.scope)):
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return {"status": "deleted"}
+
+
+@router.get("/api/v1/fx/rates")
+async def get_fx_rates(services: Services = Depends(get_services)):
+    """计价货币汇率：1单位货币对应的美元价值"""
+    rates = await services.fx.get_rates()
+    if not rates:
+        raise HTTPException(status_code=503, detail="Exchange rates unavailable")
+    return {"data": rates, "base": BASE_CURRENCY}
+
+
+@router.get("/api/v1/health")
+async def health_check(request: Request):
+    """健康检查"""
+    return {"status": "healthy", "service": request.app.state.service_name}
+
+
+@router.get("/api/v1/quota")
+async def get_quota(request: Request, services: Services = Depends(get_services)):
+    """当前客户端的限流配额（本身不消耗令牌）"""
+    if services.rate_limiter is None:
+        return {"data": {"enabled": False}}
+    result = services.rate_limiter.peek(client_identity(request.scope))
+    return {
+        "data": {
+            "enabled": True,
+            "limit": result.limit,
+            "remaining": max(0, int(result.remaining)),
+            "refill_per_second": services.rate_limiter.refill_rate
+        }
+    }
+
+
+@router.get("/api/v1/cache/stats")
+async def cache_stats(services: Services = Depends(get_services)):
+    """缓存统计，启用自适应TTL时附带各键的访问频率、波动率和当前TTL"""
+    stats = services.cache.stats()
+    if services.ttl_policy is not None:
+        stats = {**stats, "adaptive_ttl": services.ttl_policy.stats()}
+    return {"data": stats}
+
+
+@router.get("/api/v1/scheduler")
+async def scheduler_stats(services: Services = Depends(get_services)):
+    """上游刷新计划和各任务的运行情况（仅 scheduled 模式）"""
+    if services.scheduler is None:
+        raise HTTPException(status_code=404, detail="Refresh scheduler is not enabled")
+    return {"data": services.scheduler.stats()}
+
+
+@router.get("/api/v1/cluster")
+async def cluster_stats(services: Services = Depends(get_services)):
+    """集群成员、各节点负责的资产和转发计数（仅集群模式）"""
+    if services.cluster is None:
+        raise HTTPException(status_code=404, detail="Cluster mode is not enabled")
+    return {"data": services.cluster.stats()}
+
+
+@router.get("/api/v1/cluster/bars/{crypto_id}")
+async def cluster_bars(
+    crypto_id: str,
+    bar_seconds: int,
+    count: int,
+    request: Request,
+    services: Services = Depends(get_services)
+):
+    """
+    本节点负责的资产的K线收盘价（集群内部接口，其他节点的跨资产分析从负责节点读取各资产的K线）
+
+    Args:
+        bar_seconds: 周期（秒），同分析接口支持的周期
+        count: 最多返回的周期数
+    """
+    cluster = services.cluster
+    if cluster is None or not cluster.is_internal(request.headers):
+        raise HTTPException(status_code=403, detail="Cluster internal endpoint")
+    crypto_id = crypto_id.lower()
+    if not cluster.owns(crypto_id):
+        raise HTTPException(status_code=404, detail="Asset is not owned by this node")
+    if bar_seconds not in ANALYTICS_INTERVALS.values() or not 1 <= count <= MAX_ANALYTICS_WINDOW + 2:
+        raise HTTPException(status_code=400, detail="Invalid bar_seconds or count")
+
+    bars = await services.analytics.local_bars(crypto_id, bar_seconds, count)
+    if bars is None:
+        raise HTTPException(status_code=404, detail="No history for this asset")
+    return {"data": bars}
+
+
+@router.get("/api/v1/predict/btc-sol-doge")
+async def predict_btc_sol_doge(
+    days: int = 7,
+    fields: Optional[str] = None,
+    vs: str = BASE_CURRENCY,
+    request: Request = None,
+    services: Services = Depends(get_services)
+):
+    """
+    批量预测BTC、SOL、DOGE价格
+
+    Args:
+        days: 预测天数 (1-365)，默认7天
+        fields: 每个币种只返回指定字段，如 "prediction.target_price,prediction.trend"
+        vs: 计价货币，默认USD
+
+    Returns:
+        批量预测结果
+    """
+    validate_days(days)
+
+    async def predict(crypto_id: str, days: int) -> Dict:
+        # 集群模式下每个资产由各自的负责节点预测
+        response = await forward_to_owner(
+            services, request, crypto_id, f"/api/v1/predict/{CRYPTO_SYMBOLS[crypto_id]}", {"days": days}
+        )
+        if response is None:
+            return await services.prediction.predict_crypto_price(crypto_id, days)
+        return json.loads(response.body)["data"]
+
+    crypto_ids = ["bitcoin", "solana", "dogecoin"]
+    predictions = await services.prediction.predict_multiple_cryptos(crypto_ids, days, predict)
+    paths = usd_field_paths(parse_fields(fields), vs)
+    if paths is not None:
+        predictions["data"] = {
+            symbol: select_fields(prediction, paths)
+            for symbol, prediction in predictions["data"].items()
+        }
+    predictions["data"] = await convert_currency(services, predictions["data"], vs)
+    predictions["currency"] = vs.upper()
+
+    return predictions
+
+
+@router.get("/api/v1/predict/leaderboard")
+async def predict_leaderboard(
+    trend: Optional[str] = None,
+    confidence: Optional[str] = None,
+    min_change: Optional[float] = None,
+    max_change: Optional[float] = None,
+    sort: str = "change_percent",
+    order: str = "desc",
+    limit: int = 50,
+    offset: int = 0,
+    vs: str = BASE_CURRENCY,
+    services: Services = Depends(get_services)
+):
+    """
+    全资产预测排行榜
+
+    返回最近一次完整扫描的结果，扫描在后台进行，请求不会等待扫描。
+
+    Args:
+        trend: 只返回该趋势 (strong_bullish, bullish, neutral, bearish, strong_bearish)
+        confidence: 最低置信度 (low, medium, high)
+        min_change: 预测涨跌幅下限（%）
+        max_change: 预测涨跌幅上限（%）
+        sort: 排序字段 (change_percent, momentum_percent, rsi, current_price, market_rank)
+        order: desc（默认）或 asc
+        limit: 返回的行数 (1-1000)，默认50
+        offset: 跳过的行数
+        vs: 计价货币，默认USD
+
+    Returns:
+        排名列表、筛选后的总数和扫描状态
+    """
+    if services.leaderboard is None:
+        raise HTTPException(status_code=404, detail="Prediction leaderboard is not enabled")
+    if trend is not None and trend not in TRENDS:
+        raise HTTPException(status_code=400, detail=f"trend must be one of: {', '.join(TRENDS)}")
+    if confidence is not None and confidence not in CONFIDENCE_LEVELS:
+        raise HTTPException(status_code=400, detail=f"confidence must be one of: {', '.join(CONFIDENCE_LEVELS)}")
+    if sort not in LEADERBOARD_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(LEADERBOARD_SORT_FIELDS)}")
+    if order not in ("desc", "asc"):
+        raise HTTPException(status_code=400, detail="order must be desc or asc")
+    if not 1 <= limit <= 1000 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000 and offset must not be negative")
+
+    table = services.leaderboard.table
+    if table is None:
+        raise HTTPException(status_code=503, detail="Prediction leaderboard is not ready yet")
+
+    result = table.query(trend, confidence, min_change, max_change, sort, order, limit, offset)
+    return {
+        "data": await convert_currency(services, result["rows"], vs),
+        "total": result["total"],
+        "days": table.days,
+        "currency": vs.upper(),
+        "sweep": services.leaderboard.status()
+    }
+
+
+@router.get("/api/v1/predict/{symbol}")
+async def predict_crypto(
+    symbol: str,
+    days: int = 7,
+    fields: Optional[str] = None,
+    vs: str = BASE_CURRENCY,
+    mode: str = "technical",
+    method: str = "gbm",
+    level: Optional[float] = None,
+    request: Request = None,
+    services: Services = Depends(get_services)
+):
+    """
+    预测特定加密货币价格
+
+    集群模式下转发给该资产的负责节点处理。
+
+    Args:
+        symbol: 加密货币符号 (BTC, ETH, DOGE, SOL等)
+        days: 预测天数 (1-365)，默认7天
+        fields: 只返回指定字段，如 "prediction.target_price"
+        vs: 计价货币，默认USD
+        mode: technical（技术指标，默认）或 montecarlo（概率预测）
+        method: montecarlo 的模拟方法，gbm（默认）或 bootstrap
+        level: montecarlo 计算涨破/跌破概率的价位（以 vs 计价），默认当前价格
+
+    Returns:
+        预测结果
+    """
+    validate_days(days)
+
+    # 验证是否是支持的加密货币
+    crypto_id = resolve_crypto_id(symbol)
+
+    forwarded = await forward_to_owner(
+        services,
+        request,
+        crypto_id,
+        f"/api/v1/predict/{symbol}",
+        {"days": days, "fields": fields, "vs": vs, "mode": mode, "method": method, "level": level}
+    )
+    if forwarded is not None:
+        return forwarded
+
+    if mode == "montecarlo":
+        if method not in MONTECARLO_METHODS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"method must be one of: {', '.join(MONTECARLO_METHODS)}"
+            )
+        if level is not None and vs.upper() != BASE_CURRENCY:
+            factor = await services.fx.get_factor(vs)
+            if factor is None:
+                raise HTTPException(status_code=400, detail=f"Unsupported currency: {vs.upper()}")
+            level = level / factor
+
+        forecast = await services.prediction.predict_montecarlo(crypto_id, days, method, level)
+        forecast = select_fields(forecast, usd_field_paths(parse_fields(fields), vs))
+        return {"data": await convert_currency(services, forecast, vs), "currency": vs.upper()}
+    if mode != "technical":
+        raise HTTPException(status_code=400, detail="mode must be one of: technical, montecarlo")
+
+    model = await services.prediction.get_prediction(crypto_id, days)
+    paths = parse_fields(fields)
+    if paths is None and vs.upper() == BASE_CURRENCY:
+        return Response(model.body, media_type="application/json")
+
+    prediction = await convert_currency(services, select_fields(model.data, usd_field_paths(paths, vs)), vs)
+    return {"data": prediction, "currency": vs.upper()}
+
+
+MAX_BATCH_SIZE = 50
+
+
+class BatchItem(BaseModel):
+    """批量请求中的一个子请求"""
+
+    type: str  # prices, detail, predict, supported
+    symbol: Optional[str] = None  # detail 用ID（如 bitcoin），predict 用符号（如 BTC）
+    days: int = 7
+    vs: str = BASE_CURRENCY
+    fields: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    """批量请求体"""
+
+    requests: List[BatchItem]
+
+
+def batch_item_path(item: BatchItem) -> str:
+    """子请求单独请求时的路径，用于按 route_cost 计费"""
+    if item.type == "prices":
+        return "/api/v1/crypto/prices"
+    if item.type == "supported":
+        return "/api/v1/crypto/supported"
+    if item.type == "predict":
+        return f"/api/v1/predict/{item.symbol}"
+    return f"/api/v1/crypto/{item.symbol}"
+
+
+def charge_batch_items(request: Request, response: Response, services: Services, items: List[BatchItem]):
+    """
+    按子请求各自单独请求时的消耗扣除令牌（批量请求本身在中间件中只扣1个）
+
+    令牌不足时返回429；总消耗超过桶容量的批量请求永远无法通过，直接返回400。
+    """
+    limiter = services.rate_limiter
+    if limiter is None:
+        return
+    cluster = services.cluster
+    if cluster is not None and cluster.is_internal(request.headers):
+        return
+
+    cost = sum(route_cost(batch_item_path(item)) for item in items)
+    if cost > limiter.capacity:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch costs {cost} tokens, more than the rate limit capacity of {limiter.capacity}"
+        )
+    result = limiter.acquire(client_identity(request.scope), cost)
+    if not result.allowed:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=result.headers())
+    response.headers.update(result.headers())
+
+
+async def run_batch_item(item: BatchItem, services: Services, request: Request) -> Dict:
+    """执行一个子请求，直接复用对应端点的处理函数（转发给负责节点时沿用批量请求的客户端）"""
+    result = await dispatch_batch_item(item, services, request)
+    # 默认参数下端点直接返回预先序列化的响应体
+    if isinstance(result, Response):
+        return json.loads(result.body)
+    return result
+
+
+async def dispatch_batch_item(item: BatchItem, services: Services, request: Request):
+    if item.type == "prices":
+        return await get_crypto_prices(fields=item.fields, vs=item.vs, services=services)
+    if item.type == "supported":
+        return await get_supported_cryptos(services=services)
+    if item.type in ("detail", "predict") and not item.symbol:
+        raise HTTPException(status_code=400, detail="symbol is required")
+    if item.type == "detail":
+        return await get_crypto_detail(item.symbol, fields=item.fields, vs=item.vs, services=services)
+    if item.type == "predict":
+        return await predict_crypto(
+            item.symbol, days=item.days, fields=item.fields, vs=item.vs, request=request, services=services
+        )
+    raise HTTPException(status_code=400, detail="type must be one of: prices, detail, predict, supported")
+
+
+@router.post("/api/v1/batch")
+async def batch(
+    body: BatchRequest,
+    request: Request,
+    response: Response,
+    services: Services = Depends(get_services)
+):
+    """
+    批量执行多个子请求
+
+    子请求并发执行，结果按请求顺序返回，单个子请求失败不影响其他子请求。
+    内容相同的子请求只执行一次，也只计费一次；其余子请求按单独请求时的令牌消耗计费。
+    缓存未命中时并发的上游请求也会被合并。
+
+    示例：{"requests": [{"type": "prices"}, {"type": "detail", "symbol": "bitcoin"},
+    {"type": "predict", "symbol": "BTC", "days": 30}]}
+    """
+    if len(body.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} requests per batch")
+
+    async def run(item: BatchItem) -> Dict:
+        try:
+            return {"status": 200, **await run_batch_item(item, services, request)}
+        except HTTPException as e:
+            return {"status": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {"status": 500, "error": str(e)}
+
+    keys = [(item.type, item.symbol, item.days, item.vs.upper(), item.fields) for item in body.requests]
+    unique = dict(zip(keys, body.requests))
+    charge_batch_items(request, response, services, list(unique.values()))
+
+    tasks: Dict[tuple, asyncio.Task] = {}
+    for key, item in zip(keys, body.requests):
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(run(item))
+    await asyncio.gather(*tasks.values())
+
+    results = [tasks[key].result() for key in keys]
+    return {"data": results, "count": len(results)}
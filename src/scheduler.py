@@ -0,0 +1,318 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+# 没有预算分配到的任务使用的刷新间隔（秒）
+MAX_INTERVAL = 86400
+
+
+class RefreshJob:
+    """
+    一个定时刷新任务
+
+    run(ttl) 请求上游并写入缓存，返回是否成功；cost 为每次运行的上游请求数。
+    """
+
+    __slots__ = ("name", "cost", "interval", "run", "next_at", "started", "runs", "failures", "last_run", "ready")
+
+    def __init__(self, name: str, cost: int, run: Callable[[int], Awaitable[bool]]):
+        self.name = name
+        self.cost = cost
+        self.interval = float(MAX_INTERVAL)
+        self.run = run
+        self.next_at = 0.0
+        # 最近一次运行开始的时间（monotonic）
+        self.started: Optional[float] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run: Optional[float] = None
+        # 首次运行完成（无论成功与否）后置位
+        self.ready = asyncio.Event()
+
+
+class RefreshScheduler:
+    """
+    按上游调用预算集中刷新行情数据
+
+    所有上游请求都由调度器发出，请求处理只读缓存，上游负载与客户端流量无关：
+    - assets: 批量接口一次刷新全部资产的报价和详情（数据源不支持批量时每个资产一次请求）
+    - fx: 汇率表
+    - history:{id}: 每个资产的历史序列完整重新加载
+
+    plan() 按优先级分配每分钟 budget 次请求：先保证报价至少每 max_interval 秒刷新一次，
+    再满足汇率和历史序列的名义间隔，剩余预算全部用于提高批量报价的频率（不快于 min_interval）。
+    预算不足时依次拉长历史序列、汇率的间隔。运行时相邻两次请求至少间隔 60/budget 秒，
+    实际请求速率不会超过预算。
+
+    设置了自适应TTL时，每个任务的间隔取计划间隔和它刷新的缓存键当前TTL中较长的一个：
+    冷门、平稳的数据少刷新，省下的上游调用不再花掉；批量报价仍至少每 max_interval 秒刷新一次。
+
+    Args:
+        crypto: CryptoService
+        fx: FxService
+        history: HistoryStore
+        crypto_ids: 刷新的资产（集群模式下历史序列只刷新本节点负责的资产，见 set_history_assets）
+        budget_per_minute: 上游调用预算（次/分钟）
+        min_interval: 批量报价的最短刷新间隔（秒）
+        max_interval: 批量报价的最长刷新间隔（秒）
+        fx_interval: 汇率表的刷新间隔（秒）
+        history_interval: 每个资产历史序列的刷新间隔（秒）
+        candles: K线聚合器，历史序列首次加载后用它回填K线（不再单独请求上游）
+        seed_hours: 回填的小时数，0表示不回填
+        ttl_policy: 自适应TTL（src.ttl_policy.AdaptiveTtl），为None时按计划间隔刷新
+    """
+
+    def __init__(
+        self,
+        crypto,
+        fx,
+        history,
+        crypto_ids: List[str],
+        budget_per_minute: float = 60,
+        min_interval: float = 10,
+        max_interval: float = 300,
+        fx_interval: float = 3600,
+        history_interval: float = 6 * 3600,
+        candles=None,
+        seed_hours: int = 0,
+        ttl_policy=None
+    ):
+        self.crypto = crypto
+        self.fx = fx
+        self.history = history
+        self.crypto_ids = list(crypto_ids)
+        self.history_ids = list(crypto_ids)
+        self.budget = max(budget_per_minute, 1.0)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fx_interval = fx_interval
+        self.history_interval = history_interval
+        self.candles = candles
+        self.seed_hours = seed_hours
+        self.ttl_policy = ttl_policy
+
+        bulk = getattr(crypto.provider, "BULK_DETAILS", False)
+        self.jobs: Dict[str, RefreshJob] = {
+            "assets": RefreshJob("assets", 1 if bulk else len(self.crypto_ids), self._refresh_assets),
+            "fx": RefreshJob("fx", 1, self._refresh_fx),
+        }
+        for crypto_id in self.history_ids:
+            name = f"history:{crypto_id}"
+            self.jobs[name] = RefreshJob(name, 1, self._history_refresher(crypto_id))
+
+        self.calls = 0
+        self._pace_until = 0.0
+        self._replan_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._seeded = set()
+        self.plan()
+
+    def plan(self) -> Dict[str, Dict]:
+        """
+        按预算计算各任务的刷新间隔
+
+        Returns:
+            {任务组: {"interval": 秒, "calls_per_minute": 请求数}}
+        """
+        assets = self.jobs["assets"]
+        n = len(self.history_ids)
+        remaining = self.budget
+
+        assets_rate = min(60 / self.max_interval * assets.cost, remaining)
+        remaining -= assets_rate
+        fx_rate = min(60 / self.fx_interval, remaining)
+        remaining -= fx_rate
+        history_rate = min(n * 60 / self.history_interval, remaining) if n else 0.0
+        remaining -= history_rate
+        assets_rate += min(remaining, 60 / self.min_interval * assets.cost - assets_rate)
+
+        def interval(calls: float, rate: float) -> float:
+            return min(MAX_INTERVAL, 60 * calls / rate) if rate > 0 else MAX_INTERVAL
+
+        plan = {
+            "assets": {"interval": interval(assets.cost, assets_rate), "calls_per_minute": assets_rate},
+            "fx": {"interval": interval(1, fx_rate), "calls_per_minute": fx_rate},
+            "history": {"interval": interval(n, history_rate), "calls_per_minute": history_rate},
+        }
+        for name, job in self.jobs.items():
+            job.interval = plan[name.split(":", 1)[0]]["interval"]
+        return plan
+
+    def _key_ttl(self, family: str, key: str) -> float:
+        ttl = self.ttl_policy.ttl(key)
+        # 没有访问过的键按键族的最长TTL处理
+        return ttl if ttl is not None else self.ttl_policy.policies[family].max_ttl
+
+    def _interval(self, job: RefreshJob) -> float:
+        """
+        任务当前的刷新间隔
+
+        启用自适应TTL时按任务刷新的缓存键中最短的TTL拉长间隔，不短于计划间隔（不超出预算）。
+        """
+        if self.ttl_policy is None:
+            return job.interval
+        if job.name == "assets":
+            ttl = min(
+                [self._key_ttl("quotes", "crypto_quotes")]
+                + [self._key_ttl("detail", f"crypto_detail_{crypto_id}") for crypto_id in self.crypto_ids]
+            )
+            ttl = min(ttl, self.max_interval)
+        elif job.name == "fx":
+            ttl = self._key_ttl("fx", self.fx.CACHE_KEY)
+        else:
+            ttl = self._key_ttl("history", f"history_{job.name.split(':', 1)[1]}")
+        return max(job.interval, ttl)
+
+    def _replan(self, now: float):
+        """访问变热的任务按新的间隔提前下次运行（变冷的任务在下次运行后拉长间隔）"""
+        for job in self.jobs.values():
+            if job.started is not None:
+                job.next_at = min(job.next_at, job.started + self._interval(job))
+        self._replan_at = now + self.min_interval
+
+    def _ttl(self, interval: float) -> int:
+        # 缓存保留到错过几次刷新之后，上游短暂失败时继续提供最近的数据
+        return int(max(interval * 3, self.max_interval))
+
+    async def _refresh_assets(self, ttl: int) -> bool:
+        return bool(await self.crypto.refresh_assets(ttl))
+
+    async def _refresh_fx(self, ttl: int) -> bool:
+        return bool(await self.fx.refresh_rates(ttl))
+
+    def _seed_candles(self, crypto_id: str, series):
+        """
+        用历史序列回填K线（每个资产只回填一次）
+
+        批量报价通常先于历史序列刷新，当前K线已经由实时报价打开，历史数据插到它之前。
+        """
+        if self.candles is None or self.seed_hours <= 0 or crypto_id in self._seeded:
+            return
+        self._seeded.add(crypto_id)
+        start = len(series) - self.seed_hours * 3600 // self.history.step
+        self.candles.seed(crypto_id, (
+            {"priceUsd": series.prices[i], "time": series.times[i] * 1000}
+            for i in range(max(0, start), len(series))
+        ), self.history.step)
+
+    def _history_refresher(self, crypto_id: str) -> Callable[[int], Awaitable[bool]]:
+        async def refresh(ttl: int) -> bool:
+            series = await self.history.reload(crypto_id)
+            if series is None:
+                return False
+            self._seed_candles(crypto_id, series)
+            return True
+        return refresh
+
+    def set_history_assets(self, crypto_ids: Iterable[str]):
+        """
+        更改刷新历史序列的资产（集群重新分片后调用）
+
+        新增的资产立即加载，移除的资产不再刷新，释放的预算重新分配给其余任务。
+        """
+        crypto_ids = set(crypto_ids)
+        wanted = [crypto_id for crypto_id in self.crypto_ids if crypto_id in crypto_ids]
+        now = time.monotonic()
+        for crypto_id in set(self.history_ids) - set(wanted):
+            job = self.jobs.pop(f"history:{crypto_id}")
+            # 不让等待中的请求一直挂起
+            job.ready.set()
+        for crypto_id in set(wanted) - set(self.history_ids):
+            name = f"history:{crypto_id}"
+            self.jobs[name] = RefreshJob(name, 1, self._history_refresher(crypto_id))
+            self.jobs[name].next_at = now
+        self.history_ids = wanted
+        self.plan()
+        self._wakeup.set()
+
+    async def wait_ready(self, name: str):
+        """
+        等待任务首次运行完成
+
+        任务还没有运行过时提前到下一个执行，不存在的任务直接返回。
+        """
+        job = self.jobs.get(name)
+        if job is None or job.ready.is_set():
+            return
+        job.next_at = min(job.next_at, time.monotonic())
+        self._wakeup.set()
+        await job.ready.wait()
+
+    def _initial_schedule(self):
+        """快照恢复的历史序列在到期前不重新加载，直接用它回填K线"""
+        now = time.monotonic()
+        loaded = self.history.snapshot()
+        for crypto_id in self.history_ids:
+            job = self.jobs[f"history:{crypto_id}"]
+            series = loaded.get(crypto_id)
+            if series is not None:
+                job.next_at = now + max(0.0, job.interval - (time.time() - series.loaded_at))
+                job.ready.set()
+                self._seed_candles(crypto_id, series)
+
+    async def run(self):
+        """调度循环：依次运行最早到期的任务，请求之间按预算限速"""
+        self._initial_schedule()
+        while True:
+            now = time.monotonic()
+            # 启用自适应TTL时每 min_interval 秒按最新的访问频率和波动率重新调整各任务
+            if self.ttl_policy is not None and now >= self._replan_at:
+                self._replan(now)
+            job = min(self.jobs.values(), key=lambda job: job.next_at)
+            delay = max(job.next_at, self._pace_until) - now
+            if self.ttl_policy is not None:
+                delay = min(delay, self._replan_at - now)
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_job(job)
+
+    async def _run_job(self, job: RefreshJob):
+        started = time.monotonic()
+        interval = self._interval(job)
+        try:
+            ok = await job.run(self._ttl(interval))
+        except Exception as e:
+            print(f"Error running refresh job {job.name}: {str(e)}")
+            ok = False
+
+        job.started = started
+        job.runs += 1
+        job.last_run = time.time()
+        if not ok:
+            job.failures += 1
+        # 失败的任务不等完整的间隔，最晚 max_interval 秒后重试
+        job.next_at = started + (interval if ok else min(interval, self.max_interval))
+        self.calls += job.cost
+        self._pace_until = time.monotonic() + job.cost * 60 / self.budget
+        job.ready.set()
+
+    def stats(self) -> Dict:
+        """刷新计划和各任务的运行情况"""
+        now = time.monotonic()
+        plan = self.plan()
+        return {
+            "budget_per_minute": self.budget,
+            "planned_calls_per_minute": round(sum(group["calls_per_minute"] for group in plan.values()), 3),
+            "upstream_calls": self.calls,
+            "plan": {
+                name: {"interval": round(group["interval"], 1), "calls_per_minute": round(group["calls_per_minute"], 3)}
+                for name, group in plan.items()
+            },
+            "jobs": {
+                name: {
+                    "cost": job.cost,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_run": job.last_run,
+                    "interval": round(self._interval(job), 1),
+                    "next_in": round(max(0.0, job.next_at - now), 1)
+                }
+                for name, job in self.jobs.items()
+            }
+        }
@@ -0,0 +1,254 @@
+import asyncio
+from typing import List, Optional, Set
+
+from src.config import (
+    SUPPORTED_CRYPTO,
+    CANDLE_POLL_INTERVAL,
+    CANDLE_CAPACITY,
+    CANDLE_SEED_HOURS,
+    TICK_CAPACITY,
+    ORDERBOOK_FEED,
+    ORDERBOOK_LEVELS,
+    ORDERBOOK_INTERVAL,
+    HISTORY_MAX_DAYS,
+    HISTORY_TTL,
+    MAX_ALERTS,
+    MAX_ALERTS_PER_CLIENT,
+    ALERT_TTL,
+    ALERT_ALLOW_PRIVATE_WEBHOOKS,
+    ALERT_WEBHOOK_TIMEOUT,
+    FX_RATES_TTL,
+    CACHE_TTL,
+    ADAPTIVE_TTL,
+    UPSTREAM_CALL_BUDGET,
+    REFRESH_MODE,
+    REFRESH_MIN_INTERVAL,
+    SNAPSHOT_PATH,
+    SNAPSHOT_INTERVAL,
+    SNAPSHOT_RESTORE_TTL,
+    RATE_LIMIT_CAPACITY,
+    RATE_LIMIT_REFILL_RATE,
+    RATE_LIMIT_LEASE,
+    LEADERBOARD_INTERVAL,
+    LEADERBOARD_UNIVERSE,
+    LEADERBOARD_DAYS,
+    LEADERBOARD_CHUNK,
+    LEADERBOARD_CONCURRENCY,
+    LEADERBOARD_CALLS_PER_MINUTE,
+    LEADERBOARD_STATE_PATH,
+    CLUSTER_NODE_URL,
+    CLUSTER_NODE_ID,
+    CLUSTER_HEARTBEAT_INTERVAL,
+    CLUSTER_NODE_TTL,
+    CLUSTER_REPLICAS,
+    CLUSTER_SECRET,
+    CLUSTER_FORWARD_TIMEOUT
+)
+from src.alerts import AlertEngine
+from src.analytics import AnalyticsService
+from src.cache import create_cache
+from src.candles import CandleAggregator
+from src.cluster import ClusterNode, create_membership
+from src.fx import FxService
+from src.history_store import HistoryStore
+from src.leaderboard import LeaderboardSweep
+from src.orderbook import OrderBookManager, SimulatedExchange
+from src.providers import create_provider
+from src.rate_limit import create_rate_limiter
+from src.scheduler import RefreshScheduler
+from src.snapshot import SnapshotManager
+from src.ticks import TickStore
+from src.ttl_policy import AdaptiveTtl
+from src.crypto_service import CryptoService
+from src.prediction_service import PredictionService
+
+
+class Services:
+    """
+    单个应用实例使用的全部服务
+
+    缓存后端和数据源在这里组装一次，所有服务共享同一个缓存和同一个上游会话。
+    """
+
+    def __init__(self, cache_backend: Optional[str] = None, provider: Optional[str] = None):
+        self.cache = create_cache(cache_backend)
+        self.provider = create_provider(provider)
+        # 按需刷新时决定缓存TTL，定时刷新时决定调度器各任务的刷新间隔
+        self.ttl_policy = AdaptiveTtl(UPSTREAM_CALL_BUDGET) if ADAPTIVE_TTL else None
+        self.crypto = CryptoService(cache=self.cache, provider=self.provider, ttl_policy=self.ttl_policy)
+        self.fx = FxService(self.cache, self.provider, ttl=FX_RATES_TTL, ttl_policy=self.ttl_policy)
+        self.rate_limiter = create_rate_limiter(
+            self.cache,
+            RATE_LIMIT_CAPACITY,
+            RATE_LIMIT_REFILL_RATE,
+            lease=RATE_LIMIT_LEASE
+        )
+        self.history = HistoryStore(
+            self.provider,
+            max_points=HISTORY_MAX_DAYS * 24,
+            ttl=HISTORY_TTL,
+            ttl_policy=self.ttl_policy
+        )
+        self.prediction = PredictionService(provider=self.provider, history=self.history)
+        self.analytics = AnalyticsService(self.history, SUPPORTED_CRYPTO)
+
+        self.leaderboard: Optional[LeaderboardSweep] = None
+        if LEADERBOARD_INTERVAL > 0:
+            self.leaderboard = LeaderboardSweep(
+                self.provider,
+                self.prediction,
+                universe_size=LEADERBOARD_UNIVERSE,
+                days=LEADERBOARD_DAYS,
+                chunk_size=LEADERBOARD_CHUNK,
+                concurrency=LEADERBOARD_CONCURRENCY,
+                calls_per_minute=LEADERBOARD_CALLS_PER_MINUTE,
+                state_path=LEADERBOARD_STATE_PATH
+            )
+
+        if self.ttl_policy is not None:
+            self.crypto.add_price_listener(self.ttl_policy.on_prices)
+
+        self.candles = CandleAggregator(capacity=CANDLE_CAPACITY)
+        self.crypto.add_price_listener(self.candles.on_prices)
+        self.crypto.add_price_listener(self.history.on_prices)
+
+        self.ticks = TickStore(capacity=TICK_CAPACITY)
+        self.crypto.add_price_listener(self.ticks.on_prices)
+
+        self.orderbooks: Optional[OrderBookManager] = None
+        if ORDERBOOK_FEED == "simulated":
+            exchange = SimulatedExchange(SUPPORTED_CRYPTO, levels=ORDERBOOK_LEVELS, interval=ORDERBOOK_INTERVAL)
+            self.crypto.add_price_listener(exchange.on_prices)
+            self.orderbooks = OrderBookManager(exchange, SUPPORTED_CRYPTO)
+        elif ORDERBOOK_FEED:
+            raise ValueError(f"Unknown order book feed: {ORDERBOOK_FEED}")
+
+        self.alerts = AlertEngine(
+            max_alerts=MAX_ALERTS,
+            max_alerts_per_client=MAX_ALERTS_PER_CLIENT,
+            ttl=ALERT_TTL,
+            webhook_timeout=ALERT_WEBHOOK_TIMEOUT,
+            allow_private_webhooks=ALERT_ALLOW_PRIVATE_WEBHOOKS
+        )
+        self.crypto.add_price_listener(self.alerts.on_prices)
+
+        self.scheduler: Optional[RefreshScheduler] = None
+        if REFRESH_MODE == "scheduled":
+            self.scheduler = RefreshScheduler(
+                self.crypto,
+                self.fx,
+                self.history,
+                SUPPORTED_CRYPTO,
+                budget_per_minute=UPSTREAM_CALL_BUDGET,
+                min_interval=REFRESH_MIN_INTERVAL,
+                max_interval=CACHE_TTL,
+                fx_interval=FX_RATES_TTL,
+                history_interval=HISTORY_TTL,
+                candles=self.candles,
+                seed_hours=CANDLE_SEED_HOURS,
+                ttl_policy=self.ttl_policy
+            )
+            # 请求处理只读缓存，上游请求全部由调度器发出
+            self.crypto.scheduler = self.scheduler
+            self.fx.scheduler = self.scheduler
+            self.history.scheduler = self.scheduler
+
+        # 集群模式：本节点只加载和刷新哈希环分给它的资产的历史序列，其余资产的预测和历史请求转发给负责节点
+        self.cluster: Optional[ClusterNode] = None
+        if CLUSTER_NODE_URL:
+            self.cluster = ClusterNode(
+                CLUSTER_NODE_ID or CLUSTER_NODE_URL,
+                CLUSTER_NODE_URL,
+                create_membership(self.cache),
+                SUPPORTED_CRYPTO,
+                heartbeat_interval=CLUSTER_HEARTBEAT_INTERVAL,
+                node_ttl=CLUSTER_NODE_TTL,
+                replicas=CLUSTER_REPLICAS,
+                secret=CLUSTER_SECRET,
+                forward_timeout=CLUSTER_FORWARD_TIMEOUT,
+                on_rebalance=self._rebalance
+            )
+            self.history.cluster = self.cluster
+            self.analytics.cluster = self.cluster
+
+        self.snapshots: Optional[SnapshotManager] = None
+        if SNAPSHOT_PATH:
+            self.snapshots = SnapshotManager(
+                SNAPSHOT_PATH,
+                self.cache,
+                self.history,
+                SUPPORTED_CRYPTO,
+                restore_ttl=SNAPSHOT_RESTORE_TTL
+            )
+
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """启动后台任务；配置了快照时先从快照恢复，刷新在后台继续"""
+        if hasattr(self.cache, "start_sweeper"):
+            self.cache.start_sweeper()
+        if self.snapshots is not None:
+            self.snapshots.restore()
+            if SNAPSHOT_INTERVAL > 0:
+                self._tasks.append(asyncio.create_task(self.snapshots.run(SNAPSHOT_INTERVAL)))
+        self._tasks.append(asyncio.create_task(self.alerts.run_webhooks()))
+        if self.cluster is not None:
+            # 先加入集群确定本节点负责的资产，调度器只加载这些资产
+            try:
+                await self.cluster.join()
+            except Exception as e:
+                print(f"Error joining cluster: {str(e)}")
+            self._tasks.append(asyncio.create_task(self.cluster.run()))
+        if self.orderbooks is not None:
+            self._tasks.append(asyncio.create_task(self.orderbooks.run()))
+        if self.leaderboard is not None:
+            self._tasks.append(asyncio.create_task(self.leaderboard.run(LEADERBOARD_INTERVAL)))
+        if self.scheduler is not None:
+            self._tasks.append(asyncio.create_task(self.scheduler.run()))
+        elif CANDLE_POLL_INTERVAL > 0:
+            self._tasks.append(asyncio.create_task(self._poll_prices()))
+
+    async def close(self):
+        """停止后台任务并释放连接"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self.orderbooks is not None:
+            await self.orderbooks.close()
+        if self.cluster is not None:
+            await self.cluster.close()
+
+        if self.snapshots is not None:
+            await self.snapshots.save()
+
+        self.provider.close()
+        self.cache.close()
+
+    def _rebalance(self, owned: Set[str]):
+        """集群重新分片：调度器改为刷新新的资产集合，释放不再负责的资产的历史序列"""
+        if self.scheduler is not None:
+            self.scheduler.set_history_assets(owned)
+        for crypto_id in SUPPORTED_CRYPTO:
+            if crypto_id not in owned:
+                self.history.forget(crypto_id)
+
+    async def _seed_candles(self):
+        """用上游小时级历史数据回填K线"""
+        histories = await asyncio.gather(*(
+            self.provider.fetch_history(crypto_id, "h1", CANDLE_SEED_HOURS)
+            for crypto_id in SUPPORTED_CRYPTO
+        ))
+        for crypto_id, points in zip(SUPPORTED_CRYPTO, histories):
+            self.candles.seed(crypto_id, points, 3600)
+
+    async def _poll_prices(self):
+        """先回填K线，再按固定间隔轮询价格；每次刷新的报价通过回调写入K线"""
+        if CANDLE_SEED_HOURS > 0:
+            await self._seed_candles()
+        while True:
+            try:
+                await self.crypto.refresh_crypto_quotes()
+            except Exception as e:
+                print(f"Error polling crypto prices: {str(e)}")
+            await asyncio.sleep(CANDLE_POLL_INTERVAL)
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from src.cache import CacheManager
+from src.history_store import HistorySeries, HistoryStore
+
+
+MAGIC = b"CMKTSNAP"
+FORMAT_VERSION = 1
+# 魔数、格式版本、正文长度、正文的 blake2b 摘要
+HEADER = struct.Struct("<8sIQ16s")
+META_LENGTH = struct.Struct("<I")
+
+
+def _digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+class MarketSnapshot:
+    """
+    某一时刻的完整市场状态
+
+    quotes / details / rates 是缓存中的JSON数据；
+    series 是历史序列的列存数据 {crypto_id: (时间 array('q'), 价格 array('d'), loaded_at)}。
+    """
+
+    __slots__ = ("created_at", "quotes", "details", "rates", "series")
+
+    def __init__(
+        self,
+        created_at: float,
+        quotes: Optional[Dict] = None,
+        details: Optional[Dict[str, Dict]] = None,
+        rates: Optional[Dict[str, float]] = None,
+        series: Optional[Dict[str, Tuple[array, array, float]]] = None
+    ):
+        self.created_at = created_at
+        self.quotes = quotes
+        self.details = details or {}
+        self.rates = rates
+        self.series = series or {}
+
+
+def write_snapshot(path: str, snapshot: MarketSnapshot) -> int:
+    """
+    把快照原子地写入文件
+
+    文件布局：头部 | 元数据长度 | 元数据JSON | 填充到8字节对齐 | 各资产的时间列和价格列。
+    先写到同目录的临时文件并 fsync，再用 os.replace 替换，进程中途崩溃不会留下半个文件。
+
+    Returns:
+        写入的字节数
+    """
+    columns = []
+    index = []
+    offset = 0
+    for crypto_id, (times, prices, loaded_at) in snapshot.series.items():
+        count = min(len(times), len(prices))
+        index.append({"id": crypto_id, "offset": offset, "count": count, "loaded_at": loaded_at})
+        columns.append(memoryview(times)[:count].cast("B"))
+        columns.append(memoryview(prices)[:count].cast("B"))
+        offset += 16 * count
+
+    meta = json.dumps({
+        "created_at": snapshot.created_at,
+        "byteorder": sys.byteorder,
+        "quotes": snapshot.quotes,
+        "details": snapshot.details,
+        "rates": snapshot.rates,
+        "series": index
+    }).encode("utf-8")
+    prefix = META_LENGTH.pack(len(meta)) + meta
+    prefix += b"\0" * (-(HEADER.size + len(prefix)) % 8)
+
+    digest = _digest()
+    digest.update(prefix)
+    for column in columns:
+        digest.update(column)
+    body_length = len(prefix) + offset
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, body_length, digest.digest()))
+        f.write(prefix)
+        for column in columns:
+            f.write(column)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return HEADER.size + body_length
+
+
+def read_snapshot(path: str) -> Optional[MarketSnapshot]:
+    """
+    通过 mmap 读取快照
+
+    校验魔数、版本、长度和摘要，任何一项不符都视为没有快照。
+    列数据直接从映射区复制进 array，不经过中间缓冲。
+
+    Returns:
+        快照，文件不存在或已损坏时返回None
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return _parse_snapshot(view)
+            finally:
+                view.release()
+
+    except Exception as e:
+        print(f"Error reading snapshot {path}: {str(e)}")
+        return None
+
+
+def _parse_snapshot(view: memoryview) -> Optional[MarketSnapshot]:
+    if len(view) < HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, body_length, expected = HEADER.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("unknown snapshot format")
+    # 用 with 及时释放对映射区的引用，否则出错时 mmap 无法关闭
+    with view[HEADER.size:] as body:
+        if len(body) != body_length:
+            raise ValueError("truncated body")
+
+        digest = _digest()
+        digest.update(body)
+        if digest.digest() != expected:
+            raise ValueError("checksum mismatch")
+
+        (meta_length,) = META_LENGTH.unpack_from(body)
+        meta = json.loads(bytes(body[META_LENGTH.size:META_LENGTH.size + meta_length]))
+        data_start = META_LENGTH.size + meta_length
+        data_start += -(HEADER.size + data_start) % 8
+        swap = meta.get("byteorder") != sys.byteorder
+
+        series = {}
+        for entry in meta["series"]:
+            start = data_start + entry["offset"]
+            count = entry["count"]
+            times = array("q")
+            prices = array("d")
+            times.frombytes(body[start:start + 8 * count])
+            prices.frombytes(body[start + 8 * count:start + 16 * count])
+            if swap:
+                times.byteswap()
+                prices.byteswap()
+            series[entry["id"]] = (times, prices, entry["loaded_at"])
+
+    return MarketSnapshot(meta["created_at"], meta["quotes"], meta["details"], meta["rates"], series)
+
+
+class SnapshotManager:
+    """
+    市场状态的定期快照与启动恢复
+
+    报价、详情、汇率从缓存读取，历史序列从 HistoryStore 读取；
+    采集在事件循环中完成（保证时间列和价格列一致），序列化和写盘放到线程中。
+    启动时恢复的缓存条目使用较短的TTL，先用快照响应请求，后台刷新随后覆盖。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache: CacheManager,
+        history: HistoryStore,
+        crypto_ids: List[str],
+        restore_ttl: int = 60
+    ):
+        self.path = path
+        self.cache = cache
+        self.history = history
+        self.crypto_ids = list(crypto_ids)
+        self.restore_ttl = restore_ttl
+
+    def collect(self) -> MarketSnapshot:
+        """采集当前市场状态"""
+        details = {}
+        for crypto_id in self.crypto_ids:
+            detail = self.cache.get(f"crypto_detail_{crypto_id}")
+            if detail:
+                details[crypto_id] = detail
+
+        series = {
+            crypto_id: (array("q", s.times), array("d", s.prices), s.loaded_at)
+            for crypto_id, s in self.history.snapshot().items()
+        }
+        return MarketSnapshot(
+            time.time(),
+            quotes=self.cache.get("crypto_quotes"),
+            details=details,
+            rates=self.cache.get("fx_rates"),
+            series=series
+        )
+
+    async def save(self) -> int:
+        """
+        写入一次快照
+
+        Returns:
+            写入的字节数，失败时为0
+        """
+        snapshot = self.collect()
+        try:
+            return await asyncio.to_thread(write_snapshot, self.path, snapshot)
+        except Exception as e:
+            print(f"Error writing snapshot {self.path}: {str(e)}")
+            return 0
+
+    def restore(self) -> bool:
+        """
+        从快照恢复缓存和历史序列
+
+        Returns:
+            是否恢复成功
+        """
+        snapshot = read_snapshot(self.path)
+        if snapshot is None:
+            return False
+
+        if snapshot.quotes:
+            self.cache.set("crypto_quotes", snapshot.quotes, self.restore_ttl)
+        for crypto_id, detail in snapshot.details.items():
+            self.cache.set(f"crypto_detail_{crypto_id}", detail, self.restore_ttl)
+        if snapshot.rates:
+            self.cache.set("fx_rates", snapshot.rates, self.restore_ttl)
+
+        for crypto_id, (times, prices, loaded_at) in snapshot.series.items():
+            if times:
+                self.history.restore(crypto_id, HistorySeries(times, prices, loaded_at))
+        return True
+
+    async def run(self, interval: float):
+        """定期写快照的循环"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.save()
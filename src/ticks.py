@@ -0,0 +1,188 @@
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+
+class TickBuffer:
+    """
+    单个资产的逐笔价格环形缓冲区
+
+    时间（Unix秒）和价格分别存放在定长 array('d') 中，每个tick固定16字节；
+    写满后覆盖最旧的tick。追加为O(1)，按时间范围查找用二分，为O(log n)。
+    """
+
+    __slots__ = ("capacity", "times", "prices", "head", "count")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.head = 0  # 下一个tick写入的位置
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _physical(self, i: int) -> int:
+        """第 i 个（按时间升序，从0开始）tick在数组中的位置"""
+        return (self.head - self.count + i) % self.capacity
+
+    def append(self, timestamp: float, price: float) -> bool:
+        """
+        追加一个tick
+
+        Returns:
+            是否被接受；早于最新tick的乱序数据会被丢弃
+        """
+        if self.count and timestamp < self.times[(self.head - 1) % self.capacity]:
+            return False
+
+        i = self.head
+        self.times[i] = timestamp
+        self.prices[i] = price
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return True
+
+    def first(self) -> Optional[Tuple[float, float]]:
+        """最早的 (时间, 价格)，没有数据时返回None"""
+        if not self.count:
+            return None
+        p = self._physical(0)
+        return self.times[p], self.prices[p]
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """最新的 (时间, 价格)，没有数据时返回None"""
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.times[i], self.prices[i]
+
+    def _bisect_right(self, timestamp: float) -> int:
+        """时间不大于 timestamp 的tick个数"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[self._physical(mid)] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _bisect_left(self, timestamp: float) -> int:
+        """时间小于 timestamp 的tick个数"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[self._physical(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def price_at(self, timestamp: float) -> Optional[Tuple[float, float]]:
+        """
+        timestamp 时刻的价格（该时刻及之前的最后一个tick）
+
+        Returns:
+            (tick时间, 价格)，缓冲区中没有那么早的数据时返回None
+        """
+        i = self._bisect_right(timestamp)
+        if i == 0:
+            return None
+        p = self._physical(i - 1)
+        return self.times[p], self.prices[p]
+
+    def count_since(self, timestamp: float) -> int:
+        """时间不早于 timestamp 的tick个数"""
+        return self.count - self._bisect_left(timestamp)
+
+    def range(self, start: float, end: Optional[float] = None) -> Tuple[List[float], List[float]]:
+        """
+        时间范围内的tick
+
+        Args:
+            start: 起始时间（含）
+            end: 结束时间（含），默认到最新
+
+        Returns:
+            (时间列表, 价格列表)，按时间升序
+        """
+        lo = self._bisect_left(start)
+        hi = self._bisect_right(end) if end is not None else self.count
+        times = []
+        prices = []
+        for i in range(lo, hi):
+            p = self._physical(i)
+            times.append(self.times[p])
+            prices.append(self.prices[p])
+        return times, prices
+
+
+class TickStore:
+    """
+    所有资产的逐笔价格
+
+    由价格刷新回调写入，短周期的涨跌幅可以直接在内存中计算，不需要请求上游历史数据。
+    内存占用固定为 资产数 * capacity * 16 字节。
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self._buffers: Dict[str, TickBuffer] = {}
+
+    def get(self, crypto_id: str) -> Optional[TickBuffer]:
+        """资产的缓冲区，还没有tick时返回None"""
+        return self._buffers.get(crypto_id)
+
+    def add_tick(self, crypto_id: str, price: float, timestamp: Optional[float] = None) -> bool:
+        """写入一个tick"""
+        buffer = self._buffers.get(crypto_id)
+        if buffer is None:
+            buffer = TickBuffer(self.capacity)
+            self._buffers[crypto_id] = buffer
+        return buffer.append(time.time() if timestamp is None else timestamp, price)
+
+    def on_prices(self, quotes: Dict[str, Dict], timestamp: float):
+        """价格刷新回调：把一批报价作为tick写入"""
+        for crypto_id, quote in quotes.items():
+            self.add_tick(crypto_id, quote["price_usd"], timestamp)
+
+    def change(self, crypto_id: str, seconds: float) -> Optional[Dict]:
+        """
+        最近 seconds 秒的涨跌幅
+
+        缓冲区覆盖不到整个区间时，以最早的tick为参考，返回值中的 from 为实际参考时间。
+
+        Returns:
+            {"price_usd", "reference_price", "change_percent", "from", "to", "ticks"}，没有数据时返回None
+        """
+        buffer = self._buffers.get(crypto_id)
+        latest = buffer.latest() if buffer is not None else None
+        if latest is None:
+            return None
+
+        now, price = latest
+        reference = buffer.price_at(now - seconds)
+        if reference is None:
+            reference = buffer.first()
+        ref_time, ref_price = reference
+
+        return {
+            "price_usd": price,
+            "reference_price": ref_price,
+            "change_percent": round((price / ref_price - 1) * 100, 4) if ref_price > 0 else None,
+            "from": ref_time,
+            "to": now,
+            "ticks": buffer.count_since(ref_time)
+        }
+
+    def stats(self) -> Dict:
+        """缓冲区统计"""
+        return {
+            "assets": len(self._buffers),
+            "capacity": self.capacity,
+            "ticks": sum(len(buffer) for buffer in self._buffers.values()),
+            "bytes": len(self._buffers) * self.capacity * 16
+        }
@@ -0,0 +1,169 @@
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TtlPolicy:
+    """
+    一类缓存键的TTL策略
+
+    Args:
+        family: 键族名称（quotes, detail, fx, history）
+        min_ttl: 最短TTL（秒）
+        max_ttl: 最长TTL（秒），没有访问的键使用该值
+        default_volatility: 还没有观测到波动率时使用的每秒对数收益率标准差
+    """
+
+    __slots__ = ("family", "min_ttl", "max_ttl", "default_volatility")
+
+    def __init__(self, family: str, min_ttl: float, max_ttl: float, default_volatility: float):
+        self.family = family
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.default_volatility = default_volatility
+
+
+# 24小时涨跌1%对应的每秒波动率，作为资产未观测时的默认值
+_DAILY_1PCT = 0.01 / math.sqrt(86400)
+
+DEFAULT_POLICIES = (
+    TtlPolicy("quotes", 10, 300, 3 * _DAILY_1PCT),
+    TtlPolicy("detail", 30, 900, 3 * _DAILY_1PCT),
+    TtlPolicy("fx", 600, 6 * 3600, 0.3 * _DAILY_1PCT),
+    TtlPolicy("history", 3600, 24 * 3600, 3 * _DAILY_1PCT),
+)
+
+# 包含全部资产的键（如整张报价表）使用的资产标识
+ALL_ASSETS = "*"
+
+
+class _KeyStats:
+    __slots__ = ("policy", "asset", "rate", "updated_at")
+
+    def __init__(self, policy: TtlPolicy, asset: Optional[str], now: float):
+        self.policy = policy
+        self.asset = asset
+        self.rate = 0.0  # 访问频率（次/秒）的指数滑动平均
+        self.updated_at = now
+
+
+class AdaptiveTtl:
+    """
+    按访问频率和资产波动率分配缓存TTL
+
+    一个键的数据在缓存中的期望误差随存活时间增长（方差约为 σ² * 年龄），
+    被读到的次数与访问频率 λ 成正比。在上游调用预算 B（次/秒）下最小化
+    Σ λ·σ²·ttl，得到 ttl ∝ 1 / (σ·√λ)，比例系数使 Σ 1/ttl = B：
+
+        ttl_k = Σ_j(σ_j·√λ_j) / (B · σ_k·√λ_k)
+
+    即热门、波动大的键刷新更频繁，冷门、平稳的键存活更久，再按键族限制在 [min_ttl, max_ttl]。
+    访问频率和波动率都是半衰期为 half_life 秒的指数滑动平均；波动率来自价格刷新之间的对数收益率，
+    没有观测时用24小时涨跌幅估计。
+
+    Args:
+        budget_per_minute: 上游调用预算（次/分钟）
+        half_life: 滑动平均的半衰期（秒）
+    """
+
+    def __init__(self, budget_per_minute: float = 60, half_life: float = 300, policies=DEFAULT_POLICIES):
+        self.budget = budget_per_minute / 60
+        self.tau = half_life / math.log(2)
+        self.policies: Dict[str, TtlPolicy] = {policy.family: policy for policy in policies}
+
+        self._keys: Dict[str, _KeyStats] = {}
+        # asset -> (每秒方差的滑动平均, 上次价格, 上次时间)
+        self._volatility: Dict[str, Tuple[float, float, float]] = {}
+        # asset -> 由24小时涨跌幅估计的每秒波动率
+        self._daily: Dict[str, float] = {}
+
+    def record_access(self, family: str, key: str, asset: Optional[str] = None):
+        """记录一次读取（无论是否命中缓存）"""
+        now = time.monotonic()
+        stats = self._keys.get(key)
+        if stats is None:
+            stats = _KeyStats(self.policies[family], asset, now)
+            self._keys[key] = stats
+        stats.rate = stats.rate * math.exp(-(now - stats.updated_at) / self.tau) + 1 / self.tau
+        stats.updated_at = now
+
+    def on_prices(self, quotes: Dict[str, Dict], timestamp: float):
+        """价格刷新回调：更新各资产的波动率"""
+        for asset, quote in quotes.items():
+            price = quote.get("price_usd")
+            if not price or price <= 0:
+                continue
+            change = quote.get("change_24h")
+            if change is not None:
+                self._daily[asset] = abs(math.log1p(change / 100)) / math.sqrt(86400) if change > -100 else 0.0
+
+            previous = self._volatility.get(asset)
+            if previous is None:
+                self._volatility[asset] = (-1.0, price, timestamp)
+                continue
+            variance, last_price, last_time = previous
+            dt = timestamp - last_time
+            if dt <= 0:
+                continue
+            sample = math.log(price / last_price) ** 2 / dt
+            if variance < 0:
+                variance = sample
+            else:
+                weight = math.exp(-dt / self.tau)
+                variance = weight * variance + (1 - weight) * sample
+            self._volatility[asset] = (variance, price, timestamp)
+
+    def volatility(self, asset: Optional[str], policy: TtlPolicy) -> float:
+        """
+        资产的每秒波动率
+
+        asset 为 ALL_ASSETS 时取所有资产中最大的，一个资产剧烈波动整张报价表就需要刷新；
+        与资产无关的键（asset 为None，如汇率）使用键族的默认值。
+        """
+        if asset is None:
+            return policy.default_volatility
+        if asset == ALL_ASSETS:
+            assets = set(self._daily).union(self._volatility)
+            return max([policy.default_volatility] + [self.volatility(a, policy) for a in assets])
+        observed = self._volatility.get(asset)
+        if observed is not None and observed[0] >= 0:
+            return max(math.sqrt(observed[0]), self._daily.get(asset, 0.0))
+        return self._daily.get(asset) or policy.default_volatility
+
+    def _weight(self, stats: _KeyStats, now: float) -> float:
+        rate = stats.rate * math.exp(-(now - stats.updated_at) / self.tau)
+        return self.volatility(stats.asset, stats.policy) * math.sqrt(rate)
+
+    def ttl(self, key: str) -> Optional[int]:
+        """
+        键当前的TTL（秒），没有记录过访问的键返回None（使用缓存的默认TTL）
+        """
+        stats = self._keys.get(key)
+        if stats is None:
+            return None
+
+        now = time.monotonic()
+        weight = self._weight(stats, now)
+        policy = stats.policy
+        if weight <= 0:
+            return int(policy.max_ttl)
+
+        total = sum(self._weight(other, now) for other in self._keys.values())
+        ttl = total / (self.budget * weight)
+        return int(min(policy.max_ttl, max(policy.min_ttl, ttl)))
+
+    def stats(self) -> Dict:
+        """各键当前的访问频率、波动率和TTL"""
+        now = time.monotonic()
+        return {
+            "budget_per_minute": round(self.budget * 60, 2),
+            "keys": {
+                key: {
+                    "family": stats.policy.family,
+                    "requests_per_minute": round(stats.rate * math.exp(-(now - stats.updated_at) / self.tau) * 60, 3),
+                    "volatility_daily": round(self.volatility(stats.asset, stats.policy) * math.sqrt(86400), 5),
+                    "ttl": self.ttl(key)
+                }
+                for key, stats in self._keys.items()
+            }
+        }
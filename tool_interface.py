@@ -10,13 +10,110 @@ import os
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from simple_client import get_crypto_prices_summary, quick_crypto_check, SimpleCryptoClient
-except ImportError as e:
-    print(f"无法导入加密货币客户端: {e}")
-    get_crypto_prices_summary = None
-    quick_crypto_check = None
-    SimpleCryptoClient = None
+
+def _load_client_module():
+    """
+    按需导入客户端模块
+
+    simple_client 会引入 requests，推迟到首次调用工具时再导入，
+    这样仅加载工具元数据（TOOL_INFO）的场景几乎没有导入开销。
+    """
+    try:
+        import simple_client
+    except ImportError as e:
+        print(f"无法导入加密货币客户端: {e}")
+        return None
+    return simple_client
+
+
+def _format_detail(symbol: str, detail: Optional[Dict]) -> str:
+    """格式化单个加密货币的详细信息"""
+    if not detail:
+        return f"未找到加密货币 '{symbol}' 的详细信息"
+    
+    result = f"🔍 {detail['name']} ({detail['symbol']}) 详细信息:\n"
+    result += "=" * 40 + "\n"
+    result += f"价格 (USD): ${detail['price_usd']:,.2f}\n"
+    result += f"24小时变化: {detail['change_percent_24h']:+.2f}%\n"
+    result += f"24小时交易量: ${detail['volume_usd_24h']:,.2f}\n"
+    result += f"市值: ${detail['market_cap_usd']:,.2f}\n"
+    if detail.get('circulating_supply'):
+        result += f"流通量: {detail['circulating_supply']:,.2f}\n"
+    return result
+
+
+def _format_supported(supported: List[Dict[str, str]]) -> str:
+    """格式化支持的加密货币列表"""
+    result = "📋 支持的加密货币:\n"
+    result += "=" * 20 + "\n"
+    for crypto in supported:
+        result += f"- {crypto['symbol']} ({crypto['id']})\n"
+    return result
+
+
+def _run_batch(client_module, client, actions: List[Dict]) -> str:
+    """
+    多操作模式：把所有操作需要的数据合并成一次 /api/v1/batch 请求，再分别格式化
+    
+    Args:
+        actions: 操作列表，如 [{"action": "check", "symbols": ["BTC"]}, {"action": "detail", "symbol": "bitcoin"}]
+    """
+    sub_requests: List[Dict] = []
+    positions: Dict[tuple, int] = {}
+    
+    def need(request: Dict) -> int:
+        key = tuple(sorted(request.items()))
+        if key not in positions:
+            positions[key] = len(sub_requests)
+            sub_requests.append(request)
+        return positions[key]
+    
+    for item in actions:
+        name = item.get('action')
+        if name in ("summary", "check"):
+            need({"type": "prices"})
+        if name == "summary":
+            for crypto_id in client.SUPPORTED_CRYPTO:
+                need({"type": "detail", "symbol": crypto_id})
+        elif name == "detail" and item.get('symbol'):
+            need({"type": "detail", "symbol": item['symbol']})
+    
+    responses = client.batch(sub_requests) if sub_requests else []
+    if len(responses) != len(sub_requests):
+        return "错误: 批量请求失败。请确保API服务正在运行。"
+    
+    def data_of(request: Dict):
+        response = responses[need(request)]
+        return response.get('data') if response.get('status') == 200 else None
+    
+    outputs = []
+    for item in actions:
+        name = item.get('action')
+        if name == "summary":
+            prices = data_of({"type": "prices"}) or {}
+            details = {
+                crypto_id: data_of({"type": "detail", "symbol": crypto_id})
+                for crypto_id in client.SUPPORTED_CRYPTO
+            }
+            outputs.append(client_module.format_prices_summary(prices, details))
+        elif name == "check":
+            symbols = item.get('symbols', [])
+            if symbols:
+                outputs.append(client_module.format_quick_check(symbols, data_of({"type": "prices"}) or {}))
+            else:
+                outputs.append("错误: 请提供要检查的符号列表")
+        elif name == "supported":
+            outputs.append(_format_supported(client.get_supported_cryptos()))
+        elif name == "detail":
+            symbol = item.get('symbol')
+            if symbol:
+                outputs.append(_format_detail(symbol, data_of({"type": "detail", "symbol": symbol})))
+            else:
+                outputs.append("错误: 请提供要查询的加密货币符号")
+        else:
+            outputs.append(f"未知操作: {name}")
+    
+    return "\n".join(outputs)
 
 
 def run_crypto_tool(action: str = "summary", **kwargs) -> str:
@@ -24,60 +121,49 @@ def run_crypto_tool(action: str = "summary", **kwargs) -> str:
     运行加密货币工具的主要接口函数
     
     Args:
-        action: 要执行的操作 ('summary', 'check', 'detail')
-        **kwargs: 操作参数
+        action: 要执行的操作 ('summary', 'check', 'supported', 'detail', 'batch')
+        **kwargs: 操作参数；batch 时传入 actions=[{"action": ..., 其他参数}, ...]，
+            所有操作只发起一次HTTP请求
         
     Returns:
         操作结果字符串
     """
-    if SimpleCryptoClient is None:
+    client_module = _load_client_module()
+    if client_module is None:
         return "错误: 无法加载加密货币客户端。请确保相关依赖已安装。"
     
     base_url = kwargs.get('base_url', 'http://localhost:8000')
-    client = SimpleCryptoClient(base_url)
+    client = client_module.SimpleCryptoClient(base_url)
     
     if action == "summary":
-        if get_crypto_prices_summary:
-            return get_crypto_prices_summary(base_url)
-        else:
-            return "错误: 无法获取价格摘要"
+        return client_module.get_crypto_prices_summary(base_url)
     
     elif action == "check":
         symbols = kwargs.get('symbols', [])
-        if quick_crypto_check and symbols:
-            return quick_crypto_check(symbols, base_url)
+        if symbols:
+            return client_module.quick_crypto_check(symbols, base_url)
         else:
             return "错误: 请提供要检查的符号列表"
     
     elif action == "supported":
-        supported = client.get_supported_cryptos()
-        result = "📋 支持的加密货币:\n"
-        result += "=" * 20 + "\n"
-        for crypto in supported:
-            result += f"- {crypto['symbol']} ({crypto['id']})\n"
-        return result
+        return _format_supported(client.get_supported_cryptos())
     
     elif action == "detail":
         symbol = kwargs.get('symbol')
         if symbol:
-            detail = client.get_crypto_detail(symbol)
-            if detail:
-                result = f"🔍 {detail['name']} ({detail['symbol']}) 详细信息:\n"
-                result += "=" * 40 + "\n"
-                result += f"价格 (USD): ${detail['price_usd']:,.2f}\n"
-                result += f"24小时变化: {detail['change_percent_24h']:+.2f}%\n"
-                result += f"24小时交易量: ${detail['volume_usd_24h']:,.2f}\n"
-                result += f"市值: ${detail['market_cap_usd']:,.2f}\n"
-                if detail.get('circulating_supply'):
-                    result += f"流通量: {detail['circulating_supply']:,.2f}\n"
-                return result
-            else:
-                return f"未找到加密货币 '{symbol}' 的详细信息"
+            return _format_detail(symbol, client.get_crypto_detail(symbol))
         else:
             return "错误: 请提供要查询的加密货币符号"
     
+    elif action == "batch":
+        actions = kwargs.get('actions', [])
+        if actions:
+            return _run_batch(client_module, client, actions)
+        else:
+            return "错误: 请提供要执行的操作列表"
+    
     else:
-        return f"未知操作: {action}。支持的操作: summary, check, supported, detail"
+        return f"未知操作: {action}。支持的操作: summary, check, supported, detail, batch"
 
 
 def crypto_summary() -> str:
@@ -100,6 +186,11 @@ def crypto_detail(symbol: str) -> str:
     return run_crypto_tool("detail", symbol=symbol)
 
 
+def crypto_batch(actions: List[Dict]) -> str:
+    """一次请求执行多个操作"""
+    return run_crypto_tool("batch", actions=actions)
+
+
 # 工具元数据
 TOOL_INFO = {
     "name": "crypto_market_tool",
@@ -108,7 +199,8 @@ TOOL_INFO = {
         "crypto_summary": "获取加密货币市场总览",
         "crypto_check": "检查特定加密货币价格",
         "supported_cryptos": "获取支持的加密货币列表", 
-        "crypto_detail": "获取特定加密货币的详细信息"
+        "crypto_detail": "获取特定加密货币的详细信息",
+        "crypto_batch": "一次请求执行多个操作（summary、check、supported、detail）"
     }
 }
 